@@ -0,0 +1,38 @@
+using System.Text.Json.Serialization;
+
+namespace QualityControl.Models;
+
+// --- DTOs for the FastAPI resumable upload endpoints (/dataset/uploads) ---
+
+public class FastApiUploadSessionRequest
+{
+    [JsonPropertyName("filename")]
+    public string FileName { get; set; } = string.Empty;
+
+    [JsonPropertyName("total_size")]
+    public long TotalSize { get; set; }
+
+    [JsonPropertyName("part_size")]
+    public long PartSize { get; set; }
+}
+
+public class FastApiUploadSessionResponse
+{
+    [JsonPropertyName("upload_id")]
+    public string UploadId { get; set; } = string.Empty;
+
+    [JsonPropertyName("total_size")]
+    public long TotalSize { get; set; }
+
+    [JsonPropertyName("part_size")]
+    public long PartSize { get; set; }
+
+    [JsonPropertyName("part_count")]
+    public int PartCount { get; set; }
+
+    [JsonPropertyName("received_parts")]
+    public List<int> ReceivedParts { get; set; } = new();
+
+    [JsonPropertyName("missing_parts")]
+    public List<int> MissingParts { get; set; } = new();
+}
@@ -1,7 +1,7 @@
 using QualityControl.Models;
 using System.Text;
 using System.Net.Http.Headers;
-using System.Net;
+using System.Security.Cryptography;
 namespace QualityControl.Services;
 
 public class CsvProcessingService : ICsvProcessingService
@@ -114,150 +114,129 @@ public class CsvProcessingService : ICsvProcessingService
 
     private async Task ForwardTempFileToPythonServiceAsync(string fileName, string tempFilePath)
     {
-        var pythonServiceUrl = $"{_configuration["PythonService:BaseUrl"]}{_configuration["PythonService:DatasetStoreEndpoint"]}";
+        var uploadsUrl = $"{_configuration["PythonService:BaseUrl"]}{_configuration["PythonService:DatasetUploadsEndpoint"] ?? "/dataset/uploads"}";
+        var partSize = (_configuration.GetValue<long?>("PythonService:UploadPartSizeMB") ?? 16) * 1024 * 1024;
+        var parallelism = _configuration.GetValue<int?>("PythonService:UploadParallelism") ?? 4;
 
         var client = _httpClientFactory.CreateClient("PythonApiClient");
 
-        // Ensure client timeout is set (this should be configured in DI, but double-check)
-        if (client.Timeout == TimeSpan.FromSeconds(100))
-        {
-            _logger.LogWarning("HttpClient timeout is still 100 seconds, overriding to 30 minutes");
-            client.Timeout = TimeSpan.FromMinutes(30);
-        }
-
-        var fileInfo = new FileInfo(tempFilePath);
-        var totalBytes = fileInfo.Length;
+        var totalBytes = new FileInfo(tempFilePath).Length;
 
-        _logger.LogInformation("Starting upload of {FileName} ({SizeMB:F2} MB) to Python service...",
+        _logger.LogInformation("Starting resumable upload of {FileName} ({SizeMB:F2} MB) to Python service...",
             fileName, totalBytes / (1024.0 * 1024.0));
 
-        try
+        // 1. Open an upload session
+        var createResponse = await client.PostAsJsonAsync(uploadsUrl, new FastApiUploadSessionRequest
+        {
+            FileName = fileName,
+            TotalSize = totalBytes,
+            PartSize = partSize
+        });
+        await EnsureFastApiSuccessAsync(createResponse);
+        var session = await createResponse.Content.ReadFromJsonAsync<FastApiUploadSessionResponse>()
+            ?? throw new HttpRequestException("FastAPI returned an empty upload session.");
+
+        // 2. Upload the parts in parallel. If any part still fails after its own retries,
+        // ask the service which parts are missing and resend only those.
+        var pending = session.MissingParts;
+        for (var round = 1; pending.Count > 0; round++)
         {
-            // Create progress tracking content
-            using var fileStream = new FileStream(tempFilePath, FileMode.Open, FileAccess.Read);
-            using var progressContent = new ProgressStreamContent(fileStream, totalBytes, progress =>
+            var completed = 0;
+            using var throttler = new SemaphoreSlim(parallelism);
+            var uploads = pending.Select(async partNumber =>
             {
-                _logger.LogInformation("Upload progress: {Progress:F1}% ({BytesSent:F2}MB / {TotalMB:F2}MB)",
-                    progress.Percentage,
-                    progress.BytesSent / (1024.0 * 1024.0),
-                    progress.TotalBytes / (1024.0 * 1024.0));
-            });
-
-            using var multipartContent = new MultipartFormDataContent();
+                await throttler.WaitAsync();
+                try
+                {
+                    await UploadPartWithRetryAsync(client, uploadsUrl, session, tempFilePath, partNumber);
+                    var done = Interlocked.Increment(ref completed);
+                    _logger.LogInformation("Upload progress: {Done}/{Total} parts", done, pending.Count);
+                }
+                finally
+                {
+                    throttler.Release();
+                }
+            }).ToList();
 
-            // Set proper headers
-            progressContent.Headers.ContentType = MediaTypeHeaderValue.Parse("text/csv");
-            progressContent.Headers.ContentDisposition = new ContentDispositionHeaderValue("form-data")
+            try
             {
-                Name = "\"file\"",
-                FileName = $"\"{fileName}\""
-            };
-
-            multipartContent.Add(progressContent);
-
-            // Send with progress tracking
-            var response = await client.PostAsync(pythonServiceUrl, multipartContent);
-
-            if (!response.IsSuccessStatusCode)
+                await Task.WhenAll(uploads);
+            }
+            catch (Exception ex) when (round < MaxUploadRounds)
             {
-                var errorContent = await response.Content.ReadAsStringAsync();
-                _logger.LogError("FastAPI service returned error: {StatusCode} - {Content}",
-                    response.StatusCode, errorContent);
-                throw new HttpRequestException($"FastAPI service returned {response.StatusCode}: {errorContent}");
+                _logger.LogWarning(ex, "Some parts failed to upload (round {Round}); checking which parts are missing.", round);
             }
 
-            _logger.LogInformation("Successfully uploaded {FileName} to Python service", fileName);
-        }
-        catch (TaskCanceledException ex) when (ex.InnerException is TimeoutException)
-        {
-            _logger.LogError("Upload timed out after {Timeout} minutes", client.Timeout.TotalMinutes);
-            throw new HttpRequestException($"Upload timed out after {client.Timeout.TotalMinutes} minutes", ex);
-        }
-        catch (Exception ex)
-        {
-            _logger.LogError(ex, "Failed to upload file to Python service");
-            throw;
-        }
-    }
+            var statusResponse = await client.GetAsync($"{uploadsUrl}/{session.UploadId}");
+            await EnsureFastApiSuccessAsync(statusResponse);
+            var status = await statusResponse.Content.ReadFromJsonAsync<FastApiUploadSessionResponse>();
+            pending = status?.MissingParts ?? new List<int>();
 
-    public Task<DateRangeValidationResponse> ValidateDateRangesAsync(DateRanges ranges)
-    {
-        throw new NotImplementedException("Date range validation is now handled by the Python service.");
-    }
-}
+            if (pending.Count > 0 && round >= MaxUploadRounds)
+                throw new HttpRequestException($"Upload incomplete: {pending.Count} parts still missing after {round} rounds.");
+        }
 
-// Custom HttpContent for progress tracking
-public class ProgressStreamContent : HttpContent
-{
-    private readonly Stream _stream;
-    private readonly long _totalBytes;
-    private readonly Action<UploadProgress> _onProgress;
-    private long _bytesSent = 0;
+        // 3. Finalize: the service moves the assembled file into place and starts feature selection
+        var completeResponse = await client.PostAsync($"{uploadsUrl}/{session.UploadId}/complete", null);
+        await EnsureFastApiSuccessAsync(completeResponse);
 
-    public ProgressStreamContent(Stream stream, long totalBytes, Action<UploadProgress> onProgress)
-    {
-        _stream = stream ?? throw new ArgumentNullException(nameof(stream));
-        _totalBytes = totalBytes;
-        _onProgress = onProgress;
+        _logger.LogInformation("Successfully uploaded {FileName} to Python service in {PartCount} parts", fileName, session.PartCount);
     }
 
-#if NET5_0_OR_GREATER
-    protected override Task SerializeToStreamAsync(Stream stream, TransportContext? context)
-    {
-        return SerializeToStreamInternalAsync(stream, context);
-    }
-#else
-    protected override Task SerializeToStreamAsync(Stream stream, TransportContext context)
-    {
-        return SerializeToStreamInternalAsync(stream, context);
-    }
-#endif
+    private const int MaxUploadRounds = 3;
+    private const int MaxPartAttempts = 3;
 
-    private async Task SerializeToStreamInternalAsync(Stream stream, TransportContext? context)
+    private async Task UploadPartWithRetryAsync(HttpClient client, string uploadsUrl, FastApiUploadSessionResponse session,
+        string filePath, int partNumber)
     {
-        const int bufferSize = 64 * 1024; // 64KB chunks
-        var buffer = new byte[bufferSize];
-        int bytesRead;
+        var offset = (long)partNumber * session.PartSize;
+        var length = (int)Math.Min(session.PartSize, session.TotalSize - offset);
 
-        while ((bytesRead = await _stream.ReadAsync(buffer, 0, buffer.Length)) > 0)
+        // Each part reads its own slice of the file, so parts can be sent concurrently.
+        var buffer = new byte[length];
+        await using (var fileStream = new FileStream(filePath, FileMode.Open, FileAccess.Read, FileShare.Read))
         {
-            await stream.WriteAsync(buffer, 0, bytesRead);
-            _bytesSent += bytesRead;
+            fileStream.Seek(offset, SeekOrigin.Begin);
+            await fileStream.ReadExactlyAsync(buffer);
+        }
+        var checksum = Convert.ToHexString(SHA256.HashData(buffer)).ToLowerInvariant();
 
-            // Report progress every 10MB or at the end
-            if (_bytesSent % (10 * 1024 * 1024) == 0 || _bytesSent >= _totalBytes)
+        for (var attempt = 1; ; attempt++)
+        {
+            try
             {
-                var progress = new UploadProgress
+                using var content = new ByteArrayContent(buffer);
+                content.Headers.ContentType = new MediaTypeHeaderValue("application/octet-stream");
+                using var request = new HttpRequestMessage(HttpMethod.Put, $"{uploadsUrl}/{session.UploadId}/parts/{partNumber}")
                 {
-                    BytesSent = _bytesSent,
-                    TotalBytes = _totalBytes,
-                    Percentage = (_bytesSent * 100.0) / _totalBytes
+                    Content = content
                 };
+                request.Headers.Add("X-Checksum-SHA256", checksum);
 
-                _onProgress?.Invoke(progress);
+                using var response = await client.SendAsync(request);
+                await EnsureFastApiSuccessAsync(response);
+                return;
+            }
+            catch (Exception ex) when (attempt < MaxPartAttempts)
+            {
+                _logger.LogWarning(ex, "Upload of part {PartNumber} failed (attempt {Attempt}); retrying.", partNumber, attempt);
+                await Task.Delay(TimeSpan.FromSeconds(attempt * 2));
             }
         }
     }
 
-    protected override bool TryComputeLength(out long length)
+    private async Task EnsureFastApiSuccessAsync(HttpResponseMessage response)
     {
-        length = _totalBytes;
-        return true;
+        if (response.IsSuccessStatusCode) return;
+
+        var errorContent = await response.Content.ReadAsStringAsync();
+        _logger.LogError("FastAPI service returned error: {StatusCode} - {Content}",
+            response.StatusCode, errorContent);
+        throw new HttpRequestException($"FastAPI service returned {response.StatusCode}: {errorContent}");
     }
 
-    protected override void Dispose(bool disposing)
+    public Task<DateRangeValidationResponse> ValidateDateRangesAsync(DateRanges ranges)
     {
-        if (disposing)
-        {
-            _stream?.Dispose();
-        }
-        base.Dispose(disposing);
+        throw new NotImplementedException("Date range validation is now handled by the Python service.");
     }
 }
-
-public class UploadProgress
-{
-    public long BytesSent { get; set; }
-    public long TotalBytes { get; set; }
-    public double Percentage { get; set; }
-}
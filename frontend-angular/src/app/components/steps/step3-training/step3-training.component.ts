@@ -66,7 +66,10 @@ export class Step3TrainingComponent implements OnDestroy {
       .pipe(
         switchMap(() => this.apiService.getTrainingStatus(task_id)),
         // Keep polling until a final state is reached
-        takeWhile((res) => !['SUCCESS', 'FAILURE'].includes(res.status), true)
+        takeWhile(
+          (res) => !['SUCCESS', 'FAILURE', 'STOPPED'].includes(res.status),
+          true
+        )
       )
       .subscribe({
         next: (response) => {
@@ -76,6 +79,10 @@ export class Step3TrainingComponent implements OnDestroy {
             this.isTraining = false;
             this.trainingResults = response.result;
             this.createCharts();
+          } else if (response.status === 'STOPPED') {
+            this.isTraining = false;
+            this.trainingStatusMessage =
+              response.progress?.status || 'Training stopped by user.';
           } else if (response.status === 'FAILURE') {
             this.isTraining = false;
             this.error = `Training failed. Reason: ${
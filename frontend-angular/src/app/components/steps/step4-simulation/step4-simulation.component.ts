@@ -108,7 +108,7 @@ export class Step4SimulationComponent implements AfterViewInit, OnDestroy {
       .pipe(
         switchMap(() => this.apiService.getSimulationStatus(taskId)),
         takeWhile(
-          (res) => !['SUCCESS', 'FAILURE', 'REVOKED'].includes(res.status),
+          (res) => !['SUCCESS', 'FAILURE', 'REVOKED', 'STOPPED'].includes(res.status),
           true
         )
       )
@@ -138,7 +138,7 @@ export class Step4SimulationComponent implements AfterViewInit, OnDestroy {
           } else if (response.status === 'SUCCESS') {
             this.isSimulating = false;
             this.isCompleted = true;
-          } else if (response.status === 'REVOKED') {
+          } else if (response.status === 'REVOKED' || response.status === 'STOPPED') {
             this.isSimulating = false;
             this.statusMessage = 'Simulation stopped by user.';
           } else if (response.status === 'FAILURE') {
@@ -106,7 +106,7 @@ export interface TrainingProgress {
 // The main model for the status polling response
 export interface TrainingStatusResponse {
   task_id: string;
-  status: 'PENDING' | 'PROGRESS' | 'SUCCESS' | 'FAILURE' | 'REVOKED';
+  status: 'PENDING' | 'PROGRESS' | 'SUCCESS' | 'FAILURE' | 'REVOKED' | 'STOPPED';
   progress: TrainingProgress | null;
   result: TrainingResult | null;
 }
@@ -155,7 +155,7 @@ export interface SimpleStatusProgress {
 // --- Main model for the status polling response ---
 export interface SimulationStatusResponse {
   task_id: string;
-  status: 'PENDING' | 'PROGRESS' | 'SUCCESS' | 'FAILURE' | 'REVOKED';
+  status: 'PENDING' | 'PROGRESS' | 'SUCCESS' | 'FAILURE' | 'REVOKED' | 'STOPPED';
   progress: SimulationDataPacket | SimpleStatusProgress | null;
   result: { message: string } | { error: string } | null;
 }
@@ -0,0 +1,78 @@
+from celery import Celery
+import config
+import serialization
+
+# This module only builds the Celery application object. It is imported by the
+# FastAPI process to enqueue tasks and read their results, so it must not pull in
+# the ML stack (pandas, numpy, xgboost, sklearn). Task bodies live in celery_worker.
+
+# Initialize Celery
+celery_app = Celery(
+    "tasks", broker=config.CELERY_BROKER_URL, backend=config.CELERY_RESULT_BACKEND
+)
+
+celery_app.conf.update(
+    task_track_started=True,
+    # Binary, numpy-aware payloads for both task messages and results.
+    task_serializer=serialization.SERIALIZER_NAME,
+    result_serializer=serialization.SERIALIZER_NAME,
+    accept_content=[serialization.SERIALIZER_NAME, "json"],
+    result_accept_content=[serialization.SERIALIZER_NAME, "json"],
+    # Anything not routed below (e.g. Celery's own chord bookkeeping) is light.
+    task_default_queue=config.LIGHT_QUEUE,
+    task_default_priority=config.TASK_DEFAULT_PRIORITY,
+    # A worker process reserves one task at a time instead of hoarding a batch
+    # that idle workers could have started.
+    worker_prefetch_multiplier=1,
+    # Tasks are acknowledged when they finish, so a task whose worker container
+    # goes away is delivered again. A task whose pool process dies (usually
+    # out of memory) is failed rather than re-queued, so it cannot crash-loop.
+    task_acks_late=True,
+    task_reject_on_worker_lost=False,
+    broker_transport_options={
+        # Unacknowledged tasks are re-delivered after this long, so it must be
+        # longer than the longest task.
+        "visibility_timeout": config.BROKER_VISIBILITY_TIMEOUT_SECONDS,
+        # Redis has no native priorities: each queue is split into one list
+        # per priority level, and lower numbers are consumed first.
+        "priority_steps": list(range(10)),
+        "sep": ":",
+        "queue_order_strategy": "priority",
+    },
+)
+
+# --- Task Names ---
+# The API enqueues tasks by name via `celery_app.send_task`, so it never has to
+# import the task functions themselves.
+TRAIN_MODEL_TASK = "celery_worker.train_model_task"
+SIMULATE_INFERENCE_TASK = "celery_worker.simulate_inference_task"
+SCORE_DATASET_TASK = "celery_worker.score_dataset_task"
+BACKTEST_TASK = "celery_worker.backtest_task"
+BACKTEST_FOLD_TASK = "celery_worker.backtest_fold_task"
+BACKTEST_SUMMARY_TASK = "celery_worker.backtest_summary_task"
+BACKTEST_FAILED_TASK = "celery_worker.backtest_failed_task"
+SELECT_FEATURES_TASK = "celery_worker.select_features_task"
+INGEST_PARTITION_TASK = "celery_worker.ingest_partition_task"
+SPLIT_DATA_TASK = "celery_worker.split_data_task"
+
+# --- Queues ---
+# Each queue has its own worker pool (see docker-compose.yaml):
+#   cpu         prefork, one task per core-hungry process: scans, training,
+#               backtests and bulk scoring
+#   simulation  gevent: paced streams that mostly wait between rows
+#   light       threads: short bookkeeping tasks that should never wait
+#               behind a long job
+# Within the cpu queue, the scans a user waits on (after an upload, or for a
+# split) come first and backtest folds, which can number in the dozens, last.
+celery_app.conf.task_routes = {
+    SELECT_FEATURES_TASK: {"queue": config.CPU_QUEUE, "priority": 0},
+    INGEST_PARTITION_TASK: {"queue": config.CPU_QUEUE, "priority": 0},
+    SPLIT_DATA_TASK: {"queue": config.CPU_QUEUE, "priority": 0},
+    TRAIN_MODEL_TASK: {"queue": config.CPU_QUEUE, "priority": 3},
+    SCORE_DATASET_TASK: {"queue": config.CPU_QUEUE, "priority": 6},
+    BACKTEST_TASK: {"queue": config.CPU_QUEUE, "priority": 9},
+    BACKTEST_FOLD_TASK: {"queue": config.CPU_QUEUE, "priority": 9},
+    SIMULATE_INFERENCE_TASK: {"queue": config.SIMULATION_QUEUE},
+    BACKTEST_SUMMARY_TASK: {"queue": config.LIGHT_QUEUE},
+    BACKTEST_FAILED_TASK: {"queue": config.LIGHT_QUEUE},
+}
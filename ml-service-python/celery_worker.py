@@ -1,99 +1,337 @@
+import os
 import time
 import numpy as np
 import pandas as pd
 import xgboost as xgb
 import joblib
-import json
 import logging
 import gc
-from celery import Celery, Task
-from sklearn.metrics import (
-    accuracy_score,
-    precision_score,
-    recall_score,
-    f1_score,
-    confusion_matrix,
-)
+from celery import Task, chord, group
+from celery.exceptions import Ignore
+from celery.signals import task_postrun
 import config
+from celery_client import (
+    celery_app,
+    TRAIN_MODEL_TASK,
+    SIMULATE_INFERENCE_TASK,
+    SCORE_DATASET_TASK,
+    BACKTEST_TASK,
+    BACKTEST_FOLD_TASK,
+    BACKTEST_SUMMARY_TASK,
+    BACKTEST_FAILED_TASK,
+    SELECT_FEATURES_TASK,
+    INGEST_PARTITION_TASK,
+    SPLIT_DATA_TASK,
+)
+from models.response_models import DateSplitRequest
+from services import (
+    backtest_service,
+    batch_scoring_service,
+    cancellation_service,
+    challenger_service,
+    data_processing_service,
+    drift_service,
+    evaluation_service,
+    explanation_service,
+    feature_selection_service,
+    inference_service,
+    ingest_service,
+    model_registry_service,
+    partition_service,
+    sparse_matrix_service,
+    storage_service,
+)
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
 
-# Initialize Celery
-celery_app = Celery(
-    "tasks", broker=config.CELERY_BROKER_URL, backend=config.CELERY_RESULT_BACKEND
-)
 
-celery_app.conf.update(
-    task_track_started=True,
-)
+@task_postrun.connect
+def _enforce_storage_quota(**kwargs):
+    """
+    Keeps the storage volume under its quota after every task, since tasks are
+    what write the large artifacts. The full catalogue is only built when a
+    limit is exceeded. Housekeeping never fails a task.
+    """
+    try:
+        if storage_service.over_limits():
+            storage_service.enforce_quota()
+    except Exception as e:
+        logger.warning(f"Storage quota enforcement failed: {e}", exc_info=True)
+
+
+def _evaluate(model, dtest, y_test, threshold: float) -> dict:
+    """
+    Scores the test split (a DMatrix, shared by every model evaluated on it)
+    once and sweeps every decision threshold for the curves. The report's
+    "metrics" and "confusion_matrix" are taken at `threshold`, which was picked
+    without looking at the test split.
+    """
+    fail_probability = model.get_booster().predict(dtest)
+    return evaluation_service.evaluation_report(
+        y_test, fail_probability, threshold=threshold
+    )
+
+
+def _finish_stopped(task: Task, meta: dict):
+    """
+    Records the STOPPED state with the task's final meta and ends the task
+    without Celery overwriting that state; the worker process stays up.
+    """
+    task.update_state(state=cancellation_service.STOPPED_STATE, meta=meta)
+    cancellation_service.clear(task.request.id)
+    logger.info(
+        f"Task {task.request.id} stopped: {meta.get('status') or meta.get('message')}"
+    )
+    raise Ignore()
 
 
-# --- NEW: JSON Sanitizer Helper Function ---
-def make_json_serializable(obj):
+class _StopOnFlag(xgb.callback.TrainingCallback):
     """
-    Recursively traverses a dictionary or list to convert non-serializable
-    numpy types to standard Python types.
+    Ends boosting after the current round once a stop was requested.
     """
-    if isinstance(obj, dict):
-        return {k: make_json_serializable(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [make_json_serializable(elem) for elem in obj]
-    if isinstance(obj, (np.integer, np.int64)):
-        return int(obj)
-    if isinstance(obj, (np.floating, np.float32, np.float64)):
-        return float(obj)
-    if isinstance(obj, np.ndarray):
-        return obj.tolist()
-    if isinstance(obj, pd.Timestamp):
-        return obj.isoformat()
-    return obj
 
+    def __init__(self, stop_flag: cancellation_service.StopFlag):
+        super().__init__()
+        self.stop_flag = stop_flag
+
+    def after_iteration(self, model, epoch, evals_log) -> bool:
+        return self.stop_flag.is_set()
 
-@celery_app.task(bind=True)
-def train_model_task(self: Task) -> dict:
+
+def _new_training_rows(parent: dict) -> dict:
+    """
+    Collects the training-sample rows of the partitions the parent model has not
+    seen, leaving out the test and simulation windows so the update is still
+    evaluated on data it was not trained on.
+    """
+    seen = set(parent["partitions"])
+    new_ids = [
+        p["id"] for p in partition_service.ready_partitions() if p["id"] not in seen
+    ]
+    if not new_ids:
+        raise ValueError(f"No new data since model {parent['id']} was trained.")
+
+    sample = ingest_service.load_sample("training", parent["features"], new_ids)
+    keep = np.ones(len(sample["timestamps"]), dtype=bool)
+    for name, split in partition_service.load_split_manifest().items():
+        if name != "train":
+            keep &= ~(
+                (sample["timestamps"] >= split["start_ns"])
+                & (sample["timestamps"] <= split["end_ns"])
+            )
+    if not keep.any():
+        raise ValueError(
+            "The new data falls entirely inside the test or simulation window."
+        )
+    return {
+        "X": sample["X"][keep],
+        "labels": sample["labels"][keep],
+        "partitions": new_ids,
+    }
+
+
+@celery_app.task(name=SELECT_FEATURES_TASK)
+def select_features_task() -> int:
+    """
+    Celery task to run feature selection on a newly stored dataset.
+    """
+    return feature_selection_service.run_feature_selection()
+
+
+@celery_app.task(name=INGEST_PARTITION_TASK)
+def ingest_partition_task(partition_id: str) -> dict:
+    """
+    Celery task to ingest an appended batch as a new partition. Failures are
+    recorded on the partition itself.
+    """
+    return ingest_service.ingest_partition(partition_id)
+
+
+@celery_app.task(name=SPLIT_DATA_TASK)
+def split_data_task(request: dict) -> dict:
+    """
+    Celery task to sample the dataset and cut the train, test and simulation
+    splits for the given date ranges.
+    """
+    return data_processing_service.split_dataset_by_dates(DateSplitRequest(**request))
+
+
+@celery_app.task(bind=True, name=TRAIN_MODEL_TASK)
+def train_model_task(
+    self: Task,
+    mode: str = "full",
+    extra_rounds: int = None,
+    refresh_leaves: bool = False,
+    workers: int = 1,
+) -> dict:
     """
     Celery task to train the XGBoost model, evaluate it, and save artifacts.
+
+    In "full" mode a fresh model is trained on the train split. In "update" mode
+    the registered model keeps boosting for `extra_rounds` trees on rows it has
+    not seen yet (optionally refreshing its existing leaves on them first), and
+    is compared against its predecessor on the same test split. A full
+    training with `workers` > 1 is data-parallel across that many processes.
+
+    A stop request ends boosting after the current round; nothing is saved and
+    the task ends in the STOPPED state.
     """
+    stop_flag = cancellation_service.StopFlag(self.request.id)
     try:
+        storage_service.pin(
+            self.request.id, [config.TRAIN_SET_PATH, config.TEST_SET_PATH]
+        )
+
         # --- 1. Update Status: Loading Data ---
         self.update_state(
             state="PROGRESS", meta={"status": "Loading and preparing data..."}
         )
-        logger.info("Task started: Loading and preparing data.")
+        logger.info(f"Task started ({mode} training): Loading and preparing data.")
 
-        train_df = pd.read_csv(config.TRAIN_SET_PATH)
-        test_df = pd.read_csv(config.TEST_SET_PATH)
+        # Splits are sparse CSR matrices, memory-mapped from the split cache;
+        # XGBoost consumes them directly and treats the implicit (missing)
+        # entries as missing values.
+        test_split = sparse_matrix_service.load_split(config.TEST_SET_PATH)
+        dtest = sparse_matrix_service.load_dmatrix(config.TEST_SET_PATH)
+        y_test = test_split["labels"]
+        features = test_split["features"]
 
-        with open(config.IMPORTANT_FEATURES_PATH, "r") as f:
-            important_features = json.load(f)
-
-        X_train = train_df[important_features]
-        y_train = train_df[config.TARGET_COLUMN]
-        X_test = test_df[important_features]
-        y_test = test_df[config.TARGET_COLUMN]
+        parent, parent_model = None, None
+        if mode == "update":
+            parent = model_registry_service.current_model()
+            if parent is None:
+                raise ValueError(
+                    "No registered model to update; run a full training first."
+                )
+            if parent["features"] != features:
+                raise ValueError(
+                    "The test split was cut with different features than model "
+                    f"{parent['id']}; re-split with the same feature selection first."
+                )
+            parent_dir = model_registry_service.model_dir(parent["id"])
+            storage_service.pin(self.request.id, [parent_dir])
+            storage_service.record_access(parent_dir)
+            parent_model = joblib.load(model_registry_service.model_path(parent["id"]))
+            new_rows = _new_training_rows(parent)
+            X_train, y_train = new_rows["X"], new_rows["labels"]
+            partitions = parent["partitions"] + new_rows["partitions"]
+        else:
+            train_split = sparse_matrix_service.load_split(config.TRAIN_SET_PATH)
+            X_train = train_split["X"]
+            y_train = train_split["labels"]
+            partitions = (
+                partition_service.load_split_manifest()
+                .get("train", {})
+                .get("partitions", [])
+            )
+            del train_split
 
-        del train_df, test_df
+        del test_split
         gc.collect()
 
+        # The last rows are held out of the fit to pick the decision threshold
+        # on, so the test split only measures the model.
+        n_rows = X_train.shape[0]
+        fit_rows = n_rows - int(n_rows * config.THRESHOLD_HOLDOUT_FRACTION)
+        X_fit, y_fit = X_train[:fit_rows], y_train[:fit_rows]
+
+        if stop_flag.is_set():
+            _finish_stopped(
+                self, {"status": "Training stopped by the user before it started."}
+            )
+
         # --- 2. Update Status: Training Model ---
+        distributed = parent_model is None and workers > 1
         self.update_state(
-            state="PROGRESS", meta={"status": "Training XGBoost model..."}
+            state="PROGRESS",
+            meta={
+                "status": (
+                    f"Training XGBoost model on {workers} workers..."
+                    if distributed
+                    else "Training XGBoost model..."
+                )
+            },
+        )
+        logger.info(
+            f"Data loaded ({n_rows} rows, {n_rows - fit_rows} held out for the "
+            "decision threshold). Starting model training."
         )
-        logger.info("Data loaded. Starting model training.")
+
+        rounds = config.N_ESTIMATORS
+        base_booster, parent_rounds = None, 0
+        if parent_model is not None:
+            rounds = extra_rounds or config.UPDATE_EXTRA_ROUNDS
+            base_booster = parent_model.get_booster().copy()
+            parent_rounds = base_booster.num_boosted_rounds()
+            if refresh_leaves:
+                # Re-fits the leaf values of the existing trees to the new rows
+                # without changing their structure.
+                logger.info(f"Refreshing the leaves of {parent_rounds} existing trees.")
+                base_booster = xgb.train(
+                    {
+                        "objective": config.OBJECTIVE,
+                        "process_type": "update",
+                        "updater": "refresh",
+                        "refresh_leaf": True,
+                    },
+                    xgb.DMatrix(X_fit, label=y_fit),
+                    num_boost_round=parent_rounds,
+                    xgb_model=base_booster,
+                    callbacks=[_StopOnFlag(stop_flag)],
+                )
 
         model = xgb.XGBClassifier(
-            n_estimators=config.N_ESTIMATORS,
+            n_estimators=rounds,
             max_depth=config.MAX_DEPTH,
             learning_rate=config.LEARNING_RATE,
             use_label_encoder=False,
             objective=config.OBJECTIVE,
             eval_metric=["logloss", "error"],
+            callbacks=[_StopOnFlag(stop_flag)],
         )
 
-        model.fit(X_train, y_train, eval_set=[(X_train, y_train)], verbose=False)
+        if distributed:
+            # Lazily imported: only distributed trainings need the tracker.
+            from services import distributed_training_service
+
+            booster, eval_results = distributed_training_service.train_distributed(
+                {
+                    "objective": config.OBJECTIVE,
+                    "max_depth": config.MAX_DEPTH,
+                    "learning_rate": config.LEARNING_RATE,
+                    "eval_metric": ["logloss", "error"],
+                },
+                rounds,
+                workers,
+                self.request.id,
+                n_rows=fit_rows,
+            )
+            # Wrapped like a single-process model, so it is saved, registered
+            # and loaded the same way.
+            model.load_model(bytearray(booster.save_raw("ubj")))
+        else:
+            # With `xgb_model`, boosting continues from the existing trees.
+            model.fit(
+                X_fit,
+                y_fit,
+                eval_set=[(X_fit, y_fit)],
+                verbose=False,
+                xgb_model=base_booster,
+            )
+            eval_results = model.evals_result()["validation_0"]
+        if stop_flag.is_set():
+            completed = model.get_booster().num_boosted_rounds() - parent_rounds
+            _finish_stopped(
+                self,
+                {
+                    "status": f"Training stopped by the user after {completed} of "
+                    f"{rounds} boosting rounds; no model was saved.",
+                    "rounds_completed": completed,
+                },
+            )
         logger.info("Model training complete.")
 
         # --- 3. Update Status: Evaluating Model ---
@@ -101,16 +339,38 @@ def train_model_task(self: Task) -> dict:
             state="PROGRESS", meta={"status": "Evaluating model on test set..."}
         )
         logger.info("Evaluating model.")
-        y_pred = model.predict(X_test)
-
-        # Calculate metrics
-        acc = accuracy_score(y_test, y_pred)
-        prec = precision_score(y_test, y_pred)
-        rec = recall_score(y_test, y_pred)
-        f1 = f1_score(y_test, y_pred)
+        threshold, threshold_source = evaluation_service.holdout_threshold(
+            y_train[fit_rows:], model.get_booster().inplace_predict(X_train[fit_rows:])
+        )
+        evaluation = _evaluate(model, dtest, y_test, threshold)
+        evaluation["threshold_source"] = threshold_source
+        metrics, matrix = evaluation["metrics"], evaluation["confusion_matrix"]
 
-        # Calculate confusion matrix components
-        tn, fp, fn, tp = confusion_matrix(y_test, y_pred).ravel()
+        comparison = None
+        if parent_model is not None:
+            # Each model is compared at its own stored threshold.
+            previous = _evaluate(
+                parent_model,
+                dtest,
+                y_test,
+                parent.get("threshold", config.DEFAULT_DECISION_THRESHOLD),
+            )
+            previous_metrics = previous["metrics"]
+            previous_matrix = previous["confusion_matrix"]
+            comparison = {
+                "previous_model_id": parent["id"],
+                "previous_metrics": previous_metrics,
+                "previous_confusion_matrix": previous_matrix,
+                "metric_deltas": {
+                    name: metrics[name] - previous_metrics[name] for name in metrics
+                },
+                "train_rows": int(fit_rows),
+                "extra_rounds": rounds,
+                "refresh_leaves": bool(refresh_leaves),
+            }
+            logger.info(
+                f"Update vs. model {parent['id']}: {comparison['metric_deltas']}"
+            )
 
         # --- 4. Update Status: Processing Results ---
         self.update_state(
@@ -118,67 +378,195 @@ def train_model_task(self: Task) -> dict:
         )
         logger.info("Processing results and generating chart data.")
 
-        # Process training curves for chart
-        eval_results = model.evals_result()["validation_0"]
-        epochs = range(len(eval_results["logloss"]))
+        # Process training curves for chart. Curves are kept columnar (parallel
+        # x/y arrays) rather than as a list of {"x", "y"} points. For an update
+        # they cover the added trees, numbered after the parent's.
+        epochs = np.arange(
+            parent_rounds, parent_rounds + len(eval_results["logloss"]), dtype=np.int32
+        )
 
         training_chart_data = {
-            "train_loss": [
-                {"x": i, "y": v} for i, v in enumerate(eval_results["logloss"])
-            ],
-            "train_accuracy": [
-                {"x": i, "y": 1 - v} for i, v in enumerate(eval_results["error"])
-            ],
+            "train_loss": {
+                "x": epochs,
+                "y": np.asarray(eval_results["logloss"], dtype=np.float32),
+            },
+            "train_accuracy": {
+                "x": epochs,
+                "y": 1 - np.asarray(eval_results["error"], dtype=np.float32),
+            },
         }
 
+        # Drift reference: per-feature value sketch of the data the model was
+        # trained on. An update merges the new rows into its parent's sketch.
+        reference = None
+        if parent is not None:
+            reference = drift_service.load_sketch(
+                model_registry_service.artifact_path(
+                    parent["id"], config.DRIFT_REFERENCE_FILENAME
+                )
+            )
+        if reference is not None and reference.features == features:
+            new_sketch = reference.empty_copy()
+            new_sketch.update(X_train)
+            reference.merge(new_sketch)
+        else:
+            reference = drift_service.build_reference(X_train, features)
+
         # --- 5. Save Artifacts ---
-        joblib.dump(model, config.MODEL_SAVE_PATH)
-        logger.info(f"Model saved to {config.MODEL_SAVE_PATH}")
+        # Each model is kept as a registry version; the current one is also
+        # written to MODEL_SAVE_PATH, where the simulation loads it from.
+        model_id = model_registry_service.new_model_id()
+        # The stop callback is not part of the model. (set_params would also push
+        # every parameter into the fitted booster.)
+        model.callbacks = None
+        for path in (
+            model_registry_service.model_path(model_id),
+            config.MODEL_SAVE_PATH,
+        ):
+            with storage_service.atomic_write(path, "wb") as f:
+                joblib.dump(model, f)
+        drift_service.save_sketch(
+            model_registry_service.artifact_path(
+                model_id, config.DRIFT_REFERENCE_FILENAME
+            ),
+            reference,
+        )
+        drift_service.save_sketch(config.DRIFT_REFERENCE_PATH, reference)
+        model_registry_service.register_model(
+            {
+                "id": model_id,
+                "parent_id": parent["id"] if parent else None,
+                "mode": mode,
+                "created_at": time.time(),
+                "features": features,
+                "partitions": partitions,
+                "n_rounds": int(model.get_booster().num_boosted_rounds()),
+                "train_rows": int(fit_rows),
+                "workers": workers if distributed else 1,
+                "metrics": metrics,
+                "confusion_matrix": matrix,
+                "threshold": threshold,
+                "threshold_strategy": evaluation["strategy"],
+                "threshold_source": threshold_source,
+                "roc_auc": evaluation["roc_auc"],
+                "average_precision": evaluation["average_precision"],
+            },
+            comparison,
+        )
+        logger.info(f"Model saved to {config.MODEL_SAVE_PATH} as version {model_id}")
 
-        with open(config.CURVES_SAVE_PATH, "w") as f:
-            json.dump(training_chart_data, f, indent=4)
+        storage_service.write_json(
+            config.CURVES_SAVE_PATH,
+            {
+                name: {"x": series["x"].tolist(), "y": series["y"].tolist()}
+                for name, series in training_chart_data.items()
+            },
+        )
         logger.info(f"Training curves saved to {config.CURVES_SAVE_PATH}")
 
         # --- 6. Assemble Final Payload ---
         final_result = {
-            "metrics": {
-                "accuracy": acc,
-                "precision": prec,
-                "recall": rec,
-                "f1_score": f1,
-            },
+            "metrics": metrics,
             "training_chart": training_chart_data,
-            "confusion_matrix": {
-                "true_positives": int(tp),
-                "false_positives": int(fp),
-                "true_negatives": int(tn),
-                "false_negatives": int(fn),
-            },
+            "confusion_matrix": matrix,
             "model_path": config.MODEL_SAVE_PATH,
             "curves_path": config.CURVES_SAVE_PATH,
+            "model_id": model_id,
+            "mode": mode,
+            "comparison": comparison,
+            "evaluation": {
+                k: v
+                for k, v in evaluation.items()
+                if k not in ("metrics", "confusion_matrix")
+            },
         }
 
         logger.info("Task completed successfully.")
         return final_result
 
+    except Ignore:
+        raise
     except Exception as e:
         logger.error(f"Task failed: {e}", exc_info=True)
         self.update_state(state="FAILURE", meta={"status": str(e)})
         # Re-raise the exception so Celery knows it failed
         raise e
+    finally:
+        storage_service.unpin(self.request.id)
+
+
+def _load_drift_reference(features: list):
+    """
+    Returns the training reference sketch for `features`. It is built from the
+    train split once if the model was trained before references existed, and
+    is None when no matching reference can be had.
+    """
+    reference = drift_service.load_sketch(config.DRIFT_REFERENCE_PATH)
+    if reference is not None and reference.features == features:
+        return reference
+    try:
+        train_split = sparse_matrix_service.load_split(config.TRAIN_SET_PATH)
+    except FileNotFoundError:
+        logger.warning("No training reference for drift monitoring; drift is disabled.")
+        return None
+    if train_split["features"] != features:
+        logger.warning(
+            "Train split features differ from the simulation's; drift is disabled."
+        )
+        return None
+    reference = drift_service.build_reference(train_split["X"], features)
+    drift_service.save_sketch(config.DRIFT_REFERENCE_PATH, reference)
+    return reference
+
 
+def _score_drift_window(
+    window_sketch, reference, window_index: int, history: list
+) -> dict:
+    """
+    Scores a finished window against the reference and appends its summary to
+    the (bounded) window history.
+    """
+    report = drift_service.summarize(window_sketch, reference)
+    history.append(
+        {
+            "window": window_index,
+            "max_psi": report["max_psi"],
+            "mean_psi": report["mean_psi"],
+            "drifting_features": report["drifting_features"],
+        }
+    )
+    del history[: -config.DRIFT_HISTORY_WINDOWS]
+    return {"window": window_index, **report, "history": list(history)}
 
-@celery_app.task(bind=True)
-def simulate_inference_task(self: Task) -> dict:
+
+# A simulation streams rows to a watching user; after a lost worker it is not
+# restarted from the first row, so it is acknowledged as soon as it starts.
+@celery_app.task(bind=True, name=SIMULATE_INFERENCE_TASK, acks_late=False)
+def simulate_inference_task(self: Task, model_ids: list = None) -> dict:
     """
     Celery task to simulate real-time inference on the simulation dataset.
+
+    By default rows are scored with the current model. Given `model_ids`, every
+    row is scored with all of those registered models in the same pass: the
+    first (the champion) makes the stream's prediction, and the packets also
+    carry each model's prediction, live statistics and disagreement rates.
+
+    A stop request is honoured between rows: the task flushes its final
+    statistics and drift summary and ends in the STOPPED state.
     """
+    stop_flag = cancellation_service.StopFlag(self.request.id)
     try:
         # --- 0. Warmup Period ---
         warmup_status = f"Initializing simulation... Warmup period of {config.SIMULATION_WARMUP_PERIOD_SECONDS} seconds."
         logger.info(warmup_status)
         self.update_state(state="PROGRESS", meta={"status": warmup_status})
-        time.sleep(config.SIMULATION_WARMUP_PERIOD_SECONDS)
+        warmup_end = time.monotonic() + config.SIMULATION_WARMUP_PERIOD_SECONDS
+        while time.monotonic() < warmup_end:
+            if stop_flag.is_set():
+                _finish_stopped(
+                    self, {"message": "Simulation stopped by the user during warmup."}
+                )
+            time.sleep(min(stop_flag.interval, max(warmup_end - time.monotonic(), 0)))
 
         # --- 1. Load Artifacts and Data ---
         self.update_state(
@@ -186,14 +574,67 @@ def simulate_inference_task(self: Task) -> dict:
         )
         logger.info("Simulation Task: Loading model and data.")
 
-        model = joblib.load(config.MODEL_SAVE_PATH)
-        sim_df = pd.read_csv(config.SIMULATION_SET_PATH)
+        # The model and split are shared with the other simulation streams
+        # running in this worker; predictions are batched across streams.
+        storage_service.pin(self.request.id, [config.SIMULATION_SET_PATH])
+        sim_split = inference_service.get_split(config.SIMULATION_SET_PATH)
+        X_sim = sim_split["X"]
+        important_features = sim_split["features"]
 
-        with open(config.IMPORTANT_FEATURES_PATH, "r") as f:
-            important_features = json.load(f)
+        panel, comparison = None, None
+        if model_ids:
+            # Champion/challenger: all models score windows of the shared split.
+            models = []
+            for model_id in model_ids:
+                metadata = model_registry_service.get_model(model_id)
+                if metadata is None:
+                    raise ValueError(f"Model {model_id} is not registered.")
+                if metadata["features"] != important_features:
+                    raise ValueError(
+                        f"Model {model_id} was trained on other features than the "
+                        f"simulation split was cut with."
+                    )
+                models.append(metadata)
+            model_dirs = [model_registry_service.model_dir(m) for m in model_ids]
+            storage_service.pin(self.request.id, model_dirs)
+            for model_dir in model_dirs:
+                storage_service.record_access(model_dir)
+            boosters = [
+                inference_service.get_predictor(
+                    model_registry_service.model_path(model_id)
+                ).model.get_booster()
+                for model_id in model_ids
+            ]
+            thresholds = [
+                m.get("threshold", config.DEFAULT_DECISION_THRESHOLD) for m in models
+            ]
+            panel = challenger_service.ModelPanel(boosters, X_sim)
+            comparison = challenger_service.ComparisonStats(model_ids, thresholds)
+            booster, threshold = boosters[0], thresholds[0]
+        else:
+            predictor = inference_service.get_predictor(config.MODEL_SAVE_PATH)
+            booster = predictor.model.get_booster()
+            # The decision threshold chosen when the current model was evaluated.
+            registered = model_registry_service.current_model() or {}
+            threshold = registered.get("threshold", config.DEFAULT_DECISION_THRESHOLD)
+        logger.info(f"Simulation Task: Using a decision threshold of {threshold:.4f}.")
 
-        # Get the top 3 most important features for the live table
+        # Get the top 3 most important features for the live table. Features are
+        # stored in importance order, so these are the first three columns.
         top_3_features = important_features[:3]
+        # Per-row explanations: the top contributors of each row, computed in
+        # batches of rows from the shared model.
+        explainer = explanation_service.WindowExplainer(
+            booster, X_sim, important_features
+        )
+
+        # Drift monitoring: every row goes into the current window's sketch; full
+        # windows are scored against the training reference and merged into the
+        # cumulative sketch.
+        reference = _load_drift_reference(important_features)
+        window_sketch = reference.empty_copy() if reference else None
+        total_sketch = reference.empty_copy() if reference else None
+        drift_history = []
 
         # --- 2. Initialize Live Statistics ---
         live_stats = {
@@ -203,25 +644,76 @@ def simulate_inference_task(self: Task) -> dict:
             "confidence_sum": 0.0,
             "average_confidence": 0.0,
         }
-        total_rows = len(sim_df)
+        total_rows = X_sim.shape[0]
+        stopped = False
 
         # --- 3. Start the Simulation Loop ---
         logger.info(f"Starting simulation for {total_rows} records.")
-        for index, row in sim_df.iterrows():
-            # Prepare single row for prediction
-            row_features = row[important_features].values.reshape(1, -1)
+        for index in range(total_rows):
+            if stop_flag.is_set():
+                stopped = True
+                break
+
+            # Prepare single row for prediction (a 1 x n_features CSR slice)
+            row_features = X_sim[index]
+            sample_id = int(sim_split["ids"][index])
+            timestamp = pd.Timestamp(
+                sim_split["timestamps"][index], tz="UTC"
+            ).isoformat()
+
+            # Only observed values are reported; missing sensors are left out.
+            top_values = sparse_matrix_service.csr_to_dense(
+                row_features[:, : len(top_3_features)]
+            )[0]
+            top_features = {
+                name: float(value)
+                for name, value in zip(top_3_features, top_values)
+                if not np.isnan(value)
+            }
+
+            # Window-level results (the drift report, the comparison totals) only
+            # go into the packet of the row where they change; clients keep the
+            # last ones they received.
+            drift_payload = None
+            if window_sketch is not None:
+                window_sketch.update(row_features)
+                if (
+                    window_sketch.rows >= config.DRIFT_WINDOW_ROWS
+                    or index == total_rows - 1
+                ):
+                    drift_payload = _score_drift_window(
+                        window_sketch, reference, len(drift_history), drift_history
+                    )
+                    total_sketch.merge(window_sketch)
+                    window_sketch = reference.empty_copy()
 
             # Get prediction probabilities
-            probabilities = model.predict_proba(row_features)[
-                0
-            ]  # e.g., [P(pass), P(fail)]
+            comparison_payload = None
+            if panel is None:
+                probabilities = predictor.predict_proba(row_features)[
+                    0
+                ]  # e.g., [P(pass), P(fail)]
+            else:
+                fail_probabilities = panel.fail_probabilities(index)
+                probabilities = (1.0 - fail_probabilities[0], fail_probabilities[0])
+                comparison_payload = {
+                    "predictions": comparison.update(
+                        fail_probabilities, sim_split["labels"][index]
+                    )
+                }
+                if (
+                    comparison.rows == 1
+                    or comparison.rows % config.SIMULATION_COMPARE_WINDOW_ROWS == 0
+                    or index == total_rows - 1
+                ):
+                    comparison_payload.update(comparison.snapshot())
 
             # Calculate Quality Score and Confidence
-            pass_probability = probabilities[0]
+            pass_probability = float(probabilities[0])
             quality_score = pass_probability * 100
 
-            # Determine prediction
-            prediction_label = "Pass" if pass_probability >= 0.5 else "Fail"
+            # Determine prediction: a part fails once P(fail) reaches the threshold
+            prediction_label = "Fail" if probabilities[1] >= threshold else "Pass"
 
             # Update live statistics
             live_stats["total_predictions"] += 1
@@ -236,7 +728,7 @@ def simulate_inference_task(self: Task) -> dict:
 
             log_message = (
                 f"Row {index + 1}/{total_rows} | "
-                f"ID: {int(row[config.ID_COLUMN])} | "
+                f"ID: {sample_id} | "
                 f"Pred: {prediction_label} | "
                 f"Conf: {quality_score:.2f}% | "
                 f"Avg Conf: {live_stats['average_confidence']:.2f}%"
@@ -249,11 +741,12 @@ def simulate_inference_task(self: Task) -> dict:
                 "total_rows": total_rows,
                 "quality_score": quality_score,
                 "live_prediction": {
-                    "timestamp": row[config.TIMESTAMP_COLUMN],
-                    "sample_id": f"SAMPLE_{int(row[config.ID_COLUMN])}",
+                    "timestamp": timestamp,
+                    "sample_id": f"SAMPLE_{sample_id}",
                     "prediction": prediction_label,
                     "confidence": quality_score,
-                    "top_features": row[top_3_features].to_dict(),
+                    "top_features": top_features,
+                    "top_contributors": explainer.explain(index),
                 },
                 "live_stats": {
                     "total_predictions": live_stats["total_predictions"],
@@ -261,32 +754,283 @@ def simulate_inference_task(self: Task) -> dict:
                     "fail_count": live_stats["fail_count"],
                     "average_confidence": live_stats["average_confidence"],
                 },
+                "drift": drift_payload,
+                "comparison": comparison_payload,
             }
 
-            # --- Sanitize the payload before updating state ---
-            serializable_payload = make_json_serializable(progress_payload)
-
-            logger.info(
-                f"Row {serializable_payload['current_row_index'] + 1}/{total_rows} | "
-                f"ID: {serializable_payload['live_prediction']['sample_id']} | "
-                f"Pred: {serializable_payload['live_prediction']['prediction']} | "
-                f"Conf: {serializable_payload['live_prediction']['confidence']:.2f}% | "
-                f"Avg Conf: {serializable_payload['live_stats']['average_confidence']:.2f}%"
-            )
-
-            # Update Celery task state with the new data packet
-            self.update_state(state="PROGRESS", meta=serializable_payload)
+            # Update Celery task state with the new data packet. The payload holds
+            # only native types; the msgpack serializer handles any numpy leftovers.
+            self.update_state(state="PROGRESS", meta=progress_payload)
 
             # --- The Pacer ---
-            time.sleep(1)
+            # One row per tick; ticks are shared by all streams in the worker.
+            inference_service.wait_for_next_tick()
 
+        processed = live_stats["total_predictions"]
+        if stopped:
+            message = f"Simulation stopped by the user after {processed} of {total_rows} records."
+        else:
+            message = f"Simulation complete. Processed {total_rows} records."
         final_summary = {
-            "message": f"Simulation complete. Processed {total_rows} records."
+            "message": message,
+            "explanations": explainer.summary(),
+            "live_stats": {
+                k: v for k, v in live_stats.items() if k != "confidence_sum"
+            },
         }
+        if comparison is not None:
+            final_summary["comparison"] = {
+                **comparison.snapshot(),
+                "scoring": panel.summary(),
+            }
+        if window_sketch is not None and window_sketch.rows:
+            # Rows of the window that was open when the run was stopped.
+            total_sketch.merge(window_sketch)
+        if total_sketch is not None and total_sketch.rows:
+            # The cumulative sketch is kept so runs (or workers) can be merged later.
+            drift_service.save_sketch(
+                os.path.join(config.DRIFT_SKETCHES_DIR, f"{self.request.id}.npz"),
+                total_sketch,
+            )
+            final_summary["drift"] = drift_service.summarize(total_sketch, reference)
+        if stopped:
+            _finish_stopped(self, final_summary)
         logger.info(final_summary["message"])
         return final_summary
 
+    except Ignore:
+        raise
     except Exception as e:
         logger.error(f"Simulation task failed: {e}", exc_info=True)
         self.update_state(state="FAILURE", meta={"status": str(e)})
         raise e
+    finally:
+        storage_service.unpin(self.request.id)
+
+
+@celery_app.task(bind=True, name=SCORE_DATASET_TASK)
+def score_dataset_task(
+    self: Task, input_path: str, output_path: str, model_id: str
+) -> dict:
+    """
+    Celery task to score every row of a CSV file with a registered model and
+    write the predictions next to the job's other files.
+
+    The model version is fixed when the job is queued, so registering a new
+    model meanwhile does not change what the job scores with. A stop request is
+    honoured between chunks and leaves no output file.
+    """
+    stop_flag = cancellation_service.StopFlag(self.request.id)
+    completed = False
+    try:
+        metadata = model_registry_service.get_model(model_id)
+        if metadata is None:
+            raise ValueError(f"Model {model_id} is not registered.")
+        threshold = metadata.get("threshold", config.DEFAULT_DECISION_THRESHOLD)
+        model_dir = model_registry_service.model_dir(model_id)
+        storage_service.pin(self.request.id, [os.path.dirname(output_path), model_dir])
+        storage_service.record_access(model_dir)
+        booster = joblib.load(model_registry_service.model_path(model_id)).get_booster()
+        logger.info(
+            f"Scoring Task: Scoring {input_path} with model {model_id} "
+            f"(threshold {threshold:.4f})."
+        )
+        self.update_state(
+            state="PROGRESS", meta={"status": "Scoring...", "rows": 0, "percent": 0.0}
+        )
+
+        def on_progress(progress: dict):
+            status = (
+                f"Scored {progress['rows']:,} rows ({progress['percent']:.1f}% of the "
+                f"input, {progress['rows_per_second']:,.0f} rows/s)."
+            )
+            self.update_state(state="PROGRESS", meta={"status": status, **progress})
+
+        summary = batch_scoring_service.score_csv(
+            booster,
+            metadata["features"],
+            threshold,
+            input_path,
+            output_path,
+            on_progress=on_progress,
+            should_stop=stop_flag.is_set,
+        )
+        stopped = summary.pop("stopped", False)
+        result = {**summary, "model_id": model_id, "threshold": threshold}
+        if stopped:
+            result["message"] = (
+                f"Scoring stopped by the user after {summary['rows']:,} rows; "
+                f"no output was written."
+            )
+            _finish_stopped(self, result)
+        result["message"] = f"Scoring complete. Scored {summary['rows']:,} rows."
+        result["output_file"] = os.path.basename(output_path)
+        logger.info(result["message"])
+        completed = True
+        return result
+
+    except Ignore:
+        raise
+    except Exception as e:
+        logger.error(f"Scoring task failed: {e}", exc_info=True)
+        self.update_state(state="FAILURE", meta={"status": str(e)})
+        raise e
+    finally:
+        storage_service.unpin(self.request.id)
+        if completed:
+            # The predictions stay until downloaded (or their TTL runs out).
+            storage_service.pin(
+                self.request.id,
+                [os.path.dirname(output_path)],
+                ttl=config.SCORING_OUTPUT_TTL_SECONDS,
+            )
+
+
+@celery_app.task(bind=True, name=BACKTEST_TASK)
+def backtest_task(
+    self: Task,
+    train_days: float,
+    test_days: float,
+    step_days: float,
+    start_date: str = None,
+    end_date: str = None,
+    max_folds: int = None,
+):
+    """
+    Celery task to start a rolling-origin backtest. It prepares the shared
+    backtest matrix, cuts the folds and replaces itself with a chord: one
+    backtest_fold_task per fold, run in parallel by whichever workers are free,
+    and backtest_summary_task, which stores the final result under this task's
+    id.
+    """
+    try:
+        self.update_state(
+            state="PROGRESS", meta={"status": "Preparing the backtest matrix..."}
+        )
+        split = backtest_service.prepare_backtest_set()
+        folds = backtest_service.fold_windows(
+            split["timestamps"],
+            train_days,
+            test_days,
+            step_days,
+            start_date,
+            end_date,
+            max_folds,
+        )
+        if not folds:
+            raise ValueError("The window scheme fits no fold in the data's time range.")
+
+        job_id = self.request.id
+        job_dir = os.path.join(config.BACKTESTS_DIR, job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        # Held until the summary task, which runs under the same id, finishes,
+        # or until a fold fails (the summary then never runs).
+        storage_service.pin(job_id, [config.BACKTEST_SET_PATH, job_dir])
+        logger.info(
+            f"Backtest {job_id}: {len(folds)} folds over {split['X'].shape[0]} rows."
+        )
+        self.update_state(
+            state="PROGRESS",
+            meta={
+                "status": f"Evaluating {len(folds)} folds...",
+                "folds_done": 0,
+                "total_folds": len(folds),
+            },
+        )
+        header = group(
+            celery_app.signature(
+                BACKTEST_FOLD_TASK,
+                kwargs={"job_id": job_id, "fold": fold, "total_folds": len(folds)},
+            )
+            for fold in folds
+        )
+        body = celery_app.signature(BACKTEST_SUMMARY_TASK, kwargs={"job_id": job_id})
+        body.link_error(
+            celery_app.signature(BACKTEST_FAILED_TASK, kwargs={"job_id": job_id})
+        )
+        raise self.replace(chord(header, body))
+
+    except Ignore:
+        raise
+    except Exception as e:
+        logger.error(f"Backtest task failed: {e}", exc_info=True)
+        self.update_state(state="FAILURE", meta={"status": str(e)})
+        storage_service.unpin(self.request.id)
+        raise e
+
+
+@celery_app.task(bind=True, name=BACKTEST_FOLD_TASK)
+def backtest_fold_task(self: Task, job_id: str, fold: dict, total_folds: int) -> dict:
+    """
+    Trains and evaluates one backtest fold on its rows of the memory-mapped
+    backtest matrix, records the result with the job and reports the job's
+    progress.
+    """
+    stop_flag = cancellation_service.StopFlag(job_id)
+    if stop_flag.is_set():
+        return {**fold, "stopped": True}
+    split = sparse_matrix_service.load_split(config.BACKTEST_SET_PATH)
+    result = backtest_service.run_fold(split, fold, callbacks=[_StopOnFlag(stop_flag)])
+    if stop_flag.is_set():
+        return {**fold, "stopped": True}
+
+    job_dir = os.path.join(config.BACKTESTS_DIR, job_id)
+    storage_service.write_json(
+        os.path.join(job_dir, f"fold-{fold['fold']}.json"), result
+    )
+    # Written before counting, so the last fold to finish sees every file.
+    done = len([n for n in os.listdir(job_dir) if n.startswith("fold-")])
+    self.update_state(
+        task_id=job_id,
+        state="PROGRESS",
+        meta={
+            "status": f"Evaluated {done} of {total_folds} folds...",
+            "folds_done": done,
+            "total_folds": total_folds,
+        },
+    )
+    logger.info(
+        f"Backtest {job_id}: fold {fold['fold']} done ({result.get('skipped', 'evaluated')})."
+    )
+    return result
+
+
+@celery_app.task(bind=True, name=BACKTEST_SUMMARY_TASK)
+def backtest_summary_task(self: Task, fold_results: list, job_id: str) -> dict:
+    """
+    Chord callback of a backtest: aggregates the fold results. It runs under
+    the id of the backtest task it replaced, so this is the backtest's result.
+    """
+    storage_service.unpin(job_id)
+    folds = sorted(fold_results, key=lambda f: f["fold"])
+    stopped = [f["fold"] for f in folds if f.get("stopped")]
+    result = {
+        "folds": [f for f in folds if not f.get("stopped")],
+        "summary": backtest_service.aggregate_folds(
+            [f for f in folds if not f.get("stopped")]
+        ),
+    }
+    if stopped:
+        result["status"] = (
+            f"Backtest stopped by the user; {len(stopped)} of {len(folds)} folds "
+            f"were not evaluated."
+        )
+        _finish_stopped(self, result)
+    storage_service.write_json(
+        os.path.join(config.BACKTESTS_DIR, job_id, backtest_service.SUMMARY_FILENAME),
+        result["summary"],
+    )
+    logger.info(
+        f"Backtest {job_id} complete: {result['summary']['evaluated_folds']} folds evaluated."
+    )
+    return result
+
+
+@celery_app.task(name=BACKTEST_FAILED_TASK)
+def backtest_failed_task(request, exc, traceback, job_id: str):
+    """
+    Error callback of a backtest's chord: when a fold fails, the summary task
+    never runs, so the pins it would have released are released here.
+    """
+    logger.error(f"Backtest {job_id} failed: {exc}")
+    storage_service.unpin(job_id)
@@ -6,6 +6,18 @@ import os
 CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL", "redis://redis:6379/0")
 CELERY_RESULT_BACKEND = os.environ.get("CELERY_RESULT_BACKEND", "redis://redis:6379/0")
 
+# --- Task Queues ---
+# Heavy CPU jobs, paced simulation streams and light bookkeeping tasks each go
+# to their own queue (routes in celery_client.py). Priorities run from 0
+# (first) to 9 within a queue.
+CPU_QUEUE = "cpu"
+LIGHT_QUEUE = "light"
+TASK_DEFAULT_PRIORITY = 5
+# Must exceed the longest task: unacknowledged tasks are re-delivered after it.
+BROKER_VISIBILITY_TIMEOUT_SECONDS = int(
+    os.environ.get("BROKER_VISIBILITY_TIMEOUT_SECONDS", str(12 * 3600))
+)
+
 # --- Directory and File Paths ---
 # Base directory for storing all persistent data
 STORAGE_BASE_DIR = os.path.join(os.path.dirname(__file__), "storage")
@@ -13,50 +25,126 @@ STORAGE_BASE_DIR = os.path.join(os.path.dirname(__file__), "storage")
 DATA_DIR = os.path.join(STORAGE_BASE_DIR, "data")
 # Directory to store model artifacts like features list, models, etc.
 ARTIFACTS_DIR = os.path.join(STORAGE_BASE_DIR, "artifacts")
+# Directory for in-progress resumable uploads (same volume as DATA_DIR, so the
+# finished file can be moved into place with a rename).
+UPLOADS_DIR = os.path.join(STORAGE_BASE_DIR, "uploads")
+# Directory for batches appended to the dataset, one file per partition.
+PARTITIONS_DIR = os.path.join(DATA_DIR, "partitions")
+# Directory for the per-partition row samples used by feature selection and splitting.
+SAMPLES_DIR = os.path.join(DATA_DIR, "samples")
+# Directory for the model registry: one sub-directory per trained model version.
+MODELS_DIR = os.path.join(ARTIFACTS_DIR, "models")
+# Directory for the cumulative drift sketches of finished simulations.
+DRIFT_SKETCHES_DIR = os.path.join(ARTIFACTS_DIR, "drift")
+# Directory for distributed training jobs (job file, worker logs, output model).
+DISTRIBUTED_JOBS_DIR = os.path.join(ARTIFACTS_DIR, "distributed")
+# Directory for bulk scoring jobs: one sub-directory per job with its uploaded
+# input (if any) and the predictions file.
+SCORING_DIR = os.path.join(STORAGE_BASE_DIR, "scoring")
+# Directory for backtest reports: one sub-directory per job with a file per
+# fold and the summary.
+BACKTESTS_DIR = os.path.join(ARTIFACTS_DIR, "backtests")
+# Directory for storage pins: one file per running task, listing the artifacts
+# it uses so they are not evicted.
+STORAGE_PINS_DIR = os.path.join(ARTIFACTS_DIR, "pins")
 
 # Ensure directories exist
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(ARTIFACTS_DIR, exist_ok=True)
+os.makedirs(UPLOADS_DIR, exist_ok=True)
+os.makedirs(PARTITIONS_DIR, exist_ok=True)
+os.makedirs(SAMPLES_DIR, exist_ok=True)
+os.makedirs(MODELS_DIR, exist_ok=True)
+os.makedirs(DRIFT_SKETCHES_DIR, exist_ok=True)
+os.makedirs(DISTRIBUTED_JOBS_DIR, exist_ok=True)
+os.makedirs(SCORING_DIR, exist_ok=True)
+os.makedirs(BACKTESTS_DIR, exist_ok=True)
+os.makedirs(STORAGE_PINS_DIR, exist_ok=True)
 
 # --- Filenames ---
 # Name for the stored dataset CSV. It's augmented with timestamps by the .NET backend.
 DATASET_FILENAME = "full_dataset_with_ts.csv"
 # Name for the file that will store the list of most important features.
 IMPORTANT_FEATURES_FILENAME = "important_features.json"
+# Name for the persisted dataset schema (dtypes, timestamp format, column flags).
+SCHEMA_FILENAME = "dataset_schema.json"
+# Name for the manifest of dataset partitions (row counts, timestamp index, samples).
+PARTITION_MANIFEST_FILENAME = "dataset_partitions.json"
+# Name for the record of which date range each split was cut from.
+SPLIT_MANIFEST_FILENAME = "split_manifest.json"
+# Name for the index of when each storage artifact was last used.
+STORAGE_ACCESS_FILENAME = "storage_access.json"
 
 # --- Filenames for split datasets ---
-TRAIN_SET_FILENAME = "train_set.csv"
-TEST_SET_FILENAME = "test_set.csv"
-SIMULATION_SET_FILENAME = "simulation_set.csv"
+# Splits are stored as sparse CSR matrices (.npz), since most sensor values are missing.
+TRAIN_SET_FILENAME = "train_set.npz"
+TEST_SET_FILENAME = "test_set.npz"
+SIMULATION_SET_FILENAME = "simulation_set.npz"
+# Every partition's training sample, sorted by timestamp, shared by all
+# backtest folds.
+BACKTEST_SET_FILENAME = "backtest_set.npz"
+# Each split also gets a cache directory (<split>.npz.cache/) of memory-mappable
+# .npy arrays, plus an XGBoost DMatrix binary buffer unless disabled.
+SPLIT_CACHE_SUFFIX = ".cache"
+SPLIT_DMATRIX_BUFFER = os.environ.get("SPLIT_DMATRIX_BUFFER", "1") == "1"
 
 # --- Model Artifact Filenames ---
 MODEL_FILENAME = "xgboost_model.joblib"
 TRAINING_CURVES_FILENAME = "training_curves.json"
+# Per-feature distribution sketch of the current model's training data.
+DRIFT_REFERENCE_FILENAME = "drift_reference.npz"
 
 # --- Full Paths ---
 # The complete path to where the dataset will be stored.
 DATASET_FILE_PATH = os.path.join(DATA_DIR, DATASET_FILENAME)
+# Where the dataset is stored instead when STORE_DATASET_COMPRESSED is enabled.
+DATASET_COMPRESSED_FILE_PATH = DATASET_FILE_PATH + ".gz"
 # The complete path to where the important features list will be saved.
 IMPORTANT_FEATURES_PATH = os.path.join(ARTIFACTS_DIR, IMPORTANT_FEATURES_FILENAME)
+# The complete path to the persisted dataset schema.
+SCHEMA_PATH = os.path.join(ARTIFACTS_DIR, SCHEMA_FILENAME)
+PARTITION_MANIFEST_PATH = os.path.join(ARTIFACTS_DIR, PARTITION_MANIFEST_FILENAME)
+SPLIT_MANIFEST_PATH = os.path.join(ARTIFACTS_DIR, SPLIT_MANIFEST_FILENAME)
+STORAGE_ACCESS_PATH = os.path.join(ARTIFACTS_DIR, STORAGE_ACCESS_FILENAME)
 
 
 # --- Full paths for split datasets ---
 TRAIN_SET_PATH = os.path.join(DATA_DIR, TRAIN_SET_FILENAME)
 TEST_SET_PATH = os.path.join(DATA_DIR, TEST_SET_FILENAME)
 SIMULATION_SET_PATH = os.path.join(DATA_DIR, SIMULATION_SET_FILENAME)
+BACKTEST_SET_PATH = os.path.join(DATA_DIR, BACKTEST_SET_FILENAME)
 
 # --- Model Artifact Full Paths ---
 MODEL_SAVE_PATH = os.path.join(ARTIFACTS_DIR, MODEL_FILENAME)
 CURVES_SAVE_PATH = os.path.join(ARTIFACTS_DIR, TRAINING_CURVES_FILENAME)
+DRIFT_REFERENCE_PATH = os.path.join(ARTIFACTS_DIR, DRIFT_REFERENCE_FILENAME)
 
 # --- ML Pipeline Constants ---
+# --- Chunked Reading ---
+# Rows per chunk are derived from a memory budget instead of being fixed: the
+# worker may use MEMORY_BUDGET_FRACTION of its container memory limit (or
+# DEFAULT_MEMORY_BUDGET_BYTES when no limit is set), and each chunk may take
+# CHUNK_MEMORY_SHARE of the headroom left below that budget.
+WORKER_MEMORY_LIMIT_BYTES = int(os.environ.get("WORKER_MEMORY_LIMIT_BYTES", "0"))
+MEMORY_BUDGET_FRACTION = float(os.environ.get("MEMORY_BUDGET_FRACTION", "0.8"))
+DEFAULT_MEMORY_BUDGET_BYTES = 4 * 1024**3
+CHUNK_MEMORY_SHARE = 0.25
+CHUNK_PARSE_OVERHEAD = 2.0  # Peak parser memory relative to the parsed frame
+CHUNK_PROBE_ROWS = 1000  # Size of the first chunk, used to measure bytes per row
+CHUNK_MIN_ROWS = 1000
+CHUNK_MAX_ROWS = 1000000
+
 # --- Feature Selection ---
-CHUNK_SIZE = 100000  # How many rows to read into memory at a time
 SAMPLE_FRACTION = 0.01  # Use 1% of data for the preliminary feature selection model
 N_TOP_FEATURES = 100  # The number of top features to select
 
 # Use 20% of the total data for training/testing, as per the notebook.
-DATA_SAMPLE_FRACTION_FOR_TRAINING = 0.20
+# Distributed training (below) makes larger fractions, up to 1.0, practical.
+DATA_SAMPLE_FRACTION_FOR_TRAINING = float(
+    os.environ.get("DATA_SAMPLE_FRACTION_FOR_TRAINING", "0.20")
+)
+# The split runs on the cpu queue; /process/split-data waits this long for it.
+SPLIT_DATA_TIMEOUT_SECONDS = float(os.environ.get("SPLIT_DATA_TIMEOUT_SECONDS", "600"))
 
 # --- Training Hyperparameters (from notebook) ---
 N_ESTIMATORS = 200
@@ -64,6 +152,40 @@ MAX_DEPTH = 5
 LEARNING_RATE = 0.1
 OBJECTIVE = "binary:logistic"
 
+# --- Continual Model Updates ---
+# An update continues boosting the registered model on rows it has not seen.
+UPDATE_EXTRA_ROUNDS = 50  # Default number of trees added by an update
+UPDATE_MAX_EXTRA_ROUNDS = 1000
+
+# --- Distributed Training ---
+# A full training with `workers` > 1 shards the train split by row range across
+# that many local processes, joined by a tracker listening on
+# DISTRIBUTED_TRACKER_HOST (an address the workers can reach).
+DISTRIBUTED_MAX_WORKERS = int(os.environ.get("DISTRIBUTED_MAX_WORKERS", "8"))
+DISTRIBUTED_TRACKER_HOST = os.environ.get("DISTRIBUTED_TRACKER_HOST", "127.0.0.1")
+DISTRIBUTED_CONNECT_TIMEOUT_SECONDS = 300
+
+# --- Backtesting ---
+# Rolling-origin backtests train one model per fold, with the hyperparameters
+# above; folds run as separate tasks, in parallel across the worker pool. Each
+# fold's model uses BACKTEST_FOLD_THREADS threads (0: all cores). A fold's
+# decision threshold is picked on the last BACKTEST_THRESHOLD_HOLDOUT_FRACTION of
+# its train window, held out of the fit, never on its test window.
+BACKTEST_MAX_FOLDS = 50
+BACKTEST_FOLD_THREADS = int(os.environ.get("BACKTEST_FOLD_THREADS", "0"))
+BACKTEST_THRESHOLD_HOLDOUT_FRACTION = 0.2
+
+# --- Evaluation ---
+# Test predictions are swept over every threshold; the decision threshold stored
+# with the model (and used by the simulation) is picked by
+# DECISION_THRESHOLD_STRATEGY: "best_mcc", "best_f1" or "default" (0.5). It is
+# picked on the last THRESHOLD_HOLDOUT_FRACTION of the training rows, which the
+# model is not fit on, and never on the test split.
+DECISION_THRESHOLD_STRATEGY = os.environ.get("DECISION_THRESHOLD_STRATEGY", "best_mcc")
+DEFAULT_DECISION_THRESHOLD = 0.5
+THRESHOLD_HOLDOUT_FRACTION = 0.2
+EVAL_CURVE_POINTS = 200  # Points kept per ROC/PR curve in the result payload
+
 # --- Data Columns ---
 ID_COLUMN = "Id"
 TARGET_COLUMN = "Response"
@@ -71,3 +193,104 @@ TIMESTAMP_COLUMN = "synthetic_timestamp"  # This column is added by the .NET bac
 
 # --- Simulation Control ---
 SIMULATION_WARMUP_PERIOD_SECONDS = 10
+# Simulations run on their own queue, consumed by a gevent worker that drives
+# many paced streams cooperatively in one process (see docker-compose.yaml).
+SIMULATION_QUEUE = "simulation"
+SIMULATION_ROW_INTERVAL_SECONDS = 1.0  # Streams emit one row per tick
+# How long a batch stays open for the other streams' rows of the same tick.
+SIMULATION_BATCH_WINDOW_SECONDS = 0.02
+# Champion/challenger runs score up to SIMULATION_MAX_MODELS models side by
+# side, SIMULATION_COMPARE_WINDOW_ROWS rows at a time.
+SIMULATION_MAX_MODELS = 5
+SIMULATION_COMPARE_WINDOW_ROWS = 100
+
+# --- Prediction Explanations ---
+# Each simulated row reports its EXPLAIN_TOP_K largest feature contributions,
+# computed EXPLAIN_WINDOW_ROWS rows at a time, off the event loop, and shared by
+# the streams of a process (EXPLAIN_CACHED_WINDOWS per model and split). While
+# the process spends more than EXPLAIN_MAX_TIME_FRACTION of the time a window
+# takes to stream on contributions, new windows use approximate contributions.
+EXPLAIN_TOP_K = 3
+EXPLAIN_WINDOW_ROWS = 100
+EXPLAIN_MAX_TIME_FRACTION = 0.02
+EXPLAIN_CACHED_WINDOWS = 32
+
+# --- Batch Scoring ---
+# Bulk scoring jobs read their input in memory-budgeted chunks (see Chunked
+# Reading) while BATCH_SCORING_THREADS threads score the chunks already read,
+# each predicting with an equal share of the cores.
+BATCH_SCORING_THREADS = int(os.environ.get("BATCH_SCORING_THREADS", "2"))
+SCORING_INPUT_FILENAME = "input.csv"
+SCORING_OUTPUT_FILENAME = "predictions.csv"
+
+# --- Cancellation ---
+# Stop requests are Redis flags the running task checks between rows/rounds.
+CANCELLATION_REDIS_URL = os.environ.get("CANCELLATION_REDIS_URL", CELERY_BROKER_URL)
+CANCELLATION_KEY_PREFIX = "task-stop:"
+CANCELLATION_FLAG_TTL_SECONDS = 24 * 3600
+CANCELLATION_CHECK_INTERVAL_SECONDS = 0.5
+
+# --- Drift Monitoring ---
+# Feature values are binned at DRIFT_BINS quantiles of the training split; each
+# simulation window of DRIFT_WINDOW_ROWS rows is scored against them (PSI and KS).
+DRIFT_BINS = 10
+DRIFT_WINDOW_ROWS = 500
+# Features with fewer observed values in a window are not scored (PSI on a
+# handful of values is mostly sampling noise; most Bosch sensors are empty).
+DRIFT_MIN_OBSERVATIONS = 30
+DRIFT_TOP_FEATURES = 10  # Most drifted features reported per window
+DRIFT_PSI_ALERT = 0.25  # Conventional threshold for a significant shift
+DRIFT_HISTORY_WINDOWS = 50  # Window summaries kept in the live payload
+
+# --- Storage Lifecycle ---
+# Everything under STORAGE_BASE_DIR counts towards STORAGE_QUOTA_BYTES (0: no
+# quota). Once storage is over the quota, or the volume has less than
+# STORAGE_MIN_FREE_BYTES free, artifacts that can be rebuilt or are no longer
+# needed (splits and caches, old model versions, downloaded or expired job
+# outputs, abandoned uploads) are evicted least recently used first, down to
+# STORAGE_EVICTION_TARGET of the quota. The dataset, the current model,
+# artifacts pinned by running tasks, open uploads and undownloaded outputs,
+# and anything used in the last STORAGE_EVICTION_GRACE_SECONDS are kept.
+STORAGE_QUOTA_BYTES = int(os.environ.get("STORAGE_QUOTA_BYTES", "0"))
+STORAGE_MIN_FREE_BYTES = int(os.environ.get("STORAGE_MIN_FREE_BYTES", str(2 * 1024**3)))
+STORAGE_EVICTION_TARGET = 0.9
+STORAGE_EVICTION_GRACE_SECONDS = int(
+    os.environ.get("STORAGE_EVICTION_GRACE_SECONDS", "900")
+)
+# Pins left by tasks that died without removing them expire after this long.
+STORAGE_PIN_TTL_SECONDS = BROKER_VISIBILITY_TIMEOUT_SECONDS
+# Open upload sessions are pinned until completed or discarded; one that gets
+# no part for this long is considered abandoned.
+UPLOAD_SESSION_TTL_SECONDS = int(
+    os.environ.get("UPLOAD_SESSION_TTL_SECONDS", str(24 * 3600))
+)
+# A finished scoring job's predictions are pinned until downloaded, or for
+# this long at most.
+SCORING_OUTPUT_TTL_SECONDS = int(
+    os.environ.get("SCORING_OUTPUT_TTL_SECONDS", str(3 * 24 * 3600))
+)
+
+# --- Resumable Uploads ---
+UPLOAD_DEFAULT_PART_SIZE = 64 * 1024 * 1024
+UPLOAD_MAX_PART_SIZE = 512 * 1024 * 1024
+
+# --- Compression ---
+# Uploads may be gzip/zstd encoded; they are always decompressed while streaming.
+# When enabled, the on-disk copy is kept as gzip, which the chunked readers
+# decompress sequentially.
+STORE_DATASET_COMPRESSED = os.environ.get("STORE_DATASET_COMPRESSED", "0") == "1"
+COMPRESSION_LEVEL = 6
+
+# --- API Startup ---
+# Wall-clock budget for importing the FastAPI app (measured ~0.7s; the ML stack
+# alone adds ~1.5s), and modules the API process must never load at import time.
+API_IMPORT_BUDGET_SECONDS = float(os.environ.get("API_IMPORT_BUDGET_SECONDS", "1.5"))
+API_FORBIDDEN_MODULES = ("pandas", "numpy", "scipy", "sklearn", "xgboost", "joblib")
+
+# --- Task Status Endpoints ---
+# Status lookups are cached briefly and shared by all pollers of the same task.
+STATUS_CACHE_TTL_SECONDS = float(os.environ.get("STATUS_CACHE_TTL_SECONDS", "0.25"))
+STATUS_CACHE_MAX_ENTRIES = 1024
+# Upper bound for the `wait` long-poll parameter and how often waiters re-check.
+STATUS_LONG_POLL_MAX_SECONDS = 30.0
+STATUS_LONG_POLL_INTERVAL_SECONDS = 0.25
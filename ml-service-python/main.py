@@ -1,12 +1,46 @@
+import time
+
+_import_started = time.perf_counter()
+
+import sys
+import logging
 import uvicorn
 from fastapi import FastAPI
-from routes import dataset_routes, training_routes, simulation_routes
+from routes import (
+    dataset_routes,
+    training_routes,
+    simulation_routes,
+    scoring_routes,
+    storage_routes,
+)
+import config
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="ML Microservice - ABB Hackathon")
 
 app.include_router(dataset_routes.router)
 app.include_router(training_routes.router)
 app.include_router(simulation_routes.router)
+app.include_router(scoring_routes.router)
+app.include_router(storage_routes.router)
+
+# --- Import Budget Check ---
+# The API only enqueues Celery tasks and reads their results, so importing it must
+# stay cheap and must not load the ML stack. Loaded heavy modules or a blown time
+# budget point to a regression (e.g. a route importing celery_worker directly).
+# tests/test_api_import.py enforces both; here they are only logged.
+API_IMPORT_SECONDS = time.perf_counter() - _import_started
+_heavy_modules_loaded = [m for m in config.API_FORBIDDEN_MODULES if m in sys.modules]
+if _heavy_modules_loaded:
+    logger.warning(
+        f"API process imported heavy modules at startup: {_heavy_modules_loaded}"
+    )
+if API_IMPORT_SECONDS > config.API_IMPORT_BUDGET_SECONDS:
+    logger.warning(
+        f"API import took {API_IMPORT_SECONDS:.2f}s, over the "
+        f"{config.API_IMPORT_BUDGET_SECONDS:.2f}s budget."
+    )
 
 
 @app.get("/")
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
-from datetime import datetime
-from typing import List, Any, Dict, Optional, Union
+from datetime import datetime, timezone
+from typing import List, Any, Dict, Literal, Optional, Union
 
 # --- Stage 1 ---
 
@@ -30,6 +30,81 @@ class TaskAcceptedResponse(BaseModel):
     )
 
 
+class UploadSessionRequest(BaseModel):
+    """
+    Defines the request to open a resumable, multi-part dataset upload.
+    """
+
+    filename: str = Field(..., example="train_numeric.csv")
+    total_size: int = Field(..., gt=0, description="Size of the whole file in bytes.")
+    part_size: Optional[int] = Field(
+        None, gt=0, description="Size of every part but the last, in bytes."
+    )
+
+
+class UploadSessionResponse(BaseModel):
+    """
+    Describes a resumable upload session and the parts it has received so far.
+    Parts are numbered from 0 to part_count - 1.
+    """
+
+    upload_id: str
+    filename: str
+    total_size: int
+    part_size: int
+    part_count: int
+    received_parts: List[int] = []
+    missing_parts: List[int] = []
+
+
+class UploadPartResponse(BaseModel):
+    upload_id: str
+    part_number: int
+    size: int
+
+
+class PartitionAcceptedResponse(BaseModel):
+    """
+    Defines the response for a batch accepted by `/dataset/append`.
+    """
+
+    message: str
+    partition_id: str = Field(..., example="part-000001")
+    partition_path: str
+
+
+class PartitionInfo(BaseModel):
+    """
+    Describes one dataset partition: the uploaded base file or an appended batch.
+    """
+
+    id: str
+    status: str = Field(..., example="ready")
+    rows: Optional[int] = None
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    daily_counts: Dict[str, int] = {}
+    invalidated_splits: List[str] = []
+    error: Optional[str] = None
+
+    @classmethod
+    def from_manifest(cls, entry: dict) -> "PartitionInfo":
+        def to_datetime(ns):
+            return (
+                None if ns is None else datetime.fromtimestamp(ns / 1e9, timezone.utc)
+            )
+
+        return cls(
+            **{k: v for k, v in entry.items() if k in cls.model_fields},
+            start=to_datetime(entry.get("ts_min")),
+            end=to_datetime(entry.get("ts_max")),
+        )
+
+
+class DatasetPartitionsResponse(BaseModel):
+    partitions: List[PartitionInfo]
+
+
 # --- Stage 2 ---
 
 
@@ -71,6 +146,7 @@ class Metrics(BaseModel):
     precision: float
     recall: float
     f1_score: float
+    mcc: Optional[float] = None  # Matthews correlation coefficient
 
 
 class ChartDataPoint(BaseModel):
@@ -90,15 +166,162 @@ class ConfusionMatrix(BaseModel):
     false_negatives: int
 
 
+class ModelComparison(BaseModel):
+    """
+    Compares an updated model with the model it continued from, on the same test split.
+    """
+
+    previous_model_id: str
+    previous_metrics: Metrics
+    previous_confusion_matrix: ConfusionMatrix
+    metric_deltas: Dict[str, float]  # updated minus previous
+    train_rows: int
+    extra_rounds: int
+    refresh_leaves: bool
+
+
+class ThresholdChoice(BaseModel):
+    threshold: float  # Rows with P(fail) >= threshold are predicted "Fail"
+    precision: float
+    recall: float
+    f1_score: float
+    mcc: float
+
+
+class CurvePoint(BaseModel):
+    x: float
+    y: float
+    threshold: float
+
+
+class EvaluationReport(BaseModel):
+    """
+    Test-set evaluation over every decision threshold. The result's metrics and
+    confusion matrix are taken at `threshold`, picked by `strategy` on rows
+    held out of the training data; best_f1 and best_mcc are the best-case
+    thresholds on the test split itself, for reference.
+    """
+
+    strategy: str
+    threshold: float
+    threshold_source: Optional[str] = None  # "holdout", or "default" (0.5)
+    default_metrics: Metrics  # At the 0.5 threshold, for reference
+    best_f1: ThresholdChoice
+    best_mcc: ThresholdChoice
+    roc_auc: float
+    average_precision: float
+    roc_curve: List[CurvePoint]  # x: false positive rate, y: recall
+    pr_curve: List[CurvePoint]  # x: recall, y: precision
+
+
 class TrainingResult(BaseModel):
     metrics: Metrics
     training_chart: TrainingChart
     confusion_matrix: ConfusionMatrix
     model_path: str
     curves_path: str
+    model_id: Optional[str] = None
+    mode: str = "full"
+    comparison: Optional[ModelComparison] = None  # Only for updates
+    evaluation: Optional[EvaluationReport] = None
 
 
 # --- Main Response Models for the Endpoints ---
+class TrainingRequest(BaseModel):
+    """
+    Optional body of the training endpoint. "update" continues boosting the
+    registered model on data it has not seen instead of training from scratch.
+    """
+
+    mode: Literal["full", "update"] = "full"
+    extra_rounds: Optional[int] = Field(
+        None, gt=0, description="Trees to add in update mode (default 50)."
+    )
+    refresh_leaves: bool = Field(
+        False, description="Refresh the existing trees' leaves on the new data first."
+    )
+    workers: int = Field(
+        1,
+        ge=1,
+        description="Full training only: train data-parallel on this many processes.",
+    )
+
+
+class ModelInfo(BaseModel):
+    id: str
+    parent_id: Optional[str] = None
+    mode: str
+    created_at: datetime
+    n_rounds: int
+    train_rows: int
+    workers: int = 1
+    metrics: Metrics
+    threshold: Optional[float] = None  # Decision threshold used for predictions
+    current: bool = False
+
+
+class ModelListResponse(BaseModel):
+    models: List[ModelInfo]
+
+
+class BacktestRequest(BaseModel):
+    """
+    A rolling-origin backtest: folds of `train_days` of training data followed
+    by `test_days` of test data, moved forward by `step_days` each time.
+    """
+
+    train_days: float = Field(..., gt=0, example=14)
+    test_days: float = Field(..., gt=0, example=3)
+    step_days: Optional[float] = Field(
+        None, gt=0, description="Distance between fold origins (default: test_days)."
+    )
+    start_date: Optional[datetime] = Field(
+        None, description="Start of the first train window (default: first record)."
+    )
+    end_date: Optional[datetime] = Field(
+        None, description="Latest end of a test window (default: last record)."
+    )
+    max_folds: Optional[int] = Field(None, ge=1)
+
+
+class MetricSpread(BaseModel):
+    mean: float
+    std: float
+    min: float
+    max: float
+
+
+class BacktestFold(BaseModel):
+    fold: int
+    train_start: datetime
+    test_start: datetime
+    test_end: datetime
+    train_rows: int
+    test_rows: int
+    test_failures: int
+    skipped: Optional[str] = None  # Why the fold was not evaluated
+    rounds: Optional[int] = None
+    threshold: Optional[float] = None  # Picked on the train window's holdout
+    threshold_source: Optional[str] = None  # "holdout", or "default" (0.5)
+    metrics: Optional[Metrics] = None
+    confusion_matrix: Optional[ConfusionMatrix] = None
+    roc_auc: Optional[float] = None
+    average_precision: Optional[float] = None
+
+
+class BacktestSummary(BaseModel):
+    folds: int
+    evaluated_folds: int
+    skipped_folds: int
+    metrics: Dict[str, MetricSpread]  # Across the evaluated folds
+    confusion_matrix: Optional[ConfusionMatrix] = None  # Summed over the folds
+
+
+class BacktestResult(BaseModel):
+    folds: List[BacktestFold]
+    summary: BacktestSummary
+
+
 class TrainingStartResponse(BaseModel):
     task_id: str
 
@@ -123,12 +346,20 @@ class SimpleStatusProgress(BaseModel):
 
 
 # --- Sub-models for the real-time data packet ---
+class FeatureContribution(BaseModel):
+    feature: str
+    value: Optional[float] = None  # None when the sensor reading is missing
+    contribution: float  # Log-odds pushed towards "Fail" (negative: towards "Pass")
+
+
 class LivePredictionData(BaseModel):
     timestamp: datetime
     sample_id: str
     prediction: str  # 'Pass' or 'Fail'
     confidence: float  # 0-100
     top_features: Dict[str, Any]  # e.g., {"L3_S38_F3960": 0.123, ...}
+    # Why this part got its prediction: its largest feature contributions.
+    top_contributors: Optional[List[FeatureContribution]] = None
 
 
 class LiveStatistics(BaseModel):
@@ -138,6 +369,63 @@ class LiveStatistics(BaseModel):
     average_confidence: float  # 0-100
 
 
+class DriftFeatureScore(BaseModel):
+    feature: str
+    psi: float  # Population stability index vs. the training distribution
+    ks: float  # Max CDF distance (Kolmogorov-Smirnov statistic) over the bins
+    null_rate: float
+    reference_null_rate: float
+
+
+class DriftWindowSummary(BaseModel):
+    window: int
+    max_psi: float
+    mean_psi: float
+    drifting_features: int
+
+
+class DriftReport(BaseModel):
+    window: int  # Index of the last scored window
+    rows: int
+    max_psi: float
+    mean_psi: float
+    drifting_features: int  # Features above the PSI alert threshold
+    features: List[DriftFeatureScore]  # Most drifted features first
+    history: List[DriftWindowSummary] = []
+
+
+class ModelPrediction(BaseModel):
+    model_id: str
+    prediction: str  # 'Pass' or 'Fail'
+    confidence: float  # 0-100
+    agrees_with_champion: bool
+
+
+class ModelLiveStatistics(LiveStatistics):
+    model_id: str
+    threshold: float
+    disagreement_rate: float  # Share of rows predicted differently from the champion
+    # Against the rows' actual labels ("Fail" is positive)
+    true_positives: int
+    false_positives: int
+    false_negatives: int
+    mcc: float
+
+
+class ChallengerComparison(BaseModel):
+    """
+    Side-by-side view of a champion/challenger simulation; the champion is
+    the first model. The running totals (rows, disagreement_rate, models) are
+    sent on the first row, every SIMULATION_COMPARE_WINDOW_ROWS rows and on
+    the last row; the other rows carry only their predictions.
+    """
+
+    predictions: List[ModelPrediction]  # This row, per model
+    rows: Optional[int] = None
+    disagreement_rate: Optional[float] = None  # Share of rows where any model disagrees
+    models: Optional[List[ModelLiveStatistics]] = None
+
+
 # --- The main progress payload for each update ---
 class SimulationProgress(BaseModel):
     current_row_index: int
@@ -145,9 +433,22 @@ class SimulationProgress(BaseModel):
     quality_score: float  # For the main line chart
     live_prediction: LivePredictionData  # For the table
     live_stats: LiveStatistics  # For the metric cards & donut chart
+    drift: Optional[DriftReport] = None  # Only on the row that closes a drift window
+    comparison: Optional[ChallengerComparison] = None  # Champion/challenger runs only
 
 
 # --- Main Response Models for the Endpoints ---
+class SimulationRequest(BaseModel):
+    """
+    Optional body of a simulation start: the registered models to compare.
+    """
+
+    model_ids: Optional[List[str]] = Field(
+        None,
+        description="Models to score every row with, champion first (default: the current model only).",
+    )
+
+
 class SimulationStartResponse(BaseModel):
     task_id: str
 
@@ -157,8 +458,98 @@ class SimulationStopResponse(BaseModel):
     message: str
 
 
+class TrainingStopResponse(BaseModel):
+    task_id: str
+    message: str
+
+
+class BacktestStopResponse(BaseModel):
+    task_id: str
+    message: str
+
+
+class BacktestStatusResponse(BaseModel):
+    task_id: str
+    status: str  # PENDING, PROGRESS, SUCCESS, FAILURE, STOPPED
+    progress: Optional[Dict[str, Any]] = None  # {"status", "folds_done", "total_folds"}
+    result: Optional[BacktestResult] = None  # Also the evaluated folds when STOPPED
+
+
 class SimulationStatusResponse(BaseModel):
     task_id: str
     status: str  # PENDING, PROGRESS, SUCCESS, FAILURE
     progress: Optional[Union[SimulationProgress, SimpleStatusProgress]] = None
     result: Optional[Dict[str, Any]] = None  # Final summary message
+
+
+# --- Batch Scoring ---
+
+
+class ScoringRequest(BaseModel):
+    """
+    Defines a bulk scoring job for a CSV file already in storage.
+    """
+
+    path: str = Field(
+        ...,
+        example="data/full_dataset_with_ts.csv",
+        description="Path of the CSV (plain, .gz or .zst), relative to the storage directory.",
+    )
+
+
+class ScoringJobResponse(BaseModel):
+    task_id: str
+    model_id: str  # The model version the job scores with
+    message: str
+
+
+class ScoringStopResponse(BaseModel):
+    task_id: str
+    message: str
+
+
+class ScoringResult(BaseModel):
+    message: str
+    rows: int
+    fail_count: int
+    pass_count: int
+    seconds: float
+    rows_per_second: float
+    model_id: str
+    threshold: float
+    output_file: Optional[str] = None  # Absent when the job was stopped
+
+
+class ScoringStatusResponse(BaseModel):
+    task_id: str
+    status: str  # PENDING, PROGRESS, SUCCESS, FAILURE, STOPPED
+    # {"status", "rows", "fail_count", "bytes_read", "total_bytes", "percent", "rows_per_second"}
+    progress: Optional[Dict[str, Any]] = None
+    result: Optional[ScoringResult] = None
+
+
+class StorageArtifact(BaseModel):
+    key: str  # Path relative to the storage directory
+    kind: str  # dataset, sample, split, cache, model, scoring, backtest, drift, ...
+    bytes: int
+    last_access: datetime
+    pinned: bool  # Used by a running task, or the current model
+    evictable: bool
+
+
+class StorageUsageResponse(BaseModel):
+    quota_bytes: int  # 0 when no quota is set
+    used_bytes: int
+    evictable_bytes: int  # Evictable and not pinned
+    pinned_bytes: int
+    disk_total_bytes: int
+    disk_free_bytes: int
+    over_quota: bool
+    by_kind: Dict[str, int]
+    artifacts: List[StorageArtifact]  # Least recently used first
+
+
+class StorageEvictionResponse(BaseModel):
+    evicted: List[StorageArtifact]
+    freed_bytes: int
+    used_bytes: int
@@ -1,10 +1,23 @@
 import os
 import asyncio
-import aiofiles
 import logging
-from fastapi import APIRouter, HTTPException, status, BackgroundTasks, Request
-from models.response_models import TaskAcceptedResponse
-from services import feature_selection_service
+from fastapi import APIRouter, HTTPException, status, Request, Header
+from models.response_models import (
+    TaskAcceptedResponse,
+    UploadSessionRequest,
+    UploadSessionResponse,
+    UploadPartResponse,
+    PartitionAcceptedResponse,
+    PartitionInfo,
+    DatasetPartitionsResponse,
+)
+from services import (
+    compression_service,
+    partition_service,
+    storage_service,
+    upload_session_service,
+)
+from celery_client import celery_app, SELECT_FEATURES_TASK, INGEST_PARTITION_TASK
 import config
 
 # Configure logging
@@ -15,12 +28,28 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/dataset", tags=["1. Dataset Ingestion & Feature Selection"])
 
 
+async def _decoded_stream(request_stream, encoding: str):
+    """
+    Decompresses a request body sent with a gzip/zstd Content-Encoding.
+    """
+    decoder = compression_service.StreamDecompressor(encoding)
+    async for chunk in request_stream:
+        plain = decoder.decompress(chunk)
+        if plain:
+            yield plain
+    tail = decoder.flush()
+    if tail:
+        yield tail
+
+
 class StreamingMultipartParser:
     """Custom streaming multipart parser that writes directly to file"""
 
-    def __init__(self, boundary: str, output_path: str):
+    def __init__(self, boundary: str, output_path: str, compress: bool = False):
         self.boundary = boundary.encode()
         self.output_path = output_path
+        self.compress = compress
+        self.bytes_stored = 0
         self.boundary_pattern = b"--" + self.boundary
         self.end_boundary_pattern = b"--" + self.boundary + b"--"
 
@@ -33,7 +62,10 @@ class StreamingMultipartParser:
         # Create output directory if needed
         os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
 
-        async with aiofiles.open(self.output_path, "wb") as output_file:
+        # The writer decompresses gzip/zstd file content on the fly (detected from
+        # its magic bytes) and optionally stores it as gzip.
+        writer = compression_service.DatasetWriter(self.output_path, self.compress)
+        try:
             async for chunk in request_stream:
                 buffer += chunk
 
@@ -57,7 +89,9 @@ class StreamingMultipartParser:
                             state = "reading_file"
                             buffer = buffer[headers_end + 4 :]  # Skip the \r\n\r\n
 
-                elif state == "reading_file":
+                # Not an elif: a decoded body can deliver headers and the whole
+                # file in a single chunk.
+                if state == "reading_file":
                     # Look for boundary in buffer
                     while True:
                         boundary_pos = buffer.find(self.boundary_pattern)
@@ -71,7 +105,7 @@ class StreamingMultipartParser:
                                 data_end -= 2
 
                             if data_end > 0:
-                                await output_file.write(buffer[:data_end])
+                                await asyncio.to_thread(writer.write, buffer[:data_end])
                                 bytes_written += data_end
 
                             return bytes_written, filename
@@ -84,7 +118,7 @@ class StreamingMultipartParser:
                                 data_end -= 2
 
                             if data_end > 0:
-                                await output_file.write(buffer[:data_end])
+                                await asyncio.to_thread(writer.write, buffer[:data_end])
                                 bytes_written += data_end
 
                             return bytes_written, filename
@@ -96,7 +130,9 @@ class StreamingMultipartParser:
                                 write_amount = (
                                     len(buffer) - len(self.boundary_pattern) - 10
                                 )
-                                await output_file.write(buffer[:write_amount])
+                                await asyncio.to_thread(
+                                    writer.write, buffer[:write_amount]
+                                )
                                 bytes_written += write_amount
                                 buffer = buffer[write_amount:]
 
@@ -111,79 +147,301 @@ class StreamingMultipartParser:
 
             # Write any remaining buffer
             if buffer:
-                await output_file.write(buffer)
+                await asyncio.to_thread(writer.write, buffer)
                 bytes_written += len(buffer)
+        finally:
+            await asyncio.to_thread(writer.close)
+            self.bytes_stored = writer.bytes_out
 
         return bytes_written, filename
 
 
-@router.post(
-    "/store", response_model=TaskAcceptedResponse, status_code=status.HTTP_202_ACCEPTED
-)
-async def store_dataset_and_select_features(
-    request: Request, background_tasks: BackgroundTasks
-):
+async def _receive_multipart_file(request: Request, output_path: str):
     """
-    Accepts a dataset via streaming, stores it directly to disk without using
-    temporary files, and triggers feature selection in the background.
-    This approach avoids disk space issues in /tmp and improves performance.
+    Streams the file of a multipart/form-data request to `output_path`,
+    decoding a compressed request body or file on the way.
+    Returns the number of bytes received and the uploaded file's name.
     """
-    try:
-        # Validate content type
-        content_type = request.headers.get("content-type", "")
-        if not content_type.startswith("multipart/form-data"):
-            raise HTTPException(
-                status_code=400, detail="Content-Type must be multipart/form-data"
-            )
+    # Validate content type
+    content_type = request.headers.get("content-type", "")
+    if not content_type.startswith("multipart/form-data"):
+        raise HTTPException(
+            status_code=400, detail="Content-Type must be multipart/form-data"
+        )
 
-        # Extract boundary
-        boundary = None
-        for part in content_type.split(";"):
-            part = part.strip()
-            if part.startswith("boundary="):
-                boundary = part.split("=", 1)[1].strip('"')
-                break
+    # Extract boundary
+    boundary = None
+    for part in content_type.split(";"):
+        part = part.strip()
+        if part.startswith("boundary="):
+            boundary = part.split("=", 1)[1].strip('"')
+            break
+
+    if not boundary:
+        raise HTTPException(
+            status_code=400, detail="No boundary found in Content-Type header"
+        )
 
-        if not boundary:
-            raise HTTPException(
-                status_code=400, detail="No boundary found in Content-Type header"
-            )
+    # A compressed request body (Content-Encoding) is decoded before parsing;
+    # a compressed file inside the form is detected by its magic bytes.
+    body_encoding = compression_service.detect_encoding(
+        request.headers.get("content-encoding")
+    )
+    request_stream = request.stream()
+    if body_encoding:
+        request_stream = _decoded_stream(request_stream, body_encoding)
 
-        logger.info(f"Starting streaming upload with boundary: {boundary[:20]}...")
+    logger.info(f"Starting streaming upload with boundary: {boundary[:20]}...")
 
-        # Use streaming parser
-        parser = StreamingMultipartParser(boundary, config.DATASET_FILE_PATH)
-        bytes_written, filename = await parser.parse_and_save(request.stream())
+    # Use streaming parser
+    parser = StreamingMultipartParser(
+        boundary, output_path, output_path.endswith(".gz")
+    )
+    bytes_written, filename = await parser.parse_and_save(request_stream)
 
-        if bytes_written == 0:
-            raise HTTPException(status_code=400, detail="No file data received")
+    if bytes_written == 0:
+        raise HTTPException(status_code=400, detail="No file data received")
 
-        logger.info(
-            f"Successfully streamed {filename} ({bytes_written / (1024*1024):.2f}MB) "
-            f"to {config.DATASET_FILE_PATH}"
-        )
+    logger.info(
+        f"Successfully streamed {filename} ({bytes_written / (1024*1024):.2f}MB received, "
+        f"{parser.bytes_stored / (1024*1024):.2f}MB of CSV) to {output_path}"
+    )
+    return bytes_written, filename
+
+
+@router.post(
+    "/store", response_model=TaskAcceptedResponse, status_code=status.HTTP_202_ACCEPTED
+)
+async def store_dataset_and_select_features(request: Request):
+    """
+    Accepts a dataset via streaming, stores it to disk without going through
+    /tmp, and triggers feature selection in the background. The file is
+    written next to the dataset under a temporary name and only replaces the
+    dataset once it is complete, so readers never see a partial upload.
+    """
+    output_path = compression_service.storage_path()
+    tmp_path = storage_service.temp_path(output_path)
+    try:
+        bytes_written, filename = await _receive_multipart_file(request, tmp_path)
+        compression_service.move_into_place(tmp_path, output_path)
+        compression_service.remove_stale_copies(keep=output_path)
 
         # Validate CSV extension
-        if not filename.lower().endswith((".csv", ".txt")):
+        if not filename.lower().endswith((".csv", ".txt", ".gz", ".zst")):
             logger.warning(f"File {filename} may not be a CSV file")
 
     except HTTPException:
+        compression_service.discard_partial(tmp_path)
         raise
+    except compression_service.UnsupportedEncoding as e:
+        compression_service.discard_partial(tmp_path)
+        raise HTTPException(status_code=415, detail=str(e))
+    except compression_service.CorruptCompressedData as e:
+        compression_service.discard_partial(tmp_path)
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to process streaming upload: {e}")
-        # Clean up partial file
-        try:
-            if os.path.exists(config.DATASET_FILE_PATH):
-                os.remove(config.DATASET_FILE_PATH)
-        except:
-            pass
+        # Clean up the partial file; the previous dataset is left in place.
+        compression_service.discard_partial(tmp_path)
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
-    # Trigger feature selection in background
+    return _queue_feature_selection()
+
+
+def _queue_feature_selection() -> TaskAcceptedResponse:
+    """
+    Triggers feature selection on a worker once a dataset is in place.
+    """
+    # A full upload replaces the dataset, so batches appended to the previous
+    # one and every partition sample are dropped.
+    partition_service.reset_partitions()
+
+    # The scan runs on the cpu queue rather than in the API process, where it
+    # would hold the GIL while requests wait.
     logger.info("Queuing feature selection task")
-    background_tasks.add_task(feature_selection_service.run_feature_selection)
+    celery_app.send_task(SELECT_FEATURES_TASK)
 
     return TaskAcceptedResponse(
         message="Dataset uploaded successfully. Feature selection running in background.",
-        dataset_path=config.DATASET_FILE_PATH,
+        dataset_path=compression_service.dataset_path(),
+    )
+
+
+# --- Resumable, parallel uploads ---
+
+
+@router.post(
+    "/uploads",
+    response_model=UploadSessionResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_upload_session(request: UploadSessionRequest):
+    """
+    Opens a resumable upload. The client then PUTs numbered parts (in any order,
+    in parallel), can query which parts arrived, and finally completes the upload.
+    """
+    try:
+        session = upload_session_service.create_session(
+            request.filename, request.total_size, request.part_size
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return UploadSessionResponse(
+        **session, missing_parts=list(range(session["part_count"]))
+    )
+
+
+@router.put(
+    "/uploads/{upload_id}/parts/{part_number}", response_model=UploadPartResponse
+)
+async def upload_part(
+    upload_id: str,
+    part_number: int,
+    request: Request,
+    x_checksum_sha256: str = Header(..., description="Hex SHA-256 of the part body."),
+):
+    """
+    Receives one part as the raw request body and writes it at its offset.
+    """
+    try:
+        result = await upload_session_service.write_part(
+            upload_id, part_number, request.stream(), x_checksum_sha256
+        )
+    except upload_session_service.UploadSessionNotFound:
+        raise HTTPException(status_code=404, detail="Upload session not found.")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return UploadPartResponse(**result)
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def get_upload_session(upload_id: str):
+    """
+    Reports which parts have been received and verified, so a client can resume.
+    """
+    try:
+        return UploadSessionResponse(
+            **upload_session_service.get_session_status(upload_id)
+        )
+    except upload_session_service.UploadSessionNotFound:
+        raise HTTPException(status_code=404, detail="Upload session not found.")
+
+
+@router.post(
+    "/uploads/{upload_id}/complete",
+    response_model=TaskAcceptedResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def complete_upload_session(upload_id: str):
+    """
+    Moves the fully received upload into place as the dataset (decompressing a
+    gzip/zstd upload) and triggers feature selection, exactly like `/dataset/store`.
+
+    The session is removed once the dataset is in place, or when its data can
+    never be installed (unsupported or corrupt compression). On any other
+    failure (e.g. a full disk) it is kept, so the client can complete it again.
+    """
+    try:
+        session = upload_session_service.finalize_session(upload_id)
+    except upload_session_service.UploadSessionNotFound:
+        raise HTTPException(status_code=404, detail="Upload session not found.")
+    except upload_session_service.UploadIncomplete as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    try:
+        # Compressed uploads are decompressed here; plain ones are just renamed.
+        dataset_path = await asyncio.to_thread(
+            compression_service.install_dataset_file, session["data_path"]
+        )
+    except compression_service.UnsupportedEncoding as e:
+        upload_session_service.discard_session(upload_id)
+        raise HTTPException(status_code=415, detail=str(e))
+    except compression_service.CorruptCompressedData as e:
+        upload_session_service.discard_session(upload_id)
+        raise HTTPException(status_code=400, detail=str(e))
+    except OSError as e:
+        logger.error(f"Failed to install upload {upload_id}: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail=f"Could not store the dataset ({e}); the upload is kept, "
+            "complete it again to retry.",
+        )
+    upload_session_service.discard_session(upload_id)
+
+    logger.info(
+        f"Completed resumable upload of {session['filename']} "
+        f"({session['total_size'] / (1024*1024):.2f}MB) to {dataset_path}"
+    )
+    return _queue_feature_selection()
+
+
+# --- Incremental appends ---
+
+
+@router.post(
+    "/append",
+    response_model=PartitionAcceptedResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def append_dataset_batch(request: Request):
+    """
+    Appends a batch of new rows (a CSV with the dataset's columns, sent like
+    `/dataset/store`) as a new partition. Only the new batch is scanned: the
+    schema statistics, timestamp index and samples are updated incrementally,
+    and only the splits whose date range overlaps the new rows are invalidated.
+    Feature selection is not re-run; the selected features stay as they are.
+    """
+    if not os.path.exists(compression_service.dataset_path()):
+        raise HTTPException(
+            status_code=409,
+            detail="No dataset to append to. Upload one with /dataset/store first.",
+        )
+
+    entry = partition_service.create_partition(config.STORE_DATASET_COMPRESSED)
+    try:
+        await _receive_multipart_file(request, entry["path"])
+        header = compression_service.read_csv_header(entry["path"])
+        expected = compression_service.read_csv_header(
+            compression_service.dataset_path()
+        )
+        if set(header) != set(expected):
+            raise HTTPException(
+                status_code=422,
+                detail=f"The batch has {len(header)} columns that do not match the "
+                f"dataset's {len(expected)} columns.",
+            )
+    except HTTPException:
+        partition_service.remove_partition(entry["id"])
+        raise
+    except compression_service.UnsupportedEncoding as e:
+        partition_service.remove_partition(entry["id"])
+        raise HTTPException(status_code=415, detail=str(e))
+    except compression_service.CorruptCompressedData as e:
+        partition_service.remove_partition(entry["id"])
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to receive appended batch: {e}")
+        partition_service.remove_partition(entry["id"])
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+    partition_service.update_partition(
+        entry["id"], status=partition_service.STATUS_INGESTING
+    )
+    celery_app.send_task(INGEST_PARTITION_TASK, args=[entry["id"]])
+    return PartitionAcceptedResponse(
+        message="Batch received. Ingesting it as a new partition in the background.",
+        partition_id=entry["id"],
+        partition_path=entry["path"],
+    )
+
+
+@router.get("/partitions", response_model=DatasetPartitionsResponse)
+async def list_dataset_partitions():
+    """
+    Lists the partitions of the dataset with their ingestion status, row count
+    and timestamp index. The uploaded file appears as "base" once it was scanned.
+    """
+    manifest = partition_service.load_manifest()
+    return DatasetPartitionsResponse(
+        partitions=[PartitionInfo.from_manifest(p) for p in manifest["partitions"]]
     )
@@ -0,0 +1,141 @@
+import os
+import shutil
+import logging
+from fastapi import APIRouter, Body, HTTPException, Query, Request, status
+from fastapi.responses import FileResponse
+from routes import dataset_routes
+from services import (
+    compression_service,
+    scoring_service,
+    storage_service,
+    task_status_service,
+)
+from models.response_models import (
+    ScoringRequest,
+    ScoringJobResponse,
+    ScoringStopResponse,
+    ScoringStatusResponse,
+)
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/scoring", tags=["4. Batch Scoring"])
+
+
+def _accepted(job: dict, source: str) -> ScoringJobResponse:
+    return ScoringJobResponse(
+        task_id=job["task_id"],
+        model_id=job["model_id"],
+        message=f"Scoring of {source} queued with model {job['model_id']}.",
+    )
+
+
+@router.post(
+    "/jobs", response_model=ScoringJobResponse, status_code=status.HTTP_202_ACCEPTED
+)
+async def start_scoring_job(request: ScoringRequest = Body(...)):
+    """
+    Scores every row of a CSV file already in storage with the current model.
+    Poll the returned task ID for progress, then download the predictions.
+    """
+    try:
+        input_path = scoring_service.resolve_input_path(request.path)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        job = scoring_service.start_scoring(input_path)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to start scoring task: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to queue scoring task.")
+    return _accepted(job, request.path)
+
+
+@router.post(
+    "/jobs/upload",
+    response_model=ScoringJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def upload_and_score(request: Request):
+    """
+    Streams an uploaded CSV (multipart/form-data, optionally gzip/zstd encoded)
+    into the job's directory and scores it with the current model.
+    """
+    job_id = scoring_service.new_job_id()
+    try:
+        input_path = scoring_service.upload_path(job_id)
+        _, filename = await dataset_routes._receive_multipart_file(request, input_path)
+        job = scoring_service.start_scoring(input_path, job_id)
+    except Exception as e:
+        # The job never started, so nothing else refers to its directory.
+        shutil.rmtree(os.path.dirname(input_path), ignore_errors=True)
+        storage_service.unpin(job_id)
+        if isinstance(e, HTTPException):
+            raise
+        if isinstance(e, compression_service.UnsupportedEncoding):
+            raise HTTPException(status_code=415, detail=str(e))
+        if isinstance(e, compression_service.CorruptCompressedData):
+            raise HTTPException(status_code=400, detail=str(e))
+        if isinstance(e, ValueError):
+            raise HTTPException(status_code=409, detail=str(e))
+        logger.error(f"Failed to start scoring of an upload: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+    return _accepted(job, filename)
+
+
+@router.post("/jobs/{task_id}/stop", response_model=ScoringStopResponse)
+async def stop_scoring_job(task_id: str):
+    """
+    Stops a running scoring job before its next chunk.
+    """
+    try:
+        scoring_service.stop_scoring(task_id)
+        return ScoringStopResponse(
+            task_id=task_id, message="Stop signal sent to scoring task."
+        )
+    except Exception as e:
+        logger.error(f"Failed to stop task {task_id}: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to send stop signal.")
+
+
+@router.get("/jobs/{task_id}", response_model=ScoringStatusResponse)
+async def get_scoring_status(
+    request: Request,
+    task_id: str,
+    wait: float = Query(
+        0.0, ge=0, description="Long-poll: seconds to wait for a state change."
+    ),
+):
+    """
+    Polls for the progress or final summary of a scoring job.
+    Send the last ETag in If-None-Match to get a 304 when nothing changed, and
+    together with `wait` to block until the next update.
+    """
+    return await task_status_service.status_response(
+        request, task_id, scoring_service.build_scoring_status, wait
+    )
+
+
+@router.get("/jobs/{task_id}/output")
+async def download_predictions(task_id: str):
+    """
+    Downloads the predictions of a finished scoring job as CSV
+    (Id, fail_probability, prediction). Once downloaded, the job's files may be
+    evicted after the storage grace period.
+    """
+    path = scoring_service.output_path(task_id)
+    if not os.path.exists(path):
+        raise HTTPException(
+            status_code=404, detail="No predictions for this job (yet)."
+        )
+    storage_service.record_access(os.path.dirname(path))
+    storage_service.unpin(task_id)
+    return FileResponse(
+        path, media_type="text/csv", filename=f"predictions-{task_id}.csv"
+    )
@@ -1,7 +1,9 @@
 import logging
-from fastapi import APIRouter, HTTPException
-from services import simulation_service
+from typing import Optional
+from fastapi import APIRouter, Body, HTTPException, Query, Request
+from services import simulation_service, task_status_service
 from models.response_models import (
+    SimulationRequest,
     SimulationStartResponse,
     SimulationStopResponse,
     SimulationStatusResponse,
@@ -16,13 +18,22 @@ router = APIRouter(prefix="/simulation", tags=["3. Real-Time Simulation"])
 
 
 @router.post("/start", response_model=SimulationStartResponse)
-async def start_realtime_simulation():
+async def start_realtime_simulation(request: Optional[SimulationRequest] = Body(None)):
     """
     Triggers the real-time inference simulation in the background.
+
+    Send `{"model_ids": [champion, challenger, ...]}` to score every row with
+    several registered models in the same pass and compare them live.
     """
     try:
-        task_id = simulation_service.start_simulation()
+        task_id = simulation_service.start_simulation(
+            request.model_ids if request else None
+        )
         return SimulationStartResponse(task_id=task_id)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to start simulation task: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to queue simulation task.")
@@ -44,9 +55,18 @@ async def stop_realtime_simulation(task_id: str):
 
 
 @router.get("/status/{task_id}", response_model=SimulationStatusResponse)
-async def get_simulation_status(task_id: str):
+async def get_simulation_status(
+    request: Request,
+    task_id: str,
+    wait: float = Query(
+        0.0, ge=0, description="Long-poll: seconds to wait for a state change."
+    ),
+):
     """
     Polls for the status and live data of the simulation task.
+    Send the last ETag in If-None-Match to get a 304 when nothing changed, and
+    together with `wait` to block until the next update.
     """
-    status = simulation_service.get_simulation_status(task_id)
-    return status
+    return await task_status_service.status_response(
+        request, task_id, simulation_service.build_simulation_status, wait
+    )
@@ -0,0 +1,38 @@
+import logging
+from fastapi import APIRouter, HTTPException
+from services import storage_service
+from models.response_models import StorageUsageResponse, StorageEvictionResponse
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/storage", tags=["5. Storage"])
+
+
+@router.get("/usage", response_model=StorageUsageResponse)
+async def get_storage_usage():
+    """
+    Reports the size, last access and pin state of every stored artifact, and
+    the total use against the quota and the volume's free space.
+    """
+    try:
+        return storage_service.usage()
+    except Exception as e:
+        logger.error(f"Failed to compute storage usage: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to compute storage usage.")
+
+
+@router.post("/evict", response_model=StorageEvictionResponse)
+async def evict_artifacts():
+    """
+    Enforces the storage quota now instead of after the next task: evicts
+    idle, unpinned artifacts, least recently used first, until storage is
+    back under its limits.
+    """
+    try:
+        return storage_service.enforce_quota()
+    except Exception as e:
+        logger.error(f"Storage eviction failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Storage eviction failed.")
@@ -1,11 +1,19 @@
 import logging
-from fastapi import APIRouter, HTTPException, Body
-from services import data_processing_service, training_service
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Body, Query, Request
+from services import training_service, task_status_service
+import config
 from models.response_models import (
+    BacktestRequest,
+    BacktestStatusResponse,
+    BacktestStopResponse,
     DateSplitRequest,
     DataSplitResponse,
+    TrainingRequest,
     TrainingStartResponse,
     TrainingStatusResponse,
+    TrainingStopResponse,
+    ModelListResponse,
 )
 
 logging.basicConfig(
@@ -21,44 +29,144 @@ async def create_data_splits(request: DateSplitRequest = Body(...)):
     """
     Takes date ranges, samples the main dataset, splits it into train, test,
     and simulation sets, and saves them.
+
+    The split scans the partition samples with pandas/numpy, so it runs as a
+    task on the cpu queue; the request waits for it without blocking the event
+    loop, for up to SPLIT_DATA_TIMEOUT_SECONDS.
     """
     try:
         logger.info("Received request to split data.")
-        # This task is I/O bound and might be slow, but let's run it directly for now.
-        # If it causes timeouts, we can move it to a background task.
-        result = data_processing_service.split_dataset_by_dates(request)
-
-        return DataSplitResponse(
-            message="Data successfully sampled, split, and saved.", **result
+        task_id = training_service.start_split(request)
+        meta = await task_status_service.wait_until_ready(
+            task_id, config.SPLIT_DATA_TIMEOUT_SECONDS
         )
-
-    except FileNotFoundError as e:
-        logger.error(f"A required file was not found: {e}")
-        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        logger.error(f"An error occurred during data splitting: {e}", exc_info=True)
+        logger.error(f"Failed to run the split task: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"An internal error occurred: {e}")
 
+    state, info = meta["status"], meta["result"]
+    if state == "SUCCESS":
+        return DataSplitResponse(
+            message="Data successfully sampled, split, and saved.", **info
+        )
+    if isinstance(info, FileNotFoundError):
+        logger.error(f"A required file was not found: {info}")
+        raise HTTPException(status_code=404, detail=str(info))
+    if state == "FAILURE":
+        logger.error(f"An error occurred during data splitting: {info}")
+        raise HTTPException(
+            status_code=500, detail=f"An internal error occurred: {info}"
+        )
+    raise HTTPException(
+        status_code=504,
+        detail=f"The split (task {task_id}) did not finish in time; it is {state}.",
+    )
+
 
 @router.post("/train/start", response_model=TrainingStartResponse)
-async def start_training():
+async def start_training(request: Optional[TrainingRequest] = Body(None)):
     """
     Triggers the model training process in the background via Celery.
     Responds immediately with a task ID.
+
+    Send `{"mode": "update"}` to continue boosting the registered model on the
+    data appended since it was trained, instead of training from scratch.
     """
     try:
-        task_id = training_service.start_training_session()
+        task_id = training_service.start_training_session(request)
         return TrainingStartResponse(task_id=task_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to start training task: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to queue training task.")
 
 
+@router.post("/train/stop/{task_id}", response_model=TrainingStopResponse)
+async def stop_training(task_id: str):
+    """
+    Stops a running training task after its current boosting round.
+    """
+    try:
+        training_service.stop_training(task_id)
+        return TrainingStopResponse(
+            task_id=task_id, message="Stop signal sent to training task."
+        )
+    except Exception as e:
+        logger.error(f"Failed to stop task {task_id}: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to send stop signal.")
+
+
 @router.get("/train/status/{task_id}", response_model=TrainingStatusResponse)
-async def get_status(task_id: str):
+async def get_status(
+    request: Request,
+    task_id: str,
+    wait: float = Query(
+        0.0, ge=0, description="Long-poll: seconds to wait for a state change."
+    ),
+):
     """
     Polls for the status of the training task.
     Returns the current state, progress, and the final result upon completion.
+    Supports ETag/If-None-Match and long-polling via `wait`.
+    """
+    return await task_status_service.status_response(
+        request, task_id, training_service.build_training_status, wait
+    )
+
+
+@router.post("/backtest/start", response_model=TrainingStartResponse)
+async def start_backtest(request: BacktestRequest = Body(...)):
+    """
+    Starts a rolling-origin backtest over the dataset's timestamps: one model is
+    trained and evaluated per fold, in parallel across the workers. Returns
+    per-fold and aggregate metrics when done.
+    """
+    try:
+        task_id = training_service.start_backtest(request)
+        return TrainingStartResponse(task_id=task_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to start backtest task: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to queue backtest task.")
+
+
+@router.post("/backtest/stop/{task_id}", response_model=BacktestStopResponse)
+async def stop_backtest(task_id: str):
+    """
+    Stops a backtest; folds already evaluated are kept in its result.
+    """
+    try:
+        training_service.stop_backtest(task_id)
+        return BacktestStopResponse(
+            task_id=task_id, message="Stop signal sent to backtest task."
+        )
+    except Exception as e:
+        logger.error(f"Failed to stop task {task_id}: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to send stop signal.")
+
+
+@router.get("/backtest/status/{task_id}", response_model=BacktestStatusResponse)
+async def get_backtest_status(
+    request: Request,
+    task_id: str,
+    wait: float = Query(
+        0.0, ge=0, description="Long-poll: seconds to wait for a state change."
+    ),
+):
+    """
+    Polls for the progress (folds evaluated so far) or the result of a backtest.
+    Supports ETag/If-None-Match and long-polling via `wait`.
+    """
+    return await task_status_service.status_response(
+        request, task_id, training_service.build_backtest_status, wait
+    )
+
+
+@router.get("/models", response_model=ModelListResponse)
+async def list_models():
+    """
+    Lists the trained model versions (full trainings and updates), newest first.
     """
-    status = training_service.get_training_status(task_id)
-    return status
+    return ModelListResponse(models=training_service.list_models())
@@ -0,0 +1,345 @@
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+import numpy as np
+import pandas as pd
+
+# Mixed-workload load scenario for a running service (API plus workers).
+#
+# It uploads a synthetic dataset and splits it (setup, not measured), polls
+# light API endpoints while idle, then queues a mixed workload at once (appended
+# batches to ingest, a training run and a rolling-origin backtest) and keeps
+# polling until the workload finishes or --duration runs out. It reports the
+# light endpoints' latency percentiles per phase and exits with status 1 if the
+# p99 under load exceeds --max-p99-ms.
+#
+#   python scripts/load_scenario.py --base-url http://localhost:8000
+#
+# The heavy work runs on the cpu workers, so the light calls should barely
+# notice it; a regression (e.g. a scan moved back into the API process) shows
+# up as a tail-latency failure.
+
+# Column names, as in config.py (not imported: it creates the storage tree).
+ID_COLUMN = "Id"
+TARGET_COLUMN = "Response"
+TIMESTAMP_COLUMN = "synthetic_timestamp"
+
+START = pd.Timestamp("2025-01-01")
+ROWS_PER_DAY = 2000
+TERMINAL_STATES = ("SUCCESS", "FAILURE", "REVOKED", "STOPPED")
+
+
+def generate_csv(path: str, rows: int, features: int, first_row: int, seed: int):
+    """
+    Writes Bosch-like rows: sparse float readings (80% missing), a label driven
+    by a few of them, and one timestamp every 86400 / ROWS_PER_DAY seconds.
+    """
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(rows, features)).astype(np.float32)
+    X[rng.random((rows, features)) < 0.8] = np.nan
+    signal = np.nan_to_num(X[:, 0]) + np.nan_to_num(X[:, 1]) + ~np.isnan(X[:, 2])
+    df = pd.DataFrame(X, columns=[f"L0_S0_F{i}" for i in range(features)])
+    df.insert(0, ID_COLUMN, np.arange(first_row, first_row + rows))
+    df[TARGET_COLUMN] = (signal > 2.0).astype(np.int8)
+    seconds = np.arange(first_row, first_row + rows) * (86400 / ROWS_PER_DAY)
+    timestamps = START + pd.to_timedelta(seconds, unit="s")
+    df.insert(0, TIMESTAMP_COLUMN, timestamps.strftime("%Y-%m-%d %H:%M:%S"))
+    df.to_csv(path, index=False)
+
+
+# --- HTTP ---
+
+
+class Client:
+    def __init__(self, base_url: str, timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def request(self, method: str, path: str, body=None, headers=None):
+        """
+        Returns (status, parsed JSON body or None).
+        """
+        headers = dict(headers or {})
+        if isinstance(body, dict):
+            body = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        req = urllib.request.Request(
+            self.base_url + path, data=body, headers=headers, method=method
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                payload = response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            payload, status = e.read(), e.code
+        try:
+            return status, json.loads(payload) if payload else None
+        except ValueError:
+            return status, None
+
+    def upload(self, path: str, csv_path: str):
+        """
+        Posts a CSV as multipart form data, streamed from disk.
+        """
+        boundary = uuid.uuid4().hex
+        head = (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="file"; '
+            f'filename="{os.path.basename(csv_path)}"\r\n'
+            "Content-Type: text/csv\r\n\r\n"
+        ).encode()
+        tail = f"\r\n--{boundary}--\r\n".encode()
+
+        def body():
+            yield head
+            with open(csv_path, "rb") as f:
+                while chunk := f.read(1024 * 1024):
+                    yield chunk
+            yield tail
+
+        headers = {
+            "Content-Type": f"multipart/form-data; boundary={boundary}",
+            "Content-Length": str(len(head) + os.path.getsize(csv_path) + len(tail)),
+        }
+        return self.request("POST", path, body(), headers)
+
+
+# --- Latency Probe ---
+
+
+class LatencyProbe:
+    """
+    Polls light endpoints from a few threads and records each call's latency
+    under the current phase.
+    """
+
+    def __init__(self, client: Client, paths: list, pollers: int, interval: float):
+        self.client = client
+        self.paths = paths
+        self.pollers = pollers
+        self.interval = interval
+        self.phase = None
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self, phase: str):
+        self.phase = phase
+        self._threads = [
+            threading.Thread(target=self._poll, args=(i,), daemon=True)
+            for i in range(self.pollers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def switch(self, phase: str):
+        with self._lock:
+            self.phase = phase
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+
+    def _poll(self, offset: int):
+        i = offset
+        while not self._stop.is_set():
+            path = self.paths[i % len(self.paths)]
+            i += 1
+            began = time.perf_counter()
+            try:
+                status, _ = self.client.request("GET", path)
+                failed = status >= 500
+            except OSError:
+                failed = True
+            elapsed_ms = (time.perf_counter() - began) * 1000
+            with self._lock:
+                self.samples.setdefault(self.phase, []).append(elapsed_ms)
+                if failed:
+                    self.errors[self.phase] = self.errors.get(self.phase, 0) + 1
+            self._stop.wait(self.interval)
+
+    def report(self, phase: str) -> dict:
+        values = np.asarray(self.samples.get(phase, []), dtype=np.float64)
+        if not len(values):
+            return {"calls": 0, "errors": self.errors.get(phase, 0)}
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {
+            "calls": int(len(values)),
+            "errors": self.errors.get(phase, 0),
+            "p50_ms": round(float(p50), 1),
+            "p95_ms": round(float(p95), 1),
+            "p99_ms": round(float(p99), 1),
+            "max_ms": round(float(values.max()), 1),
+        }
+
+
+# --- Scenario ---
+
+
+def _check(status: int, body, what: str):
+    if status >= 400:
+        raise SystemExit(f"{what} failed with HTTP {status}: {body}")
+    return body
+
+
+def _day(days: float) -> str:
+    return (START + pd.Timedelta(days=days)).isoformat()
+
+
+def setup(client: Client, args, workdir: str) -> list:
+    """
+    Uploads and splits the base dataset, and writes the batches to append
+    under load. Returns the batch paths.
+    """
+    base_path = os.path.join(workdir, "dataset.csv")
+    generate_csv(base_path, args.rows, args.features, 0, seed=0)
+    batch_paths = []
+    for i in range(args.batches):
+        path = os.path.join(workdir, f"batch_{i}.csv")
+        first_row = args.rows + i * args.batch_rows
+        generate_csv(path, args.batch_rows, args.features, first_row, seed=i + 1)
+        batch_paths.append(path)
+
+    print(f"Setup: uploading {args.rows} rows x {args.features} features.")
+    _check(*client.upload("/dataset/store", base_path), "Upload")
+
+    days = args.rows / ROWS_PER_DAY
+    split = {
+        "train_start_date": _day(0),
+        "train_end_date": _day(days * 0.7),
+        "test_start_date": _day(days * 0.7),
+        "test_end_date": _day(days * 0.85),
+        "simulation_start_date": _day(days * 0.85),
+        "simulation_end_date": _day(days),
+    }
+    # The split needs the selected features; it returns 404 until they exist.
+    deadline = time.monotonic() + args.timeout
+    while True:
+        status, body = client.request("POST", "/process/split-data", split)
+        if status != 404 or time.monotonic() > deadline:
+            break
+        time.sleep(1.0)
+    _check(status, body, "Split")
+    print("Setup: dataset split.")
+    return batch_paths
+
+
+def queue_workload(client: Client, args, batch_paths: list) -> dict:
+    """
+    Queues the mixed workload and returns what to wait for.
+    """
+    pending = {"partitions": [], "tasks": {}}
+    for path in batch_paths:
+        body = _check(*client.upload("/dataset/append", path), "Append")
+        pending["partitions"].append(body["partition_id"])
+    body = _check(*client.request("POST", "/process/train/start"), "Training")
+    pending["tasks"]["train"] = f"/process/train/status/{body['task_id']}"
+    backtest = {
+        "train_days": args.backtest_train_days,
+        "test_days": args.backtest_test_days,
+        "max_folds": args.backtest_folds,
+    }
+    body = _check(
+        *client.request("POST", "/process/backtest/start", backtest), "Backtest"
+    )
+    pending["tasks"]["backtest"] = f"/process/backtest/status/{body['task_id']}"
+    return pending
+
+
+def workload_done(client: Client, pending: dict) -> dict:
+    """
+    Returns the final state of every finished part of the workload, or None for
+    parts still running.
+    """
+    states = {}
+    for name, path in pending["tasks"].items():
+        status, body = client.request("GET", path)
+        if status >= 400:
+            states[name] = f"HTTP {status}"
+            continue
+        state = (body or {}).get("status")
+        states[name] = state if state in TERMINAL_STATES else None
+    _, body = client.request("GET", "/dataset/partitions")
+    partitions = {p["id"]: p["status"] for p in (body or {}).get("partitions", [])}
+    for partition_id in pending["partitions"]:
+        state = partitions.get(partition_id)
+        states[partition_id] = state if state in ("ready", "failed") else None
+    return states
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Light-endpoint latency under a mixed workload."
+    )
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--features", type=int, default=150)
+    parser.add_argument("--batches", type=int, default=2)
+    parser.add_argument("--batch-rows", type=int, default=20_000)
+    parser.add_argument("--backtest-train-days", type=float, default=14)
+    parser.add_argument("--backtest-test-days", type=float, default=3)
+    parser.add_argument("--backtest-folds", type=int, default=8)
+    parser.add_argument("--pollers", type=int, default=4)
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    parser.add_argument("--idle-seconds", type=float, default=10)
+    parser.add_argument("--duration", type=float, default=300)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--max-p99-ms", type=float, default=500)
+    parser.add_argument("--workdir", default=None)
+    parser.add_argument("--json", action="store_true", help="Print a JSON report.")
+    args = parser.parse_args(argv)
+
+    client = Client(args.base_url, timeout=args.timeout)
+    light_paths = ["/", "/process/models", "/dataset/partitions"]
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        batch_paths = setup(client, args, workdir)
+
+        probe = LatencyProbe(client, light_paths, args.pollers, args.poll_interval)
+        probe.start("idle")
+        time.sleep(args.idle_seconds)
+
+        probe.switch("load")
+        began = time.monotonic()
+        pending = queue_workload(client, args, batch_paths)
+        while time.monotonic() - began < args.duration:
+            states = workload_done(client, pending)
+            if all(states.values()):
+                break
+            time.sleep(1.0)
+        else:
+            states = workload_done(client, pending)
+        load_seconds = time.monotonic() - began
+        probe.stop()
+
+    report = {
+        "idle": probe.report("idle"),
+        "load": probe.report("load"),
+        "load_seconds": round(load_seconds, 1),
+        "workload": {name: state or "RUNNING" for name, state in states.items()},
+        "max_p99_ms": args.max_p99_ms,
+    }
+    passed = report["load"].get("p99_ms", float("inf")) <= args.max_p99_ms
+    report["passed"] = passed
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for phase in ("idle", "load"):
+            print(f"{phase:>5}: {report[phase]}")
+        print(f"Workload after {report['load_seconds']}s: {report['workload']}")
+        verdict = "within" if passed else "OVER"
+        print(f"Light p99 under load is {verdict} the {args.max_p99_ms:.0f} ms bound.")
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import datetime
+import sys
+import msgpack
+from kombu.serialization import register
+
+# A msgpack-based Celery serializer that understands numpy scalars/arrays and
+# datetimes (including pandas Timestamps) natively, so task payloads no longer
+# need a recursive "make JSON serializable" pass before every state update.
+#
+# This module must stay importable without numpy/pandas: the FastAPI process
+# decodes results with it. Arrays decode to numpy arrays when numpy is already
+# loaded (workers) and to plain lists otherwise (API).
+
+SERIALIZER_NAME = "msgpack-numpy"
+CONTENT_TYPE = "application/x-msgpack-numpy"
+
+_EXT_NDARRAY = 1
+_EXT_DATETIME = 2
+
+# numpy dtype (without byte order) -> memoryview/struct format, for decoding
+# arrays without numpy.
+_STRUCT_FORMATS = {
+    "b1": "?",
+    "i1": "b",
+    "i2": "h",
+    "i4": "i",
+    "i8": "q",
+    "u1": "B",
+    "u2": "H",
+    "u4": "I",
+    "u8": "Q",
+    "f4": "f",
+    "f8": "d",
+}
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_EPOCH_UTC = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _encode_default(obj):
+    """msgpack `default` hook for the types msgpack does not know about."""
+    if isinstance(obj, datetime.datetime):
+        # pandas.Timestamp subclasses datetime and exposes exact nanoseconds.
+        aware = obj.tzinfo is not None
+        if hasattr(obj, "value"):
+            epoch_ns = int(obj.value)
+        else:
+            delta = obj - (_EPOCH_UTC if aware else _EPOCH)
+            epoch_ns = (
+                delta.days * 86_400_000_000
+                + delta.seconds * 1_000_000
+                + delta.microseconds
+            ) * 1000
+        return msgpack.ExtType(_EXT_DATETIME, msgpack.packb([epoch_ns, aware]))
+
+    if type(obj).__module__ == "numpy":
+        np = sys.modules["numpy"]
+        if isinstance(obj, np.ndarray):
+            kind = obj.dtype.str[1:]
+            if kind not in _STRUCT_FORMATS:
+                return obj.tolist()
+            arr = np.ascontiguousarray(obj, dtype=obj.dtype.newbyteorder("<"))
+            return msgpack.ExtType(
+                _EXT_NDARRAY,
+                msgpack.packb(
+                    [kind, list(arr.shape), arr.tobytes()], use_bin_type=True
+                ),
+            )
+        if isinstance(obj, np.generic):
+            return obj.item()
+
+    if hasattr(obj, "isoformat"):  # datetime.date / datetime.time
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+def _decode_ext(code, data):
+    """msgpack `ext_hook` mirroring `_encode_default`."""
+    if code == _EXT_NDARRAY:
+        kind, shape, buffer = msgpack.unpackb(data, raw=False)
+        np = sys.modules.get("numpy")
+        if np is not None:
+            return np.frombuffer(buffer, dtype="<" + kind).reshape(shape)
+        return memoryview(buffer).cast(_STRUCT_FORMATS[kind], shape).tolist()
+    if code == _EXT_DATETIME:
+        epoch_ns, aware = msgpack.unpackb(data)
+        base = _EPOCH_UTC if aware else _EPOCH
+        return base + datetime.timedelta(microseconds=epoch_ns // 1000)
+    return msgpack.ExtType(code, data)
+
+
+def dumps(obj) -> bytes:
+    return msgpack.packb(obj, default=_encode_default, use_bin_type=True)
+
+
+def loads(data: bytes):
+    return msgpack.unpackb(data, ext_hook=_decode_ext, raw=False, strict_map_key=False)
+
+
+register(
+    SERIALIZER_NAME,
+    dumps,
+    loads,
+    content_type=CONTENT_TYPE,
+    content_encoding="binary",
+)
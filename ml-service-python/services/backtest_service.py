@@ -0,0 +1,233 @@
+import os
+import json
+import logging
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+import config
+from services import (
+    evaluation_service,
+    ingest_service,
+    partition_service,
+    sparse_matrix_service,
+    storage_service,
+)
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Rolling-origin backtests train and evaluate one model per fold:
+#
+#   fold k: train [origin_k - train, origin_k)  test [origin_k, origin_k + test)
+#   origin_k = start + train + k * step
+#
+# All folds read one matrix: the training samples of every ready partition with
+# the important features, sorted by timestamp and stored like a split (archive
+# plus memory-mapped cache). Sorted timestamps are the time index, so each
+# window is a contiguous row range found by binary search. The matrix is rebuilt
+# only when the features or the partition samples change.
+
+METRIC_NAMES = ("accuracy", "precision", "recall", "f1_score", "mcc")
+SUMMARY_FILENAME = "summary.json"
+_KEY_FILENAME = "backtest_key.json"
+
+NS_PER_DAY = 24 * 3600 * 10**9
+
+
+def _sample_fingerprints() -> list:
+    fingerprints = []
+    for entry in partition_service.ready_partitions():
+        stat = os.stat(entry["samples"]["training"])
+        fingerprints.append([entry["id"], stat.st_size, stat.st_mtime_ns])
+    return fingerprints
+
+
+def prepare_backtest_set() -> dict:
+    """
+    Returns the backtest matrix (memory-mapped, like `load_split`), building it
+    from the partition samples first if it is missing or out of date.
+    """
+    if not os.path.exists(config.IMPORTANT_FEATURES_PATH):
+        raise FileNotFoundError(
+            "Important features not found. Please upload a dataset first."
+        )
+    with open(config.IMPORTANT_FEATURES_PATH, "r") as f:
+        features = json.load(f)
+
+    ingest_service.ensure_base_partition()
+    key = {"features": features, "samples": _sample_fingerprints()}
+    path = config.BACKTEST_SET_PATH
+    key_path = os.path.join(sparse_matrix_service.split_cache_dir(path), _KEY_FILENAME)
+    if os.path.exists(key_path):
+        with open(key_path, "r") as f:
+            if json.load(f) == key:
+                return sparse_matrix_service.load_split(path)
+
+    logger.info("Building the backtest matrix from the partition samples.")
+    sample = ingest_service.load_sample("training", features)
+    order = np.argsort(sample["timestamps"], kind="stable")
+    split_args = (
+        sample["X"][order],
+        sample["ids"][order],
+        sample["labels"][order],
+        sample["timestamps"][order],
+        features,
+    )
+    sparse_matrix_service.save_sparse_split(path, *split_args)
+    # Folds slice rows out of the matrix, so a DMatrix buffer would go unused.
+    sparse_matrix_service.save_split_cache(path, *split_args, dmatrix_buffer=False)
+    storage_service.write_json(key_path, key, indent=None)
+    return sparse_matrix_service.load_split(path)
+
+
+def _iso(ns: int) -> str:
+    return pd.Timestamp(ns, tz="UTC").isoformat()
+
+
+def _to_epoch_ns(value) -> int:
+    # Naive datetimes are taken as UTC, as for the date splits.
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")
+    return ts.value
+
+
+def fold_windows(
+    timestamps: np.ndarray,
+    train_days: float,
+    test_days: float,
+    step_days: float,
+    start_date=None,
+    end_date=None,
+    max_folds: int = None,
+) -> list:
+    """
+    Cuts rolling-origin folds over the sorted `timestamps`, from `start_date`
+    (or the first timestamp) up to `end_date` (or the last). A fold's test
+    window must end within that range.
+
+    Returns:
+        list: per fold its index, window bounds (ISO) and the row ranges of its
+        train and test windows.
+    """
+    if not len(timestamps):
+        return []
+    start_ns = int(timestamps[0]) if start_date is None else _to_epoch_ns(start_date)
+    end_ns = int(timestamps[-1]) + 1 if end_date is None else _to_epoch_ns(end_date)
+    train_ns, test_ns, step_ns = (
+        int(days * NS_PER_DAY) for days in (train_days, test_days, step_days)
+    )
+    max_folds = max_folds or config.BACKTEST_MAX_FOLDS
+
+    folds = []
+    origin = start_ns + train_ns
+    while origin + test_ns <= end_ns and len(folds) < max_folds:
+        bounds = np.searchsorted(
+            timestamps, [origin - train_ns, origin, origin + test_ns], side="left"
+        )
+        folds.append(
+            {
+                "fold": len(folds),
+                "train_start": _iso(origin - train_ns),
+                "test_start": _iso(origin),
+                "test_end": _iso(origin + test_ns),
+                "train_rows": [int(bounds[0]), int(bounds[1])],
+                "test_rows": [int(bounds[1]), int(bounds[2])],
+            }
+        )
+        origin += step_ns
+    return folds
+
+
+def run_fold(split: dict, fold: dict, callbacks: list = None) -> dict:
+    """
+    Trains a model on the fold's train window with the training hyperparameters
+    and evaluates it on its test window. Folds whose windows cannot give a
+    meaningful score are returned with a "skipped" reason instead.
+
+    The decision threshold never sees the test window: the model is fit on the
+    train window minus its last BACKTEST_THRESHOLD_HOLDOUT_FRACTION, and the
+    threshold is picked on that held-out slice (0.5 if it has no failures).
+    """
+    (train_lo, train_hi), (test_lo, test_hi) = fold["train_rows"], fold["test_rows"]
+    y_train = np.asarray(split["labels"][train_lo:train_hi], dtype=np.int8)
+    y_test = np.asarray(split["labels"][test_lo:test_hi], dtype=np.int8)
+    result = {
+        **fold,
+        "train_rows": int(len(y_train)),
+        "test_rows": int(len(y_test)),
+        "test_failures": int(y_test.sum()),
+    }
+    # Rows are sorted by timestamp, so the holdout is the latest training data.
+    holdout = int(len(y_train) * config.BACKTEST_THRESHOLD_HOLDOUT_FRACTION)
+    fit_hi = train_hi - holdout
+    if not y_train[: len(y_train) - holdout].any():
+        return {**result, "skipped": "No failures in the train window."}
+    if not y_test.any():
+        return {**result, "skipped": "No failures in the test window."}
+
+    model = xgb.XGBClassifier(
+        n_estimators=config.N_ESTIMATORS,
+        max_depth=config.MAX_DEPTH,
+        learning_rate=config.LEARNING_RATE,
+        objective=config.OBJECTIVE,
+        n_jobs=config.BACKTEST_FOLD_THREADS or None,
+        callbacks=callbacks,
+    )
+    # Row slices of the memory-mapped matrix: only these rows are read.
+    model.fit(split["X"][train_lo:fit_hi], y_train[: fit_hi - train_lo], verbose=False)
+    booster = model.get_booster()
+
+    threshold, threshold_source = evaluation_service.holdout_threshold(
+        y_train[fit_hi - train_lo :],
+        booster.inplace_predict(split["X"][fit_hi:train_hi]),
+    )
+
+    scores = booster.inplace_predict(split["X"][test_lo:test_hi])
+    evaluation = evaluation_service.evaluate_at(y_test, scores, threshold)
+    return {
+        **result,
+        "rounds": booster.num_boosted_rounds(),
+        "threshold_source": threshold_source,
+        **evaluation,
+    }
+
+
+def aggregate_folds(folds: list) -> dict:
+    """
+    Summarizes the evaluated folds: mean, standard deviation, min and max of
+    every metric across folds, and the confusion matrix summed over them.
+    """
+    evaluated = [f for f in folds if "metrics" in f]
+    summary = {
+        "folds": len(folds),
+        "evaluated_folds": len(evaluated),
+        "skipped_folds": len(folds) - len(evaluated),
+        "metrics": {},
+        "confusion_matrix": None,
+    }
+    if not evaluated:
+        return summary
+
+    columns = {
+        name: np.array([f["metrics"][name] for f in evaluated], dtype=np.float64)
+        for name in METRIC_NAMES
+    }
+    for name in ("roc_auc", "average_precision"):
+        columns[name] = np.array([f[name] for f in evaluated], dtype=np.float64)
+    summary["metrics"] = {
+        name: {
+            "mean": float(values.mean()),
+            "std": float(values.std()),
+            "min": float(values.min()),
+            "max": float(values.max()),
+        }
+        for name, values in columns.items()
+    }
+    summary["confusion_matrix"] = {
+        cell: int(sum(f["confusion_matrix"][cell] for f in evaluated))
+        for cell in evaluated[0]["confusion_matrix"]
+    }
+    return summary
@@ -0,0 +1,166 @@
+import os
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+import config
+from services import chunk_reader_service, compression_service
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Bulk scoring streams a CSV through three overlapping stages:
+#
+#   read (this thread) -> predict + format (thread pool) -> write (this thread)
+#
+# Chunks are parsed with only the ID and model feature columns, scored with the
+# booster's vectorized in-place prediction (which releases the GIL, so parsing
+# and the pool threads really run in parallel) and written out in input order.
+# Besides the chunk being parsed, at most BATCH_SCORING_THREADS + 1 parsed
+# chunks are held at once. Threads are used rather than processes because
+# Celery's pool processes cannot have children.
+
+OUTPUT_COLUMNS = [config.ID_COLUMN, "fail_probability", "prediction"]
+
+
+def _score_chunk(
+    booster: xgb.Booster, chunk: pd.DataFrame, features: list, threshold: float
+) -> tuple:
+    """
+    Scores one chunk and returns (csv_bytes, rows, fail_count).
+    """
+    X = chunk[features].to_numpy(dtype=np.float32)
+    fail_probability = booster.inplace_predict(X, missing=np.nan)
+    is_fail = fail_probability >= threshold
+    output = pd.DataFrame(
+        {
+            OUTPUT_COLUMNS[0]: chunk[config.ID_COLUMN].to_numpy(),
+            OUTPUT_COLUMNS[1]: fail_probability,
+            OUTPUT_COLUMNS[2]: np.where(is_fail, "Fail", "Pass"),
+        }
+    )
+    csv = output.to_csv(header=False, index=False, float_format="%.6f")
+    return csv.encode(), len(chunk), int(is_fail.sum())
+
+
+def score_csv(
+    booster: xgb.Booster,
+    features: list,
+    threshold: float,
+    input_path: str,
+    output_path: str,
+    on_progress: Optional[Callable[[dict], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> dict:
+    """
+    Writes the predictions of `booster` for every row of the CSV at
+    `input_path` (plain, gzip or zstd) to `output_path` as
+    "Id,fail_probability,prediction".
+
+    `on_progress` is called with the running totals after every chunk written;
+    once `should_stop` returns True no further chunks are read, and the partial
+    output is discarded.
+
+    Returns:
+        dict: rows, fail_count, pass_count, seconds and rows_per_second, plus
+        "stopped" when the run was cut short.
+    """
+    with open(input_path, "rb") as f:
+        encoding = compression_service.detect_encoding(head=f.read(4))
+    header = pd.read_csv(input_path, nrows=0, compression=encoding).columns
+    missing = [c for c in [config.ID_COLUMN] + features if c not in header]
+    if missing:
+        raise ValueError(
+            f"Input is missing {len(missing)} column(s) the model needs, "
+            f"e.g. {missing[:5]}."
+        )
+
+    n_threads = max(1, config.BATCH_SCORING_THREADS)
+    # Each in-place prediction gets its share of the cores.
+    booster.set_param({"nthread": max(1, (os.cpu_count() or 1) // n_threads)})
+    total_bytes = os.path.getsize(input_path)
+    totals = {"rows": 0, "fail_count": 0}
+    started = time.perf_counter()
+    stopped = False
+    tmp_path = output_path + ".tmp"
+
+    def report(source):
+        # The raw file position: compressed bytes for a compressed input.
+        bytes_read = min(source.tell(), total_bytes)
+        seconds = time.perf_counter() - started
+        on_progress(
+            {
+                **totals,
+                "bytes_read": bytes_read,
+                "total_bytes": total_bytes,
+                "percent": 100.0 * bytes_read / total_bytes if total_bytes else 100.0,
+                "rows_per_second": totals["rows"] / seconds if seconds else 0.0,
+            }
+        )
+
+    def write(out, future):
+        csv, rows, fail_count = future.result()
+        out.write(csv)
+        totals["rows"] += rows
+        totals["fail_count"] += fail_count
+
+    try:
+        with (
+            open(input_path, "rb") as source,
+            open(tmp_path, "wb") as out,
+            ThreadPoolExecutor(max_workers=n_threads) as pool,
+        ):
+            out.write((",".join(OUTPUT_COLUMNS) + "\n").encode())
+            pending = deque()
+            chunks = chunk_reader_service.iter_csv_chunks(
+                source,
+                compression=encoding,
+                usecols=[config.ID_COLUMN] + features,
+                dtype={feature: np.float32 for feature in features},
+            )
+            for chunk in chunks:
+                if should_stop and should_stop():
+                    stopped = True
+                    break
+                pending.append(
+                    pool.submit(_score_chunk, booster, chunk, features, threshold)
+                )
+                del chunk
+                # Write whatever is done, and wait once the pool is full.
+                while pending and (len(pending) > n_threads or pending[0].done()):
+                    write(out, pending.popleft())
+                    if on_progress:
+                        report(source)
+            while pending:
+                write(out, pending.popleft())
+            if on_progress:
+                report(source)
+        if stopped:
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    seconds = time.perf_counter() - started
+    summary = {
+        **totals,
+        "pass_count": totals["rows"] - totals["fail_count"],
+        "seconds": seconds,
+        "rows_per_second": totals["rows"] / seconds if seconds else 0.0,
+    }
+    if stopped:
+        summary["stopped"] = True
+    logger.info(
+        f"Scored {summary['rows']} rows of {input_path} in {seconds:.1f}s "
+        f"({summary['rows_per_second']:.0f} rows/s)."
+    )
+    return summary
@@ -0,0 +1,70 @@
+import time
+import logging
+import config
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Long-running tasks are stopped cooperatively: the API sets a per-task flag in
+# Redis, and the task checks it between rows or boosting rounds, finishes
+# cleanly and reports the STOPPED state. The worker process is never killed, so
+# it keeps its loaded model and imports for the next task.
+
+STOPPED_STATE = "STOPPED"
+
+_client = None
+
+
+def _redis():
+    global _client
+    if _client is None:
+        import redis
+
+        _client = redis.Redis.from_url(config.CANCELLATION_REDIS_URL)
+    return _client
+
+
+def _key(task_id: str) -> str:
+    return f"{config.CANCELLATION_KEY_PREFIX}{task_id}"
+
+
+def request_stop(task_id: str):
+    """
+    Asks a task to stop. The flag expires on its own, so flags of tasks that
+    already finished do not pile up.
+    """
+    _redis().set(_key(task_id), 1, ex=config.CANCELLATION_FLAG_TTL_SECONDS)
+    logger.info(f"Stop requested for task {task_id}.")
+
+
+def stop_requested(task_id: str) -> bool:
+    return bool(task_id) and bool(_redis().exists(_key(task_id)))
+
+
+def clear(task_id: str):
+    if task_id:
+        _redis().delete(_key(task_id))
+
+
+class StopFlag:
+    """
+    A task's view of its stop flag, checked at most every `interval` seconds
+    so per-row or per-round checks cost next to nothing. Once seen, it stays set.
+    """
+
+    def __init__(self, task_id: str, interval: float = None):
+        self.task_id = task_id
+        self.interval = (
+            config.CANCELLATION_CHECK_INTERVAL_SECONDS if interval is None else interval
+        )
+        self._checked_at = 0.0
+        self._set = False
+
+    def is_set(self) -> bool:
+        now = time.monotonic()
+        if not self._set and now - self._checked_at >= self.interval:
+            self._checked_at = now
+            self._set = stop_requested(self.task_id)
+        return self._set
@@ -0,0 +1,140 @@
+import time
+import numpy as np
+import scipy.sparse as sp
+import xgboost as xgb
+import config
+
+# Champion/challenger simulations score every row with several models in one
+# pass. The first model (the champion) drives the stream's own prediction; the
+# others are compared against it. Rows are scored a window of
+# SIMULATION_COMPARE_WINDOW_ROWS at a time: each window of the shared split
+# becomes one DMatrix that every model predicts on, so adding a challenger
+# costs its tree evaluation only, not another pass over the data.
+
+
+class ModelPanel:
+    """
+    Fail probabilities of several models for the rows of a stream, computed a
+    window at a time and cached until the stream leaves the window.
+    """
+
+    def __init__(self, boosters: list, X: sp.csr_matrix):
+        self.boosters = boosters
+        self.X = X
+        self.window_rows = config.SIMULATION_COMPARE_WINDOW_ROWS
+        self.seconds = 0.0
+        self.rows = 0
+        self._window = None
+        self._scores = None
+
+    def fail_probabilities(self, index: int) -> np.ndarray:
+        """
+        Returns the fail probability of row `index` under each model, in the
+        order the models were given.
+        """
+        window = index // self.window_rows
+        if window != self._window:
+            self._compute(window)
+        return self._scores[index - window * self.window_rows]
+
+    def _compute(self, window: int):
+        start = window * self.window_rows
+        began = time.perf_counter()
+        dwindow = xgb.DMatrix(self.X[start : start + self.window_rows])
+        self._scores = np.column_stack(
+            [booster.predict(dwindow) for booster in self.boosters]
+        )
+        self.seconds += time.perf_counter() - began
+        self.rows += dwindow.num_row()
+        self._window = window
+
+    def summary(self) -> dict:
+        return {
+            "models": len(self.boosters),
+            "rows": self.rows,
+            "seconds": self.seconds,
+            "seconds_per_row": self.seconds / self.rows if self.rows else 0.0,
+        }
+
+
+class ComparisonStats:
+    """
+    Live side-by-side statistics of the panel's models: per model the pass/fail
+    counts, average confidence, confusion counts against the rows' actual
+    labels and how often it disagrees with the champion, plus how often any
+    model disagrees.
+    """
+
+    def __init__(self, model_ids: list, thresholds: list):
+        self.model_ids = list(model_ids)
+        self.thresholds = np.asarray(thresholds, dtype=np.float64)
+        n_models = len(self.model_ids)
+        self.rows = 0
+        self.fail_counts = np.zeros(n_models, dtype=np.int64)
+        self.confidence_sums = np.zeros(n_models, dtype=np.float64)
+        self.true_positives = np.zeros(n_models, dtype=np.int64)
+        self.false_positives = np.zeros(n_models, dtype=np.int64)
+        self.false_negatives = np.zeros(n_models, dtype=np.int64)
+        self.disagreements = np.zeros(n_models, dtype=np.int64)
+        self.any_disagreements = 0
+
+    def update(self, fail_probabilities: np.ndarray, label: int) -> list:
+        """
+        Adds one row and returns its side-by-side predictions.
+        """
+        is_fail = fail_probabilities >= self.thresholds
+        disagrees = is_fail != is_fail[0]
+        confidence = (1.0 - fail_probabilities) * 100
+        self.rows += 1
+        self.fail_counts += is_fail
+        self.confidence_sums += confidence
+        if label:
+            self.true_positives += is_fail
+            self.false_negatives += ~is_fail
+        else:
+            self.false_positives += is_fail
+        self.disagreements += disagrees
+        self.any_disagreements += bool(disagrees.any())
+        return [
+            {
+                "model_id": model_id,
+                "prediction": "Fail" if fail else "Pass",
+                "confidence": float(conf),
+                "agrees_with_champion": not disagree,
+            }
+            for model_id, fail, conf, disagree in zip(
+                self.model_ids, is_fail, confidence, disagrees
+            )
+        ]
+
+    def _mcc(self, i: int) -> float:
+        # As floats: the products of int64 counts overflow on long streams.
+        tp = float(self.true_positives[i])
+        fp = float(self.false_positives[i])
+        fn = float(self.false_negatives[i])
+        tn = self.rows - tp - fp - fn
+        denominator = np.sqrt((tp + fp) * (tp + fn) * (tn + fp) * (tn + fn))
+        return float((tp * tn - fp * fn) / denominator) if denominator else 0.0
+
+    def snapshot(self) -> dict:
+        rows = max(self.rows, 1)
+        return {
+            "rows": self.rows,
+            "disagreement_rate": self.any_disagreements / rows,
+            "models": [
+                {
+                    "model_id": model_id,
+                    "threshold": float(self.thresholds[i]),
+                    "total_predictions": self.rows,
+                    "pass_count": int(self.rows - self.fail_counts[i]),
+                    "fail_count": int(self.fail_counts[i]),
+                    "average_confidence": float(self.confidence_sums[i] / rows),
+                    "disagreement_rate": float(self.disagreements[i] / rows),
+                    "true_positives": int(self.true_positives[i]),
+                    "false_positives": int(self.false_positives[i]),
+                    "false_negatives": int(self.false_negatives[i]),
+                    "mcc": self._mcc(i),
+                }
+                for i, model_id in enumerate(self.model_ids)
+            ],
+        }
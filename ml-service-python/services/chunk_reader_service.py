@@ -0,0 +1,131 @@
+import os
+import logging
+import resource
+from typing import Iterator, Optional
+import pandas as pd
+import config
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# cgroup v2 and v1 locations of the container memory limit.
+_CGROUP_LIMIT_FILES = (
+    "/sys/fs/cgroup/memory.max",
+    "/sys/fs/cgroup/memory/memory.limit_in_bytes",
+)
+# cgroup v1 reports "no limit" as a huge page-aligned number.
+_UNLIMITED_THRESHOLD = 1 << 60
+
+
+def container_memory_limit() -> Optional[int]:
+    """
+    Returns the memory limit of the current container in bytes, or None when the
+    process is not memory-limited (or the limit cannot be read).
+    """
+    if config.WORKER_MEMORY_LIMIT_BYTES:
+        return config.WORKER_MEMORY_LIMIT_BYTES
+    for path in _CGROUP_LIMIT_FILES:
+        try:
+            with open(path, "r") as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit() and int(value) < _UNLIMITED_THRESHOLD:
+            return int(value)
+    return None
+
+
+def current_rss() -> int:
+    """
+    Returns the resident set size of this process in bytes.
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Peak RSS is the best portable fallback (kilobytes on Linux).
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def memory_budget() -> int:
+    """
+    Returns how many bytes of RSS this worker may use in total: a fraction of the
+    container limit, or the fallback budget when no limit is set.
+    """
+    limit = container_memory_limit()
+    if limit is None:
+        return config.DEFAULT_MEMORY_BUDGET_BYTES
+    return int(limit * config.MEMORY_BUDGET_FRACTION)
+
+
+class AdaptiveChunkSizer:
+    """
+    Derives rows-per-chunk from the memory budget and the observed bytes per row.
+
+    The per-row cost starts from a probe chunk's in-memory size (times a parser
+    overhead factor) and is refined after every chunk from the RSS growth that
+    chunk actually caused. Each chunk may use `CHUNK_MEMORY_SHARE` of the current
+    headroom below the budget, so chunks shrink as the process fills up.
+    """
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.bytes_per_row: Optional[float] = None
+
+    def observe(self, chunk: pd.DataFrame, rss_before: int, rss_after: int):
+        rows = max(len(chunk), 1)
+        frame_bytes = chunk.memory_usage(deep=True, index=True).sum()
+        estimate = frame_bytes * config.CHUNK_PARSE_OVERHEAD / rows
+        measured = max(rss_after - rss_before, 0) / rows
+        observed = max(estimate, measured)
+        if self.bytes_per_row is None:
+            self.bytes_per_row = observed
+        else:
+            # Smooth, but react quickly when rows turn out to be more expensive.
+            weight = 0.5 if observed > self.bytes_per_row else 0.2
+            self.bytes_per_row += weight * (observed - self.bytes_per_row)
+
+    def next_chunk_rows(self) -> int:
+        if self.bytes_per_row is None:
+            return config.CHUNK_PROBE_ROWS
+        headroom = self.budget - current_rss()
+        if headroom <= 0:
+            logger.warning(
+                f"RSS is above the {self.budget / 2**20:.0f}MB memory budget; "
+                f"falling back to the minimum chunk size."
+            )
+            return config.CHUNK_MIN_ROWS
+        rows = int(headroom * config.CHUNK_MEMORY_SHARE / self.bytes_per_row)
+        return max(config.CHUNK_MIN_ROWS, min(rows, config.CHUNK_MAX_ROWS))
+
+
+def iter_csv_chunks(path: str, **read_csv_kwargs) -> Iterator[pd.DataFrame]:
+    """
+    Reads a CSV in chunks whose row count is sized from the worker's memory
+    budget and re-evaluated before every chunk.
+
+    Any keyword arguments are passed to `pd.read_csv` (e.g. `usecols`, `dtype`).
+    """
+    sizer = AdaptiveChunkSizer(memory_budget())
+    logger.info(
+        f"Reading {path} with a {sizer.budget / 2**20:.0f}MB memory budget "
+        f"(current RSS {current_rss() / 2**20:.0f}MB)."
+    )
+    with pd.read_csv(
+        path, chunksize=config.CHUNK_PROBE_ROWS, **read_csv_kwargs
+    ) as reader:
+        while True:
+            rows = sizer.next_chunk_rows()
+            rss_before = current_rss()
+            try:
+                chunk = reader.get_chunk(rows)
+            except StopIteration:
+                return
+            sizer.observe(chunk, rss_before, current_rss())
+            logger.debug(
+                f"Read chunk of {len(chunk)} rows (~{sizer.bytes_per_row:.0f} bytes/row)."
+            )
+            yield chunk
+            del chunk
@@ -0,0 +1,239 @@
+import os
+import csv
+import gzip
+import zlib
+import logging
+from typing import Optional
+import config
+from services import storage_service
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+SUPPORTED_ENCODINGS = ("gzip", "zstd")
+
+# zlib window bits for a gzip container.
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+_COPY_BLOCK_SIZE = 4 * 1024 * 1024  # Read size when installing a received file
+
+
+class UnsupportedEncoding(ValueError):
+    pass
+
+
+class CorruptCompressedData(ValueError):
+    pass
+
+
+def detect_encoding(
+    content_encoding: Optional[str] = None, head: bytes = b""
+) -> Optional[str]:
+    """
+    Returns "gzip", "zstd" or None (identity), from an explicit Content-Encoding
+    value if given, otherwise from the magic bytes at the start of the data.
+    """
+    if content_encoding:
+        encoding = content_encoding.strip().lower()
+        if encoding in ("identity", ""):
+            return None
+        if encoding in ("gzip", "x-gzip"):
+            return "gzip"
+        if encoding == "zstd":
+            return "zstd"
+        raise UnsupportedEncoding(f"Unsupported Content-Encoding: {content_encoding}")
+    if head.startswith(GZIP_MAGIC):
+        return "gzip"
+    if head.startswith(ZSTD_MAGIC):
+        return "zstd"
+    return None
+
+
+class StreamDecompressor:
+    """
+    Incremental gzip/zstd decoder: feed compressed chunks, get plain bytes back.
+    Handles concatenated gzip members and multiple zstd frames. Data that does
+    not decode, or a gzip stream cut off mid-member, raises CorruptCompressedData.
+    """
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        self._in_member = False  # Inside a gzip member that has not ended yet
+        if encoding == "gzip":
+            self._decoder = zlib.decompressobj(_GZIP_WBITS)
+        elif encoding == "zstd":
+            try:
+                import zstandard
+            except ImportError:
+                raise UnsupportedEncoding(
+                    "zstd uploads need the 'zstandard' package installed."
+                )
+            self._decoder = zstandard.ZstdDecompressor().decompressobj(
+                read_across_frames=True
+            )
+            self._errors = (zstandard.ZstdError,)
+        else:
+            raise UnsupportedEncoding(f"Unsupported encoding: {encoding}")
+
+    def decompress(self, data: bytes) -> bytes:
+        if self.encoding != "gzip":
+            try:
+                return self._decoder.decompress(data)
+            except self._errors as e:
+                raise CorruptCompressedData(f"Invalid zstd data: {e}")
+        out = []
+        try:
+            while data:
+                self._in_member = True
+                out.append(self._decoder.decompress(data))
+                if not self._decoder.eof:
+                    break
+                # Start of the next gzip member, if any.
+                self._in_member = False
+                data = self._decoder.unused_data
+                self._decoder = zlib.decompressobj(_GZIP_WBITS)
+        except zlib.error as e:
+            raise CorruptCompressedData(f"Invalid gzip data: {e}")
+        return b"".join(out)
+
+    def flush(self) -> bytes:
+        if self.encoding != "gzip":
+            return b""
+        if self._in_member:
+            raise CorruptCompressedData("The gzip data ends in the middle of a member.")
+        return self._decoder.flush()
+
+
+class DatasetWriter:
+    """
+    Sink for an incoming dataset stream. Detects gzip/zstd input from the first
+    bytes (unless the encoding is given), decompresses incrementally, and writes
+    either a plain CSV or a gzip file depending on `compress`.
+    """
+
+    def __init__(self, path: str, compress: bool, encoding: Optional[str] = None):
+        self.path = path
+        self._encoding_known = encoding is not None
+        self._decoder = StreamDecompressor(encoding) if encoding else None
+        self._head = b""
+        self._out = (
+            gzip.open(path, "wb", compresslevel=config.COMPRESSION_LEVEL)
+            if compress
+            else open(path, "wb")
+        )
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def write(self, data: bytes):
+        self.bytes_in += len(data)
+        if not self._encoding_known:
+            # Wait for enough bytes to recognise a magic number.
+            self._head += data
+            if len(self._head) < len(ZSTD_MAGIC):
+                return
+            encoding = detect_encoding(head=self._head)
+            self._decoder = StreamDecompressor(encoding) if encoding else None
+            self._encoding_known = True
+            data, self._head = self._head, b""
+        self._emit(self._decoder.decompress(data) if self._decoder else data)
+
+    def _emit(self, plain: bytes):
+        if plain:
+            self._out.write(plain)
+            self.bytes_out += len(plain)
+
+    def close(self):
+        if self._head:  # Tiny input that never reached the magic length.
+            self._emit(self._head)
+        if self._decoder:
+            self._emit(self._decoder.flush())
+        self._out.close()
+
+
+def read_csv_header(path: str) -> list:
+    """
+    Returns the column names of a plain or gzip CSV file without loading pandas.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", newline="") as f:
+        return next(csv.reader(f), [])
+
+
+def dataset_path() -> str:
+    """
+    Returns the path of the stored dataset, compressed or not, whichever exists.
+    """
+    if os.path.exists(config.DATASET_COMPRESSED_FILE_PATH) and not os.path.exists(
+        config.DATASET_FILE_PATH
+    ):
+        return config.DATASET_COMPRESSED_FILE_PATH
+    return config.DATASET_FILE_PATH
+
+
+def storage_path() -> str:
+    """
+    Returns where a newly received dataset should be written.
+    """
+    if config.STORE_DATASET_COMPRESSED:
+        return config.DATASET_COMPRESSED_FILE_PATH
+    return config.DATASET_FILE_PATH
+
+
+def remove_stale_copies(keep: str):
+    """
+    Removes the other on-disk form of the dataset after a new one was stored.
+    """
+    for path in (config.DATASET_FILE_PATH, config.DATASET_COMPRESSED_FILE_PATH):
+        if path != keep and os.path.exists(path):
+            os.remove(path)
+
+
+def move_into_place(tmp_path: str, destination: str):
+    """
+    Renames a fully written dataset file over `destination`, so readers never
+    see a partly written dataset.
+    """
+    os.replace(tmp_path, destination)
+
+
+def discard_partial(tmp_path: str):
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+
+def install_dataset_file(source_path: str) -> str:
+    """
+    Moves a fully received upload into place as the dataset. Plain files that
+    should stay plain are renamed; anything else is streamed through
+    `DatasetWriter` (decompressing and/or re-framing). Returns the dataset path.
+    """
+    destination = storage_path()
+    with open(source_path, "rb") as f:
+        encoding = detect_encoding(head=f.read(len(ZSTD_MAGIC)))
+
+    if encoding is None and not config.STORE_DATASET_COMPRESSED:
+        os.replace(source_path, destination)
+    else:
+        tmp_path = storage_service.temp_path(destination)
+        try:
+            writer = DatasetWriter(tmp_path, config.STORE_DATASET_COMPRESSED, encoding)
+            with open(source_path, "rb") as f:
+                for block in iter(lambda: f.read(_COPY_BLOCK_SIZE), b""):
+                    writer.write(block)
+            writer.close()
+            move_into_place(tmp_path, destination)
+        except BaseException:
+            discard_partial(tmp_path)
+            raise
+        os.remove(source_path)
+        logger.info(
+            f"Stored dataset at {destination} "
+            f"({writer.bytes_in / 2**20:.1f}MB received, {writer.bytes_out / 2**20:.1f}MB of CSV)."
+        )
+
+    remove_stale_copies(keep=destination)
+    return destination
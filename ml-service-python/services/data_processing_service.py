@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import json
 import logging
@@ -5,6 +6,12 @@ import os
 import gc
 import config
 from models.response_models import DateSplitRequest
+from services import (
+    compression_service,
+    ingest_service,
+    partition_service,
+    sparse_matrix_service,
+)
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -12,10 +19,21 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _to_epoch_ns(value) -> int:
+    """
+    Converts a datetime from the request model to UTC epoch nanoseconds.
+    Naive datetimes are assumed to already be in UTC.
+    """
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")
+    return ts.value
+
+
 def split_dataset_by_dates(request: DateSplitRequest) -> dict:
     """
     Samples the main dataset, splits it into train, test, and simulation sets
-    based on provided dates, and saves them as separate CSVs.
+    based on provided dates, and saves them as sparse CSR splits.
     """
     logger.info("--- Starting Data Sampling and Splitting Process ---")
 
@@ -28,98 +46,98 @@ def split_dataset_by_dates(request: DateSplitRequest) -> dict:
     with open(config.IMPORTANT_FEATURES_PATH, "r") as f:
         important_features = json.load(f)
 
-    if not os.path.exists(config.DATASET_FILE_PATH):
+    dataset_path = compression_service.dataset_path()
+    if not os.path.exists(dataset_path):
         raise FileNotFoundError(
             "Full dataset not found. Please run the ingestion step first."
         )
 
-    # Define all columns to load: features + ID, target, and timestamp for filtering
-    cols_to_load = [
-        config.ID_COLUMN,
-        config.TARGET_COLUMN,
-        config.TIMESTAMP_COLUMN,
-    ] + important_features
-
     # --- 2. Sample the Dataset (to replicate notebook logic and manage memory) ---
+    # Every partition of the dataset (the uploaded file and each appended batch)
+    # keeps a sparse row sample with all features, built once when the partition
+    # is first scanned; splitting only concatenates those samples.
     logger.info(
-        f"Creating a {config.DATA_SAMPLE_FRACTION_FOR_TRAINING*100}% sample of the dataset."
+        f"Loading the {config.DATA_SAMPLE_FRACTION_FOR_TRAINING*100}% sample of the dataset."
+    )
+    sample = ingest_service.load_sample("training", important_features)
+    X = sample["X"]
+    ids = sample["ids"]
+    labels = sample["labels"]
+    # Timestamps are kept as int64 epoch nanoseconds (UTC) for cheap filtering.
+    timestamps = sample["timestamps"]
+    partition_ids = sample["partitions"]
+    logger.info(
+        f"Created a sparse sample with {X.shape[0]} rows and {X.nnz} stored values."
     )
-    sampled_chunks = []
-    for chunk in pd.read_csv(
-        config.DATASET_FILE_PATH, usecols=cols_to_load, chunksize=config.CHUNK_SIZE
-    ):
-        sampled_chunks.append(
-            chunk.sample(frac=config.DATA_SAMPLE_FRACTION_FOR_TRAINING, random_state=42)
-        )
-
-    full_sampled_df = pd.concat(sampled_chunks, ignore_index=True)
-    logger.info(f"Created a single sampled DataFrame with {len(full_sampled_df)} rows.")
-
-    # Convert timestamp column to datetime objects AND localize it to UTC to match
-    # the timezone-aware datetimes coming from the FastAPI request model.
-    #
-    logger.info("Converting timestamp column to timezone-aware UTC datetime objects.")
-    full_sampled_df[config.TIMESTAMP_COLUMN] = pd.to_datetime(
-        full_sampled_df[config.TIMESTAMP_COLUMN]
-    ).dt.tz_localize("UTC")
 
-    del sampled_chunks
+    del sample
     gc.collect()
 
     # --- NEW: Calculate daily distribution ---
     logger.info("Calculating daily record distribution.")
-    # Ensure timestamp is datetime, then group by date and count
-    daily_dist_series = (
-        full_sampled_df.set_index(config.TIMESTAMP_COLUMN).resample("D").size()
+    days, counts = np.unique(
+        timestamps.view("datetime64[ns]").astype("datetime64[D]"), return_counts=True
     )
     # Convert to dictionary with string keys in 'YYYY-MM-DD' format
     daily_distribution = {
-        index.strftime("%Y-%m-%d"): count
-        for index, count in daily_dist_series.items()
-        if count > 0
+        str(day): int(count) for day, count in zip(days, counts) if count > 0
     }
 
-    # --- 3. Split the Sampled DataFrame based on Date Ranges ---
+    # --- 3. Split the Sampled Matrix based on Date Ranges ---
     logger.info("Splitting the sampled data into train, test, and simulation sets.")
+    ranges = {
+        "train": (request.train_start_date, request.train_end_date),
+        "test": (request.test_start_date, request.test_end_date),
+        "simulation": (request.simulation_start_date, request.simulation_end_date),
+    }
+    paths = {
+        "train": config.TRAIN_SET_PATH,
+        "test": config.TEST_SET_PATH,
+        "simulation": config.SIMULATION_SET_PATH,
+    }
 
-    train_df = full_sampled_df[
-        (full_sampled_df[config.TIMESTAMP_COLUMN] >= request.train_start_date)
-        & (full_sampled_df[config.TIMESTAMP_COLUMN] <= request.train_end_date)
-    ]
-
-    test_df = full_sampled_df[
-        (full_sampled_df[config.TIMESTAMP_COLUMN] >= request.test_start_date)
-        & (full_sampled_df[config.TIMESTAMP_COLUMN] <= request.test_end_date)
-    ]
+    row_counts = {}
+    split_ranges = {}
+    for name, (start, end) in ranges.items():
+        start_ns, end_ns = _to_epoch_ns(start), _to_epoch_ns(end)
+        rows = np.flatnonzero((timestamps >= start_ns) & (timestamps <= end_ns))
+        row_counts[name] = len(rows)
+        split_ranges[name] = {
+            "path": paths[name],
+            "start_ns": start_ns,
+            "end_ns": end_ns,
+            "partitions": partition_ids,
+        }
+
+        # --- 4. Save the Split ---
+        logger.info(f"Saving {name} set to {paths[name]}")
+        split_args = (
+            X[rows],
+            ids[rows],
+            labels[rows],
+            timestamps[rows],
+            important_features,
+        )
+        sparse_matrix_service.save_sparse_split(paths[name], *split_args)
+        # Ready-to-train cache, memory-mapped by the training and simulation tasks.
+        sparse_matrix_service.save_split_cache(paths[name], *split_args)
 
-    simulation_df = full_sampled_df[
-        (full_sampled_df[config.TIMESTAMP_COLUMN] >= request.simulation_start_date)
-        & (full_sampled_df[config.TIMESTAMP_COLUMN] <= request.simulation_end_date)
-    ]
+    # Appending data later only invalidates the splits whose range it overlaps.
+    partition_service.record_splits(split_ranges)
 
     logger.info(
-        f"Split complete. Train: {len(train_df)}, Test: {len(test_df)}, Simulation: {len(simulation_df)} rows."
+        f"Split complete. Train: {row_counts['train']}, Test: {row_counts['test']}, "
+        f"Simulation: {row_counts['simulation']} rows."
     )
-
-    # --- 4. Save the Split DataFrames ---
-    logger.info(f"Saving train set to {config.TRAIN_SET_PATH}")
-    train_df.to_csv(config.TRAIN_SET_PATH, index=False)
-
-    logger.info(f"Saving test set to {config.TEST_SET_PATH}")
-    test_df.to_csv(config.TEST_SET_PATH, index=False)
-
-    logger.info(f"Saving simulation set to {config.SIMULATION_SET_PATH}")
-    simulation_df.to_csv(config.SIMULATION_SET_PATH, index=False)
-
     logger.info("--- Data Sampling and Splitting Process Finished ---")
 
     # --- 5. Return results for the response ---
     return {
         "train_set_path": config.TRAIN_SET_PATH,
-        "train_set_rows": len(train_df),
+        "train_set_rows": row_counts["train"],
         "test_set_path": config.TEST_SET_PATH,
-        "test_set_rows": len(test_df),
+        "test_set_rows": row_counts["test"],
         "simulation_set_path": config.SIMULATION_SET_PATH,
-        "simulation_set_rows": len(simulation_df),
+        "simulation_set_rows": row_counts["simulation"],
         "daily_distribution": daily_distribution,
     }
@@ -0,0 +1,202 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import subprocess
+import numpy as np
+import xgboost as xgb
+from xgboost import collective
+from xgboost.tracker import RabitTracker
+import config
+from services import cancellation_service, sparse_matrix_service
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Data-parallel training: the train split is sharded by row range across N
+# worker processes, which build their quantile sketches and histograms on their
+# own rows and combine them through XGBoost's collective (allreduce), so
+# together they train one model. A tracker started by the training task wires
+# the workers up.
+#
+# Workers are separate commands (not forked children: Celery's pool processes
+# cannot have any), reading a job file from the storage volume:
+#
+#     python -m services.distributed_training_service <job.json> <worker_index>
+#
+# The training task starts them locally; each only maps its own rows of the
+# memory-mapped split cache.
+
+MODEL_FILENAME = "model.ubj"
+EVALS_FILENAME = "evals.json"
+JOB_FILENAME = "job.json"
+
+
+def shard_bounds(n_rows: int, n_workers: int) -> list:
+    """
+    Splits [0, n_rows) into `n_workers` contiguous row ranges of nearly equal size.
+    """
+    edges = np.linspace(0, n_rows, n_workers + 1).round().astype(np.int64)
+    return [(int(edges[i]), int(edges[i + 1])) for i in range(n_workers)]
+
+
+class _CollectiveStop(xgb.callback.TrainingCallback):
+    """
+    Stops every worker after the same round once any of them sees a stop
+    request; workers that stopped at different rounds would deadlock.
+    """
+
+    def __init__(self, task_id: str):
+        super().__init__()
+        self.stop_flag = cancellation_service.StopFlag(task_id)
+
+    def after_iteration(self, model, epoch, evals_log) -> bool:
+        local = np.array([1.0 if self.stop_flag.is_set() else 0.0])
+        return bool(collective.allreduce(local, collective.Op.MAX)[0])
+
+
+def _run_worker(job_path: str, worker_index: int):
+    with open(job_path, "r") as f:
+        job = json.load(f)
+
+    tracker_args = {**job["tracker"], "dmlc_task_id": str(worker_index)}
+    with collective.CommunicatorContext(**tracker_args):
+        rank = collective.get_rank()
+        split = sparse_matrix_service.load_split(job["split_path"])
+        n_rows = job.get("n_rows")
+        if n_rows is None:
+            n_rows = split["X"].shape[0]
+        start, end = shard_bounds(n_rows, job["n_workers"])[rank]
+        # Only this shard's rows of the memory-mapped split are read.
+        X = split["X"][start:end]
+        y = np.asarray(split["labels"][start:end], dtype=np.float32)
+        logger.info(f"Worker {rank}/{job['n_workers']}: rows {start}-{end}.")
+
+        dtrain = xgb.QuantileDMatrix(X, label=y)
+        evals_result = {}
+        booster = xgb.train(
+            job["params"],
+            dtrain,
+            num_boost_round=job["num_boost_round"],
+            evals=[(dtrain, "train")],
+            evals_result=evals_result,
+            verbose_eval=False,
+            callbacks=[_CollectiveStop(job.get("task_id"))],
+        )
+
+        # Every worker holds the same model; the first one writes it out.
+        if rank == 0:
+            booster.save_model(os.path.join(job["output_dir"], MODEL_FILENAME))
+            with open(os.path.join(job["output_dir"], EVALS_FILENAME), "w") as f:
+                json.dump(evals_result["train"], f)
+
+
+def _terminate(processes: list):
+    for process in processes:
+        if process.poll() is None:
+            process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def _stderr_tail(path: str, lines: int = 20) -> str:
+    with open(path, "r", errors="replace") as f:
+        return "".join(f.readlines()[-lines:])
+
+
+def train_distributed(
+    params: dict,
+    num_boost_round: int,
+    n_workers: int,
+    task_id: str = None,
+    n_rows: int = None,
+) -> tuple:
+    """
+    Trains one booster on the train split with `n_workers` local worker
+    processes. With `n_rows`, only the split's first `n_rows` rows are used.
+
+    Returns:
+        tuple: (booster, evals) where evals holds the per-round training
+        "logloss" and "error" over all shards.
+    """
+    job_dir = os.path.join(config.DISTRIBUTED_JOBS_DIR, task_id or str(os.getpid()))
+    shutil.rmtree(job_dir, ignore_errors=True)
+    os.makedirs(job_dir)
+
+    tracker = RabitTracker(
+        n_workers=n_workers,
+        host_ip=config.DISTRIBUTED_TRACKER_HOST,
+        sortby="task",
+        timeout=config.DISTRIBUTED_CONNECT_TIMEOUT_SECONDS,
+    )
+    tracker.start()
+    job = {
+        "tracker": tracker.worker_args(),
+        "n_workers": n_workers,
+        "n_rows": n_rows,
+        "split_path": config.TRAIN_SET_PATH,
+        "params": {
+            **params,
+            # Each worker gets its share of the host's cores.
+            "nthread": max(1, (os.cpu_count() or 1) // n_workers),
+        },
+        "num_boost_round": num_boost_round,
+        "output_dir": job_dir,
+        "task_id": task_id,
+    }
+    job_path = os.path.join(job_dir, JOB_FILENAME)
+    with open(job_path, "w") as f:
+        json.dump(job, f, indent=4)
+
+    service_dir = os.path.dirname(os.path.abspath(config.__file__))
+    processes, stderr_paths = [], []
+    logger.info(f"Starting {n_workers} training workers (tracker {job['tracker']}).")
+    try:
+        for index in range(n_workers):
+            stderr_paths.append(os.path.join(job_dir, f"worker-{index}.log"))
+            with open(stderr_paths[-1], "w") as stderr:
+                processes.append(
+                    subprocess.Popen(
+                        [sys.executable, "-m", __name__, job_path, str(index)],
+                        cwd=service_dir,
+                        stdout=subprocess.DEVNULL,
+                        stderr=stderr,
+                    )
+                )
+
+        # If one worker fails the others would wait on it forever.
+        while any(p.poll() is None for p in processes):
+            for index, process in enumerate(processes):
+                if process.returncode not in (None, 0):
+                    raise RuntimeError(
+                        f"Training worker {index} failed:\n"
+                        + _stderr_tail(stderr_paths[index])
+                    )
+            time.sleep(0.2)
+        for index, process in enumerate(processes):
+            if process.returncode != 0:
+                raise RuntimeError(
+                    f"Training worker {index} failed:\n"
+                    + _stderr_tail(stderr_paths[index])
+                )
+        tracker.wait_for(config.DISTRIBUTED_CONNECT_TIMEOUT_SECONDS)
+    finally:
+        _terminate(processes)
+        tracker.free()
+
+    booster = xgb.Booster(model_file=os.path.join(job_dir, MODEL_FILENAME))
+    with open(os.path.join(job_dir, EVALS_FILENAME), "r") as f:
+        evals = json.load(f)
+    shutil.rmtree(job_dir, ignore_errors=True)
+    return booster, evals
+
+
+if __name__ == "__main__":
+    _run_worker(sys.argv[1], int(sys.argv[2]))
@@ -0,0 +1,181 @@
+import os
+import logging
+from typing import Optional
+import numpy as np
+import scipy.sparse as sp
+import config
+from services import storage_service
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Pseudo-count added to every bin for PSI, so empty bins in a small window do
+# not dominate the score (and it stays finite).
+_PSI_PSEUDO_COUNT = 0.5
+
+
+class DriftSketch:
+    """
+    Constant-memory, mergeable summary of per-feature value distributions.
+
+    Every feature has fixed bin edges (the quantiles of its observed training
+    values) and a count of observed values per bin; the null rate follows from
+    the number of rows seen. Sketches with the same edges merge by adding
+    counts, so per-window, per-worker and cumulative sketches combine exactly.
+    Updating costs O(observed values) per row and never rescans earlier rows.
+    """
+
+    def __init__(self, features: list, edges: np.ndarray):
+        self.features = list(features)
+        self.edges = np.asarray(edges, dtype=np.float64)  # (features, bins - 1)
+        self.counts = np.zeros(
+            (len(self.features), self.edges.shape[1] + 1), dtype=np.int64
+        )
+        self.rows = 0
+
+    def empty_copy(self) -> "DriftSketch":
+        return DriftSketch(self.features, self.edges)
+
+    def update(self, X: sp.csr_matrix):
+        """
+        Adds the rows of a CSR matrix (one row or a batch); implicit entries
+        are missing values.
+        """
+        coo = X.tocoo()
+        cols = coo.col
+        # Bin index = number of edges strictly below the value.
+        bins = (coo.data[:, None] > self.edges[cols]).sum(axis=1)
+        np.add.at(self.counts, (cols, bins), 1)
+        self.rows += X.shape[0]
+
+    def merge(self, other: "DriftSketch") -> "DriftSketch":
+        if other.features != self.features or not np.array_equal(
+            other.edges, self.edges
+        ):
+            raise ValueError("Only sketches with the same features and edges merge.")
+        self.counts += other.counts
+        self.rows += other.rows
+        return self
+
+    def null_rates(self) -> np.ndarray:
+        if not self.rows:
+            return np.zeros(len(self.features))
+        return 1 - self.counts.sum(axis=1) / self.rows
+
+    def to_dict(self) -> dict:
+        return {
+            "features": self.features,
+            "edges": self.edges,
+            "counts": self.counts,
+            "rows": self.rows,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DriftSketch":
+        sketch = cls(list(data["features"]), np.asarray(data["edges"]))
+        sketch.counts = np.asarray(data["counts"], dtype=np.int64).copy()
+        sketch.rows = int(data["rows"])
+        return sketch
+
+
+def build_reference(X: sp.csr_matrix, features: list, bins: int = None) -> DriftSketch:
+    """
+    Builds the reference sketch of a training matrix: edges at the quantiles of
+    each feature's observed values, and the training counts in those bins.
+    """
+    bins = bins or config.DRIFT_BINS
+    X = X.tocsc()
+    quantiles = np.linspace(0, 1, bins + 1)[1:-1]
+    edges = np.full((len(features), bins - 1), np.inf)
+    for j in range(len(features)):
+        values = X.data[X.indptr[j] : X.indptr[j + 1]]
+        if values.size:
+            edges[j] = np.quantile(values, quantiles)
+    reference = DriftSketch(features, edges)
+    reference.update(X.tocsr())
+    return reference
+
+
+def drift_scores(sketch: DriftSketch, reference: DriftSketch) -> dict:
+    """
+    Compares a sketch with the reference, per feature: PSI and KS statistic of
+    the observed-value distributions, and the null rates of both.
+    """
+    observed = sketch.counts.sum(axis=1, keepdims=True)
+    ref_observed = reference.counts.sum(axis=1, keepdims=True)
+    p = sketch.counts / np.maximum(observed, 1)
+    q = reference.counts / np.maximum(ref_observed, 1)
+
+    n_bins = sketch.counts.shape[1]
+    p_s = (sketch.counts + _PSI_PSEUDO_COUNT) / (observed + _PSI_PSEUDO_COUNT * n_bins)
+    q_s = (reference.counts + _PSI_PSEUDO_COUNT) / (
+        ref_observed + _PSI_PSEUDO_COUNT * n_bins
+    )
+    psi = ((p_s - q_s) * np.log(p_s / q_s)).sum(axis=1)
+    ks = np.abs(np.cumsum(p, axis=1) - np.cumsum(q, axis=1)).max(axis=1)
+    # Too few observed values in the window give no meaningful distribution.
+    comparable = (observed[:, 0] >= config.DRIFT_MIN_OBSERVATIONS) & (
+        ref_observed[:, 0] > 0
+    )
+    psi[~comparable] = 0.0
+    ks[~comparable] = 0.0
+    return {
+        "psi": psi,
+        "ks": ks,
+        "null_rate": sketch.null_rates(),
+        "reference_null_rate": reference.null_rates(),
+    }
+
+
+def summarize(sketch: DriftSketch, reference: DriftSketch, top: int = None) -> dict:
+    """
+    Returns a JSON-friendly drift report: the overall maximum PSI, how many
+    features exceed the alert threshold, and the `top` most drifted features.
+    """
+    top = top or config.DRIFT_TOP_FEATURES
+    scores = drift_scores(sketch, reference)
+    order = np.argsort(scores["psi"])[::-1][:top]
+    return {
+        "rows": int(sketch.rows),
+        "max_psi": float(scores["psi"].max(initial=0.0)),
+        "mean_psi": float(scores["psi"].mean()) if len(scores["psi"]) else 0.0,
+        "drifting_features": int((scores["psi"] > config.DRIFT_PSI_ALERT).sum()),
+        "features": [
+            {
+                "feature": sketch.features[j],
+                "psi": float(scores["psi"][j]),
+                "ks": float(scores["ks"][j]),
+                "null_rate": float(scores["null_rate"][j]),
+                "reference_null_rate": float(scores["reference_null_rate"][j]),
+            }
+            for j in order
+        ],
+    }
+
+
+def save_sketch(path: str, sketch: DriftSketch):
+    data = sketch.to_dict()
+    with storage_service.atomic_write(path, "wb") as f:
+        np.savez(
+            f,
+            features=np.asarray(data["features"], dtype=str),
+            edges=data["edges"],
+            counts=data["counts"],
+            rows=np.asarray(data["rows"], dtype=np.int64),
+        )
+
+
+def load_sketch(path: str) -> Optional[DriftSketch]:
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as archive:
+        return DriftSketch.from_dict(
+            {
+                "features": archive["features"].tolist(),
+                "edges": archive["edges"],
+                "counts": archive["counts"],
+                "rows": int(archive["rows"]),
+            }
+        )
@@ -0,0 +1,234 @@
+import logging
+import numpy as np
+import config
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Scores are the predicted probability of the positive class (Response = 1, a
+# failed part); a row is predicted positive when its score >= the threshold.
+
+
+def threshold_sweep(y_true: np.ndarray, scores: np.ndarray) -> dict:
+    """
+    Confusion-matrix counts at every distinct score threshold, from a single
+    sort of the scores and cumulative sums: O(n log n) overall.
+
+    Returns:
+        dict: "thresholds" (descending) and "tp", "fp", "fn", "tn" arrays of the
+        same length, plus the "positives" and "negatives" totals.
+    """
+    y_true = np.asarray(y_true).astype(np.int64)
+    scores = np.asarray(scores, dtype=np.float64)
+    order = np.argsort(scores, kind="mergesort")[::-1]
+    sorted_scores = scores[order]
+    # The last position of each run of equal scores is where a threshold
+    # at that score stops counting rows as positive.
+    ends = np.r_[np.flatnonzero(np.diff(sorted_scores)), len(sorted_scores) - 1]
+    tp = np.cumsum(y_true[order])[ends]
+    fp = ends + 1 - tp
+    positives = int(y_true.sum())
+    negatives = len(y_true) - positives
+    return {
+        "thresholds": sorted_scores[ends],
+        "tp": tp,
+        "fp": fp,
+        "fn": positives - tp,
+        "tn": negatives - fp,
+        "positives": positives,
+        "negatives": negatives,
+    }
+
+
+def _safe_divide(numerator, denominator):
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    return np.divide(
+        numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0
+    )
+
+
+def sweep_metrics(sweep: dict) -> dict:
+    """
+    Vectorized precision, recall, F1, MCC, accuracy and FPR at every threshold.
+    """
+    tp, fp, fn, tn = (sweep[k].astype(np.float64) for k in ("tp", "fp", "fn", "tn"))
+    mcc_denominator = np.sqrt((tp + fp) * (tp + fn) * (tn + fp) * (tn + fn))
+    return {
+        "precision": _safe_divide(tp, tp + fp),
+        "recall": _safe_divide(tp, tp + fn),
+        "f1_score": _safe_divide(2 * tp, 2 * tp + fp + fn),
+        "mcc": _safe_divide(tp * tn - fp * fn, mcc_denominator),
+        "accuracy": _safe_divide(tp + tn, tp + fp + fn + tn),
+        "fpr": _safe_divide(fp, fp + tn),
+    }
+
+
+def metrics_at(sweep: dict, threshold: float) -> tuple:
+    """
+    Returns the metrics and confusion matrix at an arbitrary threshold, read off
+    the sweep with a binary search.
+    """
+    # Number of distinct thresholds >= threshold; 0 means nothing is positive.
+    k = np.searchsorted(-sweep["thresholds"], -threshold, side="right")
+    tp = int(sweep["tp"][k - 1]) if k else 0
+    fp = int(sweep["fp"][k - 1]) if k else 0
+    fn = sweep["positives"] - tp
+    tn = sweep["negatives"] - fp
+    point = {k: np.asarray([v]) for k, v in dict(tp=tp, fp=fp, fn=fn, tn=tn).items()}
+    values = {name: float(v[0]) for name, v in sweep_metrics(point).items()}
+    metrics = {
+        "accuracy": values["accuracy"],
+        "precision": values["precision"],
+        "recall": values["recall"],
+        "f1_score": values["f1_score"],
+        "mcc": values["mcc"],
+    }
+    matrix = {
+        "true_positives": tp,
+        "false_positives": fp,
+        "true_negatives": tn,
+        "false_negatives": fn,
+    }
+    return metrics, matrix
+
+
+def _downsample(n: int, max_points: int) -> np.ndarray:
+    if n <= max_points:
+        return np.arange(n)
+    return np.unique(np.linspace(0, n - 1, max_points).round().astype(np.int64))
+
+
+def _ranking_metrics(values: dict) -> tuple:
+    """
+    ROC AUC and average precision from the sweep metrics; neither depends on a
+    threshold.
+    """
+    # Curves start at "nothing predicted positive".
+    tpr = np.r_[0.0, values["recall"]]
+    fpr = np.r_[0.0, values["fpr"]]
+    roc_auc = float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+    average_precision = float(np.sum(np.diff(tpr) * values["precision"]))
+    return roc_auc, average_precision
+
+
+def select_threshold(
+    y_true: np.ndarray, scores: np.ndarray, strategy: str = None
+) -> float:
+    """
+    Returns the decision threshold `strategy` picks on these labels and scores,
+    without building the rest of the report.
+    """
+    strategy = strategy or config.DECISION_THRESHOLD_STRATEGY
+    if strategy == "default":
+        return config.DEFAULT_DECISION_THRESHOLD
+    sweep = threshold_sweep(y_true, scores)
+    metric = {"best_mcc": "mcc", "best_f1": "f1_score"}[strategy]
+    return float(sweep["thresholds"][int(np.argmax(sweep_metrics(sweep)[metric]))])
+
+
+def holdout_threshold(
+    y_holdout: np.ndarray, scores: np.ndarray, strategy: str = None
+) -> tuple:
+    """
+    Picks the decision threshold on held-out rows the model was not fit on.
+
+    Returns:
+        tuple: (threshold, source), where source is "holdout", or "default"
+        (DEFAULT_DECISION_THRESHOLD) when the rows have no failures to pick on.
+    """
+    if not np.any(y_holdout):
+        return config.DEFAULT_DECISION_THRESHOLD, "default"
+    return select_threshold(y_holdout, scores, strategy), "holdout"
+
+
+def evaluate_at(y_true: np.ndarray, scores: np.ndarray, threshold: float) -> dict:
+    """
+    Evaluates scores at a threshold chosen beforehand (elsewhere than on these
+    labels): the metrics and confusion matrix there, plus ROC AUC and average
+    precision.
+    """
+    sweep = threshold_sweep(y_true, scores)
+    metrics, matrix = metrics_at(sweep, threshold)
+    roc_auc, average_precision = _ranking_metrics(sweep_metrics(sweep))
+    return {
+        "threshold": float(threshold),
+        "metrics": metrics,
+        "confusion_matrix": matrix,
+        "roc_auc": roc_auc,
+        "average_precision": average_precision,
+    }
+
+
+def evaluation_report(
+    y_true: np.ndarray,
+    scores: np.ndarray,
+    strategy: str = None,
+    threshold: float = None,
+) -> dict:
+    """
+    Builds the threshold-sweep evaluation of a set of scores: ROC and PR curves
+    (downsampled for the payload), ROC AUC, average precision, the best-F1 and
+    best-MCC thresholds, and the metrics at `threshold`. Without a threshold,
+    the one `strategy` ("best_mcc", "best_f1" or "default" for 0.5) picks on
+    these very scores is used, which makes the metrics best-case.
+    """
+    strategy = strategy or config.DECISION_THRESHOLD_STRATEGY
+    sweep = threshold_sweep(y_true, scores)
+    values = sweep_metrics(sweep)
+
+    roc_auc, average_precision = _ranking_metrics(values)
+
+    def best(metric: str) -> dict:
+        i = int(np.argmax(values[metric]))
+        return {
+            "threshold": float(sweep["thresholds"][i]),
+            "precision": float(values["precision"][i]),
+            "recall": float(values["recall"][i]),
+            "f1_score": float(values["f1_score"][i]),
+            "mcc": float(values["mcc"][i]),
+        }
+
+    candidates = {
+        "best_mcc": best("mcc"),
+        "best_f1": best("f1_score"),
+    }
+    if threshold is None:
+        if strategy == "default":
+            threshold = config.DEFAULT_DECISION_THRESHOLD
+        else:
+            threshold = candidates[strategy]["threshold"]
+    metrics, matrix = metrics_at(sweep, threshold)
+    default_metrics, _ = metrics_at(sweep, config.DEFAULT_DECISION_THRESHOLD)
+
+    keep = _downsample(len(sweep["thresholds"]), config.EVAL_CURVE_POINTS)
+    curve_thresholds = sweep["thresholds"][keep].astype(np.float32)
+    logger.info(
+        f"Threshold sweep over {len(sweep['thresholds'])} thresholds: ROC AUC "
+        f"{roc_auc:.3f}, AP {average_precision:.3f}, {strategy} threshold {threshold:.4f}."
+    )
+    return {
+        "strategy": strategy,
+        "threshold": float(threshold),
+        "metrics": metrics,
+        "confusion_matrix": matrix,
+        "default_metrics": default_metrics,
+        "best_f1": candidates["best_f1"],
+        "best_mcc": candidates["best_mcc"],
+        "roc_auc": roc_auc,
+        "average_precision": average_precision,
+        # Curves are columnar, like the training chart: x/y plus the threshold
+        # each point was taken at.
+        "roc_curve": {
+            "x": values["fpr"][keep].astype(np.float32),
+            "y": values["recall"][keep].astype(np.float32),
+            "threshold": curve_thresholds,
+        },
+        "pr_curve": {
+            "x": values["recall"][keep].astype(np.float32),
+            "y": values["precision"][keep].astype(np.float32),
+            "threshold": curve_thresholds,
+        },
+    }
@@ -0,0 +1,256 @@
+import sys
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+import numpy as np
+import scipy.sparse as sp
+import xgboost as xgb
+import config
+from services import sparse_matrix_service
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Simulation streams run as greenlets in one gevent process, so a contribution
+# call made on the event loop would stall every stream until it returns. Window
+# contributions are therefore shared and offloaded:
+#
+# - Streams explaining the same window of the same split with the same booster
+#   (streams started together reach each window on the same tick) wait for one
+#   computation instead of each running their own.
+# - The computation runs on a native thread of the gevent hub's pool; xgboost
+#   releases the GIL, so the other streams keep running meanwhile.
+# - Exact or approximate contributions are chosen from the explanation cost of
+#   the whole process over the last window's worth of time, not per stream.
+
+_shared = OrderedDict()  # (booster, split, top_k) ids -> _SharedWindows
+_shared_lock = threading.Lock()
+_MAX_SHARED = 8  # Boosters/splits kept; older ones belong to finished streams.
+
+_load = deque()  # (finished at, seconds) of recent window computations
+_load_lock = threading.Lock()
+
+
+def _offload(fn, *args):
+    """
+    Runs `fn` on a native thread when called from a gevent greenlet, so the hub
+    keeps running the other greenlets; runs it inline otherwise.
+    """
+    if "gevent" in sys.modules:
+        from gevent import monkey
+
+        if monkey.is_module_patched("threading"):
+            import gevent
+
+            return gevent.get_hub().threadpool.apply(fn, args)
+    return fn(*args)
+
+
+def _load_period() -> float:
+    # The time a stream takes to go through one window.
+    return config.EXPLAIN_WINDOW_ROWS * config.SIMULATION_ROW_INTERVAL_SECONDS
+
+
+def _over_budget() -> bool:
+    """
+    Whether the process spent more than EXPLAIN_MAX_TIME_FRACTION of the last
+    window period computing contributions.
+    """
+    now = time.monotonic()
+    with _load_lock:
+        while _load and now - _load[0][0] > _load_period():
+            _load.popleft()
+        spent = sum(seconds for _, seconds in _load)
+    return spent > config.EXPLAIN_MAX_TIME_FRACTION * _load_period()
+
+
+def _record_load(seconds: float):
+    with _load_lock:
+        _load.append((time.monotonic(), seconds))
+
+
+def _top_contributions(
+    booster: xgb.Booster, X_window: sp.csr_matrix, top_k: int, approximate: bool
+) -> dict:
+    """
+    Computes a window's contributions and keeps the `top_k` largest in magnitude
+    per row. Runs off the event loop: no locks, no greenlet switches.
+    """
+    began = time.perf_counter()
+    contributions = booster.predict(
+        xgb.DMatrix(X_window), pred_contribs=True, approx_contribs=approximate
+    )
+    contributions = contributions[:, :-1]  # The last column is the bias term
+    # Top-k by magnitude per row: partition, then sort only the k kept.
+    magnitude = np.abs(contributions)
+    top = np.argpartition(-magnitude, top_k - 1, axis=1)[:, :top_k]
+    order = np.argsort(-np.take_along_axis(magnitude, top, axis=1), axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    return {
+        "top": top,
+        "contributions": np.take_along_axis(contributions, top, axis=1),
+        "values": np.take_along_axis(
+            sparse_matrix_service.csr_to_dense(X_window), top, axis=1
+        ),
+        "approximate": approximate,
+        "seconds": time.perf_counter() - began,
+    }
+
+
+class _SharedWindows:
+    """
+    The computed windows of one (booster, split) pair, shared by every stream
+    of the process that explains them.
+    """
+
+    def __init__(self, booster: xgb.Booster, X: sp.csr_matrix, top_k: int):
+        self.booster = booster
+        self.X = X
+        self.top_k = top_k
+        self.windows = OrderedDict()  # window -> entry with a "done" event
+
+    def get(self, window: int) -> tuple:
+        """
+        Returns (the window's entry, whether this caller computed it).
+        """
+        with _shared_lock:
+            entry = self.windows.get(window)
+            leader = entry is None
+            if leader:
+                entry = {"done": threading.Event()}
+                self.windows[window] = entry
+                while len(self.windows) > config.EXPLAIN_CACHED_WINDOWS:
+                    self.windows.popitem(last=False)
+            else:
+                self.windows.move_to_end(window)
+
+        if leader:
+            start = window * config.EXPLAIN_WINDOW_ROWS
+            X_window = self.X[start : start + config.EXPLAIN_WINDOW_ROWS]
+            try:
+                entry.update(
+                    _offload(
+                        _top_contributions,
+                        self.booster,
+                        X_window,
+                        self.top_k,
+                        _over_budget(),
+                    )
+                )
+                _record_load(entry["seconds"])
+            except Exception as e:
+                entry["error"] = e
+                with _shared_lock:
+                    self.windows.pop(window, None)
+            finally:
+                entry["done"].set()
+        else:
+            entry["done"].wait()
+
+        if "error" in entry:
+            raise entry["error"]
+        return entry, leader
+
+
+def _shared_windows(booster: xgb.Booster, X: sp.csr_matrix, top_k: int):
+    # Streams get the booster and split from the process-wide cache, so the
+    # same objects mean the same model and rows.
+    key = (id(booster), id(X), top_k)
+    with _shared_lock:
+        shared = _shared.get(key)
+        if shared is None or shared.booster is not booster or shared.X is not X:
+            shared = _SharedWindows(booster, X, top_k)
+            _shared[key] = shared
+            while len(_shared) > _MAX_SHARED:
+                _shared.popitem(last=False)
+        else:
+            _shared.move_to_end(key)
+        return shared
+
+
+class WindowExplainer:
+    """
+    Per-row feature contributions for a simulation stream, computed a window
+    of EXPLAIN_WINDOW_ROWS rows at a time with the booster's native
+    contribution prediction (TreeSHAP). Windows are shared with the other
+    streams of the process and computed off the event loop (see above).
+
+    Contributions are in log-odds towards "Fail" (Response = 1); for each row
+    only the EXPLAIN_TOP_K largest in magnitude are kept. While the process
+    spends more than EXPLAIN_MAX_TIME_FRACTION of its time on exact
+    contributions, new windows use the much cheaper approximate (Saabas)
+    contributions instead.
+    """
+
+    def __init__(self, booster: xgb.Booster, X: sp.csr_matrix, features: list):
+        self.features = list(features)
+        self.top_k = min(config.EXPLAIN_TOP_K, len(self.features))
+        self.window_rows = config.EXPLAIN_WINDOW_ROWS
+        self._shared = _shared_windows(booster, X, self.top_k)
+        self.seconds = 0.0
+        self.rows = 0
+        self.approximate_rows = 0
+        self.computed_windows = 0
+        self.shared_windows = 0
+        self._window = None
+        self._entry = None
+
+    def explain(self, index: int) -> list:
+        """
+        Returns the top contributors of row `index`, largest first.
+        """
+        window = index // self.window_rows
+        if window != self._window:
+            self._enter(window)
+        i = index - window * self.window_rows
+        return [
+            {
+                "feature": self.features[j],
+                # Missing sensors contribute too (through the default branch).
+                "value": None if np.isnan(value) else float(value),
+                "contribution": float(contribution),
+            }
+            for j, value, contribution in zip(
+                self._entry["top"][i],
+                self._entry["values"][i],
+                self._entry["contributions"][i],
+            )
+        ]
+
+    def _enter(self, window: int):
+        entry, computed = self._shared.get(window)
+        n_rows = len(entry["top"])
+        if computed:
+            self.computed_windows += 1
+            self.seconds += entry["seconds"]
+        else:
+            self.shared_windows += 1
+        if entry["approximate"] and not self.approximate_rows:
+            logger.warning(
+                "Explanation load is over budget; using approximate contributions."
+            )
+        self.rows += n_rows
+        self.approximate_rows += n_rows if entry["approximate"] else 0
+        self._window = window
+        self._entry = entry
+
+    def summary(self) -> dict:
+        if not self.approximate_rows:
+            mode = "exact"
+        elif self.approximate_rows == self.rows:
+            mode = "approximate"
+        else:
+            mode = "mixed"
+        return {
+            "mode": mode,
+            "rows": self.rows,
+            "approximate_rows": self.approximate_rows,
+            "computed_windows": self.computed_windows,
+            "shared_windows": self.shared_windows,
+            # Time spent on the windows this stream computed.
+            "seconds": self.seconds,
+            "seconds_per_row": self.seconds / self.rows if self.rows else 0.0,
+        }
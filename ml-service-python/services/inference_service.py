@@ -0,0 +1,116 @@
+import os
+import time
+import logging
+import threading
+import joblib
+import numpy as np
+import scipy.sparse as sp
+import config
+from services import sparse_matrix_service
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Simulations run as many concurrent streams in one worker process (greenlets
+# on the gevent pool, where `threading` and `time.sleep` are cooperative). The
+# streams share the loaded model and the simulation split through the cache
+# below, and their per-row predictions are batched into one predict_proba call.
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _cached(kind: str, path: str, load):
+    """
+    Returns the object loaded from `path`, loading it once per process and
+    again only when the file is replaced (its mtime changes).
+    """
+    key = (kind, path, os.stat(path).st_mtime_ns)
+    with _cache_lock:
+        if key not in _cache:
+            # Drop the stale version of the same file.
+            for stale in [k for k in _cache if k[:2] == key[:2]]:
+                del _cache[stale]
+            _cache[key] = load(path)
+            logger.info(f"Loaded {kind} from {path} into the shared cache.")
+        return _cache[key]
+
+
+def get_predictor(path: str = None) -> "PredictionBatcher":
+    """
+    Returns the batcher around the model at `path` (the current model by
+    default), shared by every stream in this process.
+    """
+    path = path or config.MODEL_SAVE_PATH
+    return _cached("model", path, lambda p: PredictionBatcher(joblib.load(p)))
+
+
+def get_split(path: str) -> dict:
+    """
+    Shared, read-only copy of a sparse split (see `sparse_matrix_service`).
+    """
+    return _cached("split", path, sparse_matrix_service.load_split)
+
+
+class PredictionBatcher:
+    """
+    Collects rows submitted by concurrent streams and scores them together.
+
+    The first stream to submit a row while no batch is open becomes the batch
+    leader: it waits SIMULATION_BATCH_WINDOW_SECONDS for the other streams to add
+    their rows, then runs one predict_proba over all of them and hands every
+    stream its own probabilities. No background thread is needed.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._lock = threading.Lock()
+        self._pending = None  # The open batch: its rows, results and done event
+        self.batches = 0
+        self.rows = 0
+
+    def predict_proba(self, row: sp.csr_matrix) -> np.ndarray:
+        """
+        Scores `row` together with the rows other streams submit meanwhile.
+        """
+        with self._lock:
+            leader = self._pending is None
+            if leader:
+                self._pending = {"rows": [], "n": 0, "done": threading.Event()}
+            batch = self._pending
+            offset = batch["n"]
+            batch["rows"].append(row)
+            batch["n"] += row.shape[0]
+
+        if leader:
+            time.sleep(config.SIMULATION_BATCH_WINDOW_SECONDS)
+            with self._lock:
+                self._pending = None
+            try:
+                batch["probabilities"] = self.model.predict_proba(
+                    sp.vstack(batch["rows"], format="csr")
+                )
+                self.batches += 1
+                self.rows += batch["n"]
+            except Exception as e:
+                batch["error"] = e
+            finally:
+                batch["done"].set()
+        else:
+            batch["done"].wait()
+
+        if "error" in batch:
+            raise batch["error"]
+        return batch["probabilities"][offset : offset + row.shape[0]]
+
+
+def wait_for_next_tick(interval: float = None):
+    """
+    Paces a stream to the next multiple of `interval` on the wall clock, so
+    streams started at different times still emit their rows together (and
+    their predictions land in the same batch).
+    """
+    interval = interval or config.SIMULATION_ROW_INTERVAL_SECONDS
+    time.sleep(interval - time.time() % interval)
@@ -0,0 +1,227 @@
+import os
+import logging
+import numpy as np
+import scipy.sparse as sp
+import config
+from services import (
+    chunk_reader_service,
+    compression_service,
+    partition_service,
+    schema_registry_service,
+    sparse_matrix_service,
+)
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Row samples kept per partition: "selection" feeds the preliminary feature
+# selection model, "training" is what train/test/simulation splits are cut from.
+# Both hold every feature column, so they stay valid when the selected
+# features change.
+SAMPLE_FRACTIONS = {
+    "selection": config.SAMPLE_FRACTION,
+    "training": config.DATA_SAMPLE_FRACTION_FOR_TRAINING,
+}
+
+
+def _sample_path(partition_id: str, kind: str) -> str:
+    return os.path.join(config.SAMPLES_DIR, f"{partition_id}-{kind}.npz")
+
+
+def _scan_partition(
+    partition_id: str, path: str, schema: dict, read_kwargs: dict, stats=None
+) -> dict:
+    """
+    Reads a partition once and builds its timestamp index and row samples.
+    When a `ColumnStatsAccumulator` is given, it is updated from every chunk.
+    """
+    features = schema_registry_service.feature_columns(schema)
+    samples = {kind: ([], [], [], []) for kind in SAMPLE_FRACTIONS}
+    day_counts = {}
+    rows, ts_min, ts_max = 0, None, None
+
+    for chunk in chunk_reader_service.iter_csv_chunks(path, **read_kwargs):
+        if stats is not None:
+            stats.update(chunk)
+        timestamps = schema_registry_service.timestamps_to_epoch_ns(
+            chunk[config.TIMESTAMP_COLUMN], schema
+        )
+        rows += len(chunk)
+        if len(timestamps):
+            low, high = int(timestamps.min()), int(timestamps.max())
+            ts_min = low if ts_min is None else min(ts_min, low)
+            ts_max = high if ts_max is None else max(ts_max, high)
+        days, counts = np.unique(
+            timestamps.view("datetime64[ns]").astype("datetime64[D]"),
+            return_counts=True,
+        )
+        for day, count in zip(days, counts):
+            day_counts[str(day)] = day_counts.get(str(day), 0) + int(count)
+
+        for kind, fraction in SAMPLE_FRACTIONS.items():
+            sample = chunk.sample(frac=fraction, random_state=42)
+            picked = chunk.index.get_indexer(sample.index)
+            X_parts, id_parts, label_parts, ts_parts = samples[kind]
+            X_parts.append(sparse_matrix_service.dataframe_to_csr(sample, features))
+            id_parts.append(sample[config.ID_COLUMN].to_numpy(dtype=np.int64))
+            label_parts.append(sample[config.TARGET_COLUMN].to_numpy(dtype=np.int8))
+            ts_parts.append(timestamps[picked])
+        del chunk
+
+    sample_paths = {}
+    for kind, (X_parts, id_parts, label_parts, ts_parts) in samples.items():
+        sample_paths[kind] = _sample_path(partition_id, kind)
+        sparse_matrix_service.save_sparse_split(
+            sample_paths[kind],
+            (
+                sp.vstack(X_parts, format="csr")
+                if X_parts
+                else sp.csr_matrix((0, len(features)), dtype=np.float32)
+            ),
+            np.concatenate(id_parts) if id_parts else np.empty(0),
+            np.concatenate(label_parts) if label_parts else np.empty(0),
+            np.concatenate(ts_parts) if ts_parts else np.empty(0),
+            features,
+        )
+
+    return {
+        "rows": rows,
+        "ts_min": ts_min,
+        "ts_max": ts_max,
+        "daily_counts": dict(sorted(day_counts.items())),
+        "samples": sample_paths,
+    }
+
+
+def ensure_base_partition() -> dict:
+    """
+    Scans the base dataset into the manifest (timestamp index and samples) the
+    first time it is needed after an upload; later calls are free.
+    """
+    manifest = partition_service.load_manifest()
+    entry = partition_service.get_partition(manifest, partition_service.BASE_PARTITION)
+    if entry is not None and all(os.path.exists(p) for p in entry["samples"].values()):
+        return entry
+
+    dataset_path = compression_service.dataset_path()
+    if not os.path.exists(dataset_path):
+        raise FileNotFoundError(
+            f"Dataset not found at {dataset_path}. Please upload it first."
+        )
+    schema = schema_registry_service.get_schema(dataset_path)
+    columns = [config.TIMESTAMP_COLUMN] + list(schema["columns"])
+    logger.info(f"Building the timestamp index and samples of {dataset_path}")
+    fields = _scan_partition(
+        partition_service.BASE_PARTITION,
+        dataset_path,
+        schema,
+        schema_registry_service.read_csv_kwargs(schema, columns),
+    )
+    return partition_service.put_base_partition({"path": dataset_path, **fields})
+
+
+def ingest_partition(partition_id: str) -> dict:
+    """
+    Ingests an appended batch: one pass over the new file only, which updates
+    the schema statistics, records the partition's timestamp index and samples,
+    and invalidates the splits whose date range the new rows fall into.
+    """
+    entry = partition_service.update_partition(
+        partition_id, status=partition_service.STATUS_INGESTING
+    )
+    try:
+        dataset_path = compression_service.dataset_path()
+        schema = schema_registry_service.get_schema(dataset_path)
+        columns = [config.TIMESTAMP_COLUMN] + list(schema["columns"])
+        header = compression_service.read_csv_header(entry["path"])
+        if set(header) != set(columns):
+            missing = sorted(set(columns) - set(header))
+            extra = sorted(set(header) - set(columns))
+            raise ValueError(
+                f"Columns do not match the dataset (missing: {missing[:10]}, "
+                f"unexpected: {extra[:10]})."
+            )
+
+        # The batch is read as float64 so its statistics can widen the schema.
+        stats = schema_registry_service.ColumnStatsAccumulator(list(schema["columns"]))
+        fields = _scan_partition(
+            partition_id,
+            entry["path"],
+            schema,
+            {"usecols": columns, "dtype": schema_registry_service.scan_dtypes(columns)},
+            stats,
+        )
+        if not fields["rows"]:
+            raise ValueError("The appended batch has no rows.")
+    except Exception as e:
+        logger.error(f"Failed to ingest partition {partition_id}: {e}")
+        partition_service.update_partition(
+            partition_id, status=partition_service.STATUS_FAILED, error=str(e)
+        )
+        raise
+
+    with partition_service.manifest_lock():
+        schema = schema_registry_service.get_schema(dataset_path)
+        schema_registry_service.merge_partition_stats(
+            schema, partition_id, stats.column_stats(), stats.rows
+        )
+        schema_registry_service.save_schema(schema)
+        invalidated = partition_service.invalidate_overlapping_splits(
+            fields["ts_min"], fields["ts_max"]
+        )
+
+    entry = partition_service.update_partition(
+        partition_id,
+        status=partition_service.STATUS_READY,
+        invalidated_splits=invalidated,
+        **fields,
+    )
+    logger.info(
+        f"Ingested partition {partition_id}: {fields['rows']} rows over "
+        f"{len(fields['daily_counts'])} day(s); invalidated splits: {invalidated or 'none'}."
+    )
+    return entry
+
+
+def load_sample(kind: str, columns: list, partition_ids: list = None) -> dict:
+    """
+    Concatenates the `kind` sample ("selection" or "training") of every ready
+    partition (or only of `partition_ids`), restricted to `columns` in that order.
+
+    Returns:
+        dict: like `sparse_matrix_service.load_sparse_split`, plus "partitions",
+        the ids of the partitions the sample was taken from.
+    """
+    ensure_base_partition()
+    entries = [
+        entry
+        for entry in partition_service.ready_partitions()
+        if partition_ids is None or entry["id"] in partition_ids
+    ]
+    X_parts, id_parts, label_parts, ts_parts = [], [], [], []
+    for entry in entries:
+        sample = sparse_matrix_service.load_sparse_split(entry["samples"][kind])
+        position = {name: i for i, name in enumerate(sample["features"])}
+        X_parts.append(sample["X"][:, [position[name] for name in columns]])
+        id_parts.append(sample["ids"])
+        label_parts.append(sample["labels"])
+        ts_parts.append(sample["timestamps"])
+    if not entries:
+        return {
+            "X": sp.csr_matrix((0, len(columns)), dtype=np.float32),
+            "ids": np.empty(0, dtype=np.int64),
+            "labels": np.empty(0, dtype=np.int8),
+            "timestamps": np.empty(0, dtype=np.int64),
+            "features": list(columns),
+            "partitions": [],
+        }
+    return {
+        "X": sp.vstack(X_parts, format="csr"),
+        "ids": np.concatenate(id_parts),
+        "labels": np.concatenate(label_parts),
+        "timestamps": np.concatenate(ts_parts),
+        "features": list(columns),
+        "partitions": [entry["id"] for entry in entries],
+    }
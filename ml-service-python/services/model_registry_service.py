@@ -0,0 +1,100 @@
+import os
+import json
+import time
+import uuid
+import logging
+from typing import Optional
+import config
+from services import storage_service
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Every trained model is kept as a version under MODELS_DIR/<model_id>/ with its
+# metadata (parent model, training mode, features, partitions it has seen, test
+# metrics). CURRENT_FILENAME points at the registered version, which is also
+# copied to config.MODEL_SAVE_PATH for the simulation.
+#
+# Only JSON is handled here, so the API can list models without the ML stack;
+# the worker writes and loads the model files itself.
+
+MODEL_FILENAME = "model.joblib"
+METADATA_FILENAME = "metadata.json"
+COMPARISON_FILENAME = "comparison.json"
+CURRENT_FILENAME = "current.json"
+
+
+def new_model_id() -> str:
+    # Sortable by creation time, unique across concurrent workers.
+    return time.strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:6]
+
+
+def model_dir(model_id: str) -> str:
+    path = os.path.join(config.MODELS_DIR, model_id)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def model_path(model_id: str) -> str:
+    return os.path.join(model_dir(model_id), MODEL_FILENAME)
+
+
+def artifact_path(model_id: str, filename: str) -> str:
+    """
+    Returns the path of another file stored with a model version.
+    """
+    return os.path.join(model_dir(model_id), filename)
+
+
+def register_model(metadata: dict, comparison: Optional[dict] = None) -> dict:
+    """
+    Stores a model version's metadata (and its comparison report, for updates)
+    and makes it the current model. The model file must already be written to
+    `model_path(metadata["id"])`.
+    """
+    model_id = metadata["id"]
+    storage_service.write_json(
+        os.path.join(model_dir(model_id), METADATA_FILENAME), metadata
+    )
+    if comparison is not None:
+        storage_service.write_json(
+            os.path.join(model_dir(model_id), COMPARISON_FILENAME), comparison
+        )
+    storage_service.write_json(
+        os.path.join(config.MODELS_DIR, CURRENT_FILENAME), {"model_id": model_id}
+    )
+    logger.info(f"Registered model {model_id} ({metadata['mode']}) as current.")
+    return metadata
+
+
+def get_model(model_id: str) -> Optional[dict]:
+    path = os.path.join(config.MODELS_DIR, model_id, METADATA_FILENAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def current_model() -> Optional[dict]:
+    """
+    Returns the metadata of the registered (current) model, if any.
+    """
+    path = os.path.join(config.MODELS_DIR, CURRENT_FILENAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return get_model(json.load(f)["model_id"])
+
+
+def list_models() -> list:
+    """
+    Returns the metadata of every registered version, newest first.
+    """
+    models = []
+    for name in os.listdir(config.MODELS_DIR):
+        metadata = get_model(name)
+        if metadata is not None:
+            models.append(metadata)
+    return sorted(models, key=lambda m: m["created_at"], reverse=True)
@@ -0,0 +1,212 @@
+import os
+import json
+import time
+import shutil
+import fcntl
+import logging
+import contextlib
+from typing import Optional
+import config
+from services import compression_service, storage_service
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# The dataset is the uploaded base file plus any batches appended to it since.
+# Each one is a partition; the manifest records, per partition, its row count,
+# a timestamp index (time range and rows per day) and the paths of its row
+# samples. Appends never rewrite older partitions or their samples.
+#
+# This module only handles JSON bookkeeping so the API can use it without
+# loading the ML stack; scanning partitions is done by ingest_service.
+
+BASE_PARTITION = "base"
+
+STATUS_UPLOADING = "uploading"
+STATUS_INGESTING = "ingesting"
+STATUS_READY = "ready"
+STATUS_FAILED = "failed"
+
+
+def _base_fingerprint() -> Optional[dict]:
+    path = compression_service.dataset_path()
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return {"path": path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+@contextlib.contextmanager
+def manifest_lock():
+    """
+    Serializes manifest (and schema) updates across threads and processes
+    sharing the storage volume.
+    """
+    with open(config.PARTITION_MANIFEST_PATH + ".lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def load_manifest() -> dict:
+    """
+    Returns the partition manifest. A manifest written for a different base
+    dataset file is treated as empty: a full re-upload replaces every partition.
+    """
+    fingerprint = _base_fingerprint()
+    if os.path.exists(config.PARTITION_MANIFEST_PATH):
+        with open(config.PARTITION_MANIFEST_PATH, "r") as f:
+            manifest = json.load(f)
+        if manifest.get("base") == fingerprint:
+            return manifest
+    return {"base": fingerprint, "next_id": 1, "partitions": []}
+
+
+def save_manifest(manifest: dict):
+    storage_service.write_json(config.PARTITION_MANIFEST_PATH, manifest)
+
+
+def get_partition(manifest: dict, partition_id: str) -> Optional[dict]:
+    for entry in manifest["partitions"]:
+        if entry["id"] == partition_id:
+            return entry
+    return None
+
+
+def create_partition(compressed: bool) -> dict:
+    """
+    Registers a new appended partition and returns its manifest entry, whose
+    `path` is where the uploaded batch should be written.
+    """
+    with manifest_lock():
+        manifest = load_manifest()
+        partition_id = f"part-{manifest['next_id']:06d}"
+        manifest["next_id"] += 1
+        filename = partition_id + (".csv.gz" if compressed else ".csv")
+        entry = {
+            "id": partition_id,
+            "path": os.path.join(config.PARTITIONS_DIR, filename),
+            "status": STATUS_UPLOADING,
+            "created_at": time.time(),
+        }
+        manifest["partitions"].append(entry)
+        save_manifest(manifest)
+    return entry
+
+
+def update_partition(partition_id: str, **fields) -> dict:
+    with manifest_lock():
+        manifest = load_manifest()
+        entry = get_partition(manifest, partition_id)
+        if entry is None:
+            raise KeyError(partition_id)
+        entry.update(fields)
+        save_manifest(manifest)
+    return entry
+
+
+def put_base_partition(fields: dict) -> dict:
+    """
+    Records the scanned base dataset as the first partition.
+    """
+    with manifest_lock():
+        manifest = load_manifest()
+        manifest["partitions"] = [
+            p for p in manifest["partitions"] if p["id"] != BASE_PARTITION
+        ]
+        entry = {"id": BASE_PARTITION, "status": STATUS_READY, **fields}
+        manifest["partitions"].insert(0, entry)
+        save_manifest(manifest)
+    return entry
+
+
+def _remove_files(entry: dict):
+    paths = list(entry.get("samples", {}).values())
+    if entry["id"] != BASE_PARTITION:
+        paths.append(entry["path"])
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def remove_partition(partition_id: str):
+    """
+    Drops a partition (e.g. a failed upload) together with its files.
+    """
+    with manifest_lock():
+        manifest = load_manifest()
+        entry = get_partition(manifest, partition_id)
+        if entry is None:
+            return
+        _remove_files(entry)
+        manifest["partitions"].remove(entry)
+        save_manifest(manifest)
+
+
+def reset_partitions():
+    """
+    Forgets every partition and deletes appended batches and all samples.
+    Called after the base dataset was replaced by a full upload.
+    """
+    with manifest_lock():
+        for directory in (config.PARTITIONS_DIR, config.SAMPLES_DIR):
+            for name in os.listdir(directory):
+                os.remove(os.path.join(directory, name))
+        save_manifest({"base": _base_fingerprint(), "next_id": 1, "partitions": []})
+    logger.info("Cleared dataset partitions and samples after a full upload.")
+
+
+def ready_partitions() -> list:
+    return [p for p in load_manifest()["partitions"] if p["status"] == STATUS_READY]
+
+
+# --- Downstream artifacts ---
+# Each split records the date range it was cut from, so an append only
+# invalidates the splits whose range overlaps the appended rows.
+
+
+def record_splits(ranges: dict):
+    """
+    Records the split files, their [start, end] epoch-ns ranges and source
+    partitions, keyed by split name ("train", "test", "simulation").
+    """
+    storage_service.write_json(config.SPLIT_MANIFEST_PATH, ranges)
+
+
+def load_split_manifest() -> dict:
+    """
+    Returns the recorded splits: name -> {"path", "start_ns", "end_ns",
+    "partitions"} where "partitions" are the partitions the split was cut from.
+    """
+    if not os.path.exists(config.SPLIT_MANIFEST_PATH):
+        return {}
+    with open(config.SPLIT_MANIFEST_PATH, "r") as f:
+        return json.load(f)
+
+
+def invalidate_overlapping_splits(ts_min: int, ts_max: int) -> list:
+    """
+    Deletes the splits whose date range overlaps [ts_min, ts_max] and returns
+    their names. Splits of other date ranges are still valid and are kept.
+    """
+    splits = load_split_manifest()
+    if not splits:
+        return []
+
+    invalidated = []
+    for name, split in list(splits.items()):
+        if split["start_ns"] <= ts_max and ts_min <= split["end_ns"]:
+            if os.path.exists(split["path"]):
+                os.remove(split["path"])
+            shutil.rmtree(split["path"] + config.SPLIT_CACHE_SUFFIX, ignore_errors=True)
+            del splits[name]
+            invalidated.append(name)
+
+    record_splits(splits)
+    if invalidated:
+        logger.info(f"Invalidated splits overlapping the appended rows: {invalidated}")
+    return invalidated
@@ -0,0 +1,281 @@
+import os
+import json
+import logging
+from datetime import datetime
+from typing import Optional
+import numpy as np
+import pandas as pd
+import config
+from services import chunk_reader_service, storage_service
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 2
+
+# Candidate formats for the timestamp column, tried in order on a sample value.
+# The .NET backend writes "yyyy-MM-dd HH:mm:ss".
+TIMESTAMP_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%SZ",
+    "%Y-%m-%d",
+)
+
+_INT_DTYPES = ("int8", "int16", "int32", "int64")
+# Integers above this magnitude are not exactly representable in float32.
+_FLOAT32_EXACT_INT = 2**24
+
+
+def _detect_timestamp_format(value: str) -> Optional[str]:
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            datetime.strptime(value, fmt)
+            return fmt
+        except ValueError:
+            continue
+    return None
+
+
+def _minimal_dtype(stats: dict, rows: int) -> str:
+    """
+    Picks the smallest numeric dtype that holds every observed value of a column.
+    Integer dtypes are only used for columns without missing values.
+    """
+    if stats["non_null"] == 0:
+        return "float32"
+    low, high = stats["min"], stats["max"]
+    if stats["integral"] and stats["non_null"] == rows:
+        for dtype in _INT_DTYPES:
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                return dtype
+    if stats["integral"] and max(abs(low), abs(high)) > _FLOAT32_EXACT_INT:
+        return "float64"
+    if max(abs(low), abs(high)) > np.finfo(np.float32).max:
+        return "float64"
+    return "float32"
+
+
+def _dataset_fingerprint(path: str) -> dict:
+    stat = os.stat(path)
+    return {"path": path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class ColumnStatsAccumulator:
+    """
+    Accumulates per-column statistics (non-null count, min, max, whether every
+    value is integral) over chunks whose numeric columns were read as float64.
+    """
+
+    def __init__(self, columns: list):
+        self.columns = columns
+        self.rows = 0
+        self._non_null = np.zeros(len(columns), dtype=np.int64)
+        self._min = np.full(len(columns), np.nan)
+        self._max = np.full(len(columns), np.nan)
+        self._integral = np.ones(len(columns), dtype=bool)
+
+    def update(self, chunk: pd.DataFrame):
+        values = chunk[self.columns].to_numpy(dtype=np.float64)
+        present = ~np.isnan(values)
+        self.rows += len(chunk)
+        self._non_null += present.sum(axis=0)
+        # fmin/fmax ignore NaN without warning about all-NaN columns.
+        self._min = np.fmin(self._min, np.fmin.reduce(values, axis=0))
+        self._max = np.fmax(self._max, np.fmax.reduce(values, axis=0))
+        self._integral &= np.all((values == np.floor(values)) | ~present, axis=0)
+
+    def column_stats(self) -> dict:
+        return {
+            name: {
+                "non_null": int(self._non_null[i]),
+                "min": None if np.isnan(self._min[i]) else float(self._min[i]),
+                "max": None if np.isnan(self._max[i]) else float(self._max[i]),
+                "integral": bool(self._integral[i]),
+            }
+            for i, name in enumerate(self.columns)
+        }
+
+
+def _finalize_column(stats: dict, rows: int) -> dict:
+    stats["dtype"] = _minimal_dtype(stats, rows)
+    stats["all_null"] = stats["non_null"] == 0
+    # A single value that is sometimes missing is not dead weight: whether the
+    # reading is present can carry the signal (XGBoost's missing-value branch).
+    single_valued = not stats["all_null"] and stats["min"] == stats["max"]
+    stats["constant"] = single_valued and stats["non_null"] == rows
+    stats["single_valued"] = single_valued and not stats["constant"]
+    return stats
+
+
+def scan_dtypes(columns: list) -> dict:
+    """
+    Returns the `dtype` argument for a statistics scan: every numeric column as
+    float64 and the timestamp column as a string.
+    """
+    return {
+        name: str if name == config.TIMESTAMP_COLUMN else "float64" for name in columns
+    }
+
+
+def infer_schema(path: str) -> dict:
+    """
+    Scans the dataset once to infer and persist its schema: the minimal numeric
+    dtype of every column, the timestamp format, and all-null / constant flags.
+    A column with one value and some nulls is flagged `single_valued` instead
+    of constant and stays informative.
+
+    The scan itself reads every numeric column as float64, so pandas never has
+    to infer dtypes for ~1000 columns chunk after chunk.
+    """
+    logger.info(f"Inferring dataset schema from {path}")
+    columns = list(pd.read_csv(path, nrows=0).columns)
+    numeric_columns = [c for c in columns if c != config.TIMESTAMP_COLUMN]
+
+    accumulator = ColumnStatsAccumulator(numeric_columns)
+    timestamp_format = None
+
+    for chunk in chunk_reader_service.iter_csv_chunks(path, dtype=scan_dtypes(columns)):
+        accumulator.update(chunk)
+        if timestamp_format is None:
+            first = chunk[config.TIMESTAMP_COLUMN].dropna()
+            if len(first):
+                timestamp_format = _detect_timestamp_format(first.iloc[0])
+
+    rows = accumulator.rows
+    schema_columns = {
+        name: _finalize_column(stats, rows)
+        for name, stats in accumulator.column_stats().items()
+    }
+
+    schema = {
+        "version": SCHEMA_VERSION,
+        "dataset": _dataset_fingerprint(path),
+        "rows": rows,
+        "timestamp": {
+            "column": config.TIMESTAMP_COLUMN,
+            "format": timestamp_format,
+        },
+        "columns": schema_columns,
+        "partitions": [],
+    }
+    save_schema(schema)
+
+    dead = sum(1 for c in schema_columns.values() if c["all_null"] or c["constant"])
+    logger.info(
+        f"Schema inferred for {len(columns)} columns over {rows} rows "
+        f"({dead} all-null or constant, timestamp format {timestamp_format!r})."
+    )
+    return schema
+
+
+def merge_partition_stats(
+    schema: dict, partition_id: str, column_stats: dict, rows: int
+) -> dict:
+    """
+    Folds the statistics of an appended partition into the schema, widening
+    dtypes and clearing all-null / constant flags where the new rows require it.
+    Merging the same partition twice is a no-op.
+    """
+    if partition_id in schema.setdefault("partitions", []):
+        return schema
+    total_rows = schema["rows"] + rows
+    for name, new in column_stats.items():
+        old = schema["columns"][name]
+        merged = {
+            "non_null": old["non_null"] + new["non_null"],
+            "min": min(
+                (v for v in (old["min"], new["min"]) if v is not None), default=None
+            ),
+            "max": max(
+                (v for v in (old["max"], new["max"]) if v is not None), default=None
+            ),
+            "integral": old["integral"] and new["integral"],
+        }
+        schema["columns"][name] = _finalize_column(merged, total_rows)
+    schema["rows"] = total_rows
+    schema["partitions"].append(partition_id)
+    return schema
+
+
+def save_schema(schema: dict):
+    storage_service.write_json(config.SCHEMA_PATH, schema)
+    logger.info(f"Dataset schema saved to {config.SCHEMA_PATH}")
+
+
+def load_schema(path: str) -> Optional[dict]:
+    """
+    Returns the persisted schema, or None if there is none or it was inferred
+    from a different version of the dataset file.
+    """
+    if not os.path.exists(config.SCHEMA_PATH):
+        return None
+    with open(config.SCHEMA_PATH, "r") as f:
+        schema = json.load(f)
+    if schema.get("version") != SCHEMA_VERSION:
+        return None
+    if schema.get("dataset") != _dataset_fingerprint(path):
+        logger.info("Persisted schema is stale; the dataset file has changed.")
+        return None
+    return schema
+
+
+def get_schema(path: str) -> dict:
+    """
+    Returns the persisted schema for the dataset, inferring it first if needed.
+    """
+    return load_schema(path) or infer_schema(path)
+
+
+def feature_columns(schema: dict) -> list:
+    """
+    Returns every feature column of the dataset, informative or not.
+    """
+    excluded = {config.ID_COLUMN, config.TARGET_COLUMN, config.TIMESTAMP_COLUMN}
+    return [name for name in schema["columns"] if name not in excluded]
+
+
+def informative_columns(schema: dict) -> list:
+    """
+    Returns the feature columns worth reading: everything except ID, target,
+    timestamp, and columns that are all-null or constant. Single-valued columns
+    with nulls are kept: their presence pattern can predict the label.
+    """
+    excluded = {config.ID_COLUMN, config.TARGET_COLUMN, config.TIMESTAMP_COLUMN}
+    return [
+        name
+        for name, stats in schema["columns"].items()
+        if name not in excluded and not stats["all_null"] and not stats["constant"]
+    ]
+
+
+def read_csv_kwargs(schema: dict, usecols: list) -> dict:
+    """
+    Builds explicit `pd.read_csv` arguments for the given columns, so readers
+    never fall back to dtype inference. The timestamp column is read as a string
+    and converted with `timestamps_to_epoch_ns`.
+    """
+    dtypes = {
+        name: (
+            str if name == config.TIMESTAMP_COLUMN else schema["columns"][name]["dtype"]
+        )
+        for name in usecols
+    }
+    return {"usecols": usecols, "dtype": dtypes}
+
+
+def timestamps_to_epoch_ns(values: pd.Series, schema: dict) -> np.ndarray:
+    """
+    Parses the timestamp column with the persisted format and returns int64
+    epoch nanoseconds (naive timestamps are treated as UTC).
+    """
+    fmt = schema["timestamp"]["format"] or "ISO8601"
+    parsed = pd.to_datetime(values, format=fmt)
+    if parsed.dt.tz is not None:
+        parsed = parsed.dt.tz_convert("UTC").dt.tz_localize(None)
+    return parsed.to_numpy(dtype="datetime64[ns]").view(np.int64)
@@ -0,0 +1,104 @@
+import os
+import uuid
+import config
+from celery_client import celery_app, SCORE_DATASET_TASK
+from services import cancellation_service, model_registry_service, storage_service
+
+# Every bulk scoring job gets a directory under SCORING_DIR named after its task
+# id, holding its uploaded input (if it was uploaded) and its predictions file.
+
+
+def new_job_id() -> str:
+    # Doubles as the Celery task id, so an upload can be stored before queueing.
+    return str(uuid.uuid4())
+
+
+def job_dir(job_id: str) -> str:
+    path = os.path.join(config.SCORING_DIR, job_id)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def upload_path(job_id: str) -> str:
+    return os.path.join(job_dir(job_id), config.SCORING_INPUT_FILENAME)
+
+
+def output_path(job_id: str) -> str:
+    """
+    Returns where the predictions of a job are (or will be) written. The
+    directory is not created, so unknown job ids do not leave one behind.
+    """
+    return os.path.join(
+        config.SCORING_DIR, os.path.basename(job_id), config.SCORING_OUTPUT_FILENAME
+    )
+
+
+def resolve_input_path(path: str) -> str:
+    """
+    Resolves a dataset path given relative to the storage directory (e.g.
+    "data/partitions/<id>.csv"). Paths outside of it are rejected.
+    """
+    storage_dir = os.path.realpath(config.STORAGE_BASE_DIR)
+    resolved = os.path.realpath(os.path.join(storage_dir, path))
+    if os.path.commonpath([storage_dir, resolved]) != storage_dir:
+        raise ValueError("The input path must be inside the storage directory.")
+    if not os.path.isfile(resolved):
+        raise FileNotFoundError(f"No such file in storage: {path}")
+    return resolved
+
+
+def start_scoring(input_path: str, job_id: str = None) -> dict:
+    """
+    Queues a scoring job for `input_path` with the current model and returns
+    the job's id, model and paths.
+    """
+    current = model_registry_service.current_model()
+    if current is None:
+        raise ValueError("No registered model; run a training first.")
+    job_id = job_id or new_job_id()
+    # Pinned while queued; the task takes the pin over and removes it when done.
+    storage_service.pin(job_id, [job_dir(job_id)])
+    celery_app.send_task(
+        SCORE_DATASET_TASK,
+        kwargs={
+            "input_path": input_path,
+            "output_path": output_path(job_id),
+            "model_id": current["id"],
+        },
+        task_id=job_id,
+    )
+    return {"task_id": job_id, "model_id": current["id"], "input_path": input_path}
+
+
+def stop_scoring(task_id: str):
+    """
+    Asks a scoring job to stop before its next chunk. A stopped job writes no
+    predictions file.
+    """
+    cancellation_service.request_stop(task_id)
+
+
+def build_scoring_status(task_id: str, meta: dict) -> dict:
+    """
+    Builds the status payload of a scoring job from its result backend meta
+    (as returned by `task_status_service.get_task_meta`).
+    """
+    status = meta["status"]
+    info = meta["result"]
+
+    result_payload = None
+    progress_payload = None
+
+    if status in ("SUCCESS", cancellation_service.STOPPED_STATE):
+        result_payload = info
+    elif status == "PROGRESS":
+        progress_payload = info
+    elif status == "FAILURE":
+        progress_payload = {"status": str(info)}
+
+    return {
+        "task_id": task_id,
+        "status": status,
+        "progress": progress_payload,
+        "result": result_payload,
+    }
@@ -1,47 +1,62 @@
-from celery_worker import celery_app, simulate_inference_task
-from celery.result import AsyncResult
+import config
+from celery_client import celery_app, SIMULATE_INFERENCE_TASK
 from models.response_models import SimulationProgress
+from services import cancellation_service, model_registry_service
 
 
-def start_simulation() -> str:
+def start_simulation(model_ids: list = None) -> str:
     """
-    Triggers the Celery simulation task and returns the task ID.
+    Triggers the Celery simulation task and returns the task ID. With
+    `model_ids`, every row is scored with each of those models (the first is
+    the champion) instead of only the current one.
     """
-    task = simulate_inference_task.delay()
+    if model_ids:
+        if len(set(model_ids)) != len(model_ids):
+            raise ValueError("Each model can be compared only once.")
+        if len(model_ids) > config.SIMULATION_MAX_MODELS:
+            raise ValueError(
+                f"At most {config.SIMULATION_MAX_MODELS} models can be compared."
+            )
+        for model_id in model_ids:
+            if model_registry_service.get_model(model_id) is None:
+                raise FileNotFoundError(f"Model {model_id} is not registered.")
+    task = celery_app.send_task(
+        SIMULATE_INFERENCE_TASK, kwargs={"model_ids": model_ids or None}
+    )
     return task.id
 
 
 def stop_simulation(task_id: str):
     """
-    Stops (revokes) a running Celery task.
-    terminate=True sends a SIGTERM to the process.
+    Asks a simulation task to stop. The task checks the flag between rows,
+    flushes its final statistics and ends in the STOPPED state; the worker
+    process is not killed.
     """
-    celery_app.control.revoke(task_id, terminate=True, signal="SIGTERM")
+    cancellation_service.request_stop(task_id)
 
 
-def get_simulation_status(task_id: str) -> dict:
+def build_simulation_status(task_id: str, meta: dict) -> dict:
     """
-    Checks the status of a Celery simulation task.
+    Builds the status payload of a simulation task from its result backend meta
+    (as returned by `task_status_service.get_task_meta`).
     """
-    task_result = AsyncResult(task_id, app=celery_app)
+    status = meta["status"]
+    info = meta["result"]
 
     result_payload = None
     progress_payload = None
 
-    status = task_result.state
-
-    if status == "SUCCESS":
-        result_payload = task_result.result
+    if status in ("SUCCESS", cancellation_service.STOPPED_STATE):
+        result_payload = info
     elif status == "REVOKED":
         result_payload = {"message": "Simulation was stopped by the user."}
     elif status == "PROGRESS":
-        meta_info = task_result.info
-        if meta_info and "current_row_index" in meta_info:
+        if info and "current_row_index" in info:
             # This is a full data stream packet, so validate it
             try:
-                progress_payload = SimulationProgress.model_validate(
-                    meta_info
-                ).model_dump()
+                progress_payload = SimulationProgress.model_validate(info).model_dump(
+                    mode="json"
+                )
             except Exception as e:
                 # Fallback in case of unexpected validation error during the stream
                 status = "FAILURE"
@@ -49,9 +64,9 @@ def get_simulation_status(task_id: str) -> dict:
         else:
             # This is a simple status message (like warmup), pass it through directly.
             # No Pydantic validation needed here.
-            progress_payload = meta_info
+            progress_payload = info
     elif status == "FAILURE":
-        progress_payload = {"status": str(task_result.info)}
+        progress_payload = {"status": str(info)}
 
     return {
         "task_id": task_id,
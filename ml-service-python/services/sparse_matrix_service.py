@@ -0,0 +1,249 @@
+import os
+import json
+import shutil
+import logging
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import config
+from services import storage_service
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def dataframe_to_csr(df: pd.DataFrame, columns: list) -> sp.csr_matrix:
+    """
+    Converts the given feature columns of a DataFrame into a float32 CSR matrix.
+
+    Missing values (NaN) are left implicit, so the matrix only stores the
+    observed sensor readings. Real zeros are kept as explicit entries so that
+    XGBoost can still tell "0.0" apart from "missing". Columns are converted
+    one at a time to avoid building a dense rows x columns array.
+    """
+    row_parts, col_parts, data_parts = [], [], []
+    for col_idx, col in enumerate(columns):
+        values = df[col].to_numpy(dtype=np.float32, na_value=np.nan)
+        present = np.flatnonzero(~np.isnan(values))
+        if present.size == 0:
+            continue
+        row_parts.append(present.astype(np.int64))
+        col_parts.append(np.full(present.size, col_idx, dtype=np.int32))
+        data_parts.append(values[present])
+
+    shape = (len(df), len(columns))
+    if not data_parts:
+        return sp.csr_matrix(shape, dtype=np.float32)
+
+    coo = sp.coo_matrix(
+        (
+            np.concatenate(data_parts),
+            (np.concatenate(row_parts), np.concatenate(col_parts)),
+        ),
+        shape=shape,
+        dtype=np.float32,
+    )
+    return coo.tocsr()
+
+
+def csr_to_dense(X: sp.csr_matrix) -> np.ndarray:
+    """
+    Expands (a few rows of) a CSR matrix into a dense float32 array where the
+    implicit entries are NaN rather than zero.
+    """
+    dense = np.full(X.shape, np.nan, dtype=np.float32)
+    coo = X.tocoo()
+    dense[coo.row, coo.col] = coo.data
+    return dense
+
+
+def save_sparse_split(
+    path: str,
+    X: sp.csr_matrix,
+    ids: np.ndarray,
+    labels: np.ndarray,
+    timestamps: np.ndarray,
+    feature_names: list,
+):
+    """
+    Saves a dataset split as an uncompressed .npz archive holding the CSR
+    components, the row metadata (ID, label, epoch-ns timestamp) and the
+    feature names, in column order.
+    """
+    X = X.tocsr()
+    with storage_service.atomic_write(path, "wb") as f:
+        np.savez(
+            f,
+            data=X.data.astype(np.float32, copy=False),
+            indices=X.indices,
+            indptr=X.indptr,
+            shape=np.asarray(X.shape, dtype=np.int64),
+            ids=np.asarray(ids, dtype=np.int64),
+            labels=np.asarray(labels, dtype=np.int8),
+            timestamps=np.asarray(timestamps, dtype=np.int64),
+            features=np.asarray(feature_names, dtype=str),
+        )
+    logger.info(
+        f"Saved sparse split to {path}: {X.shape[0]} rows, {X.nnz} stored values "
+        f"({X.nnz / max(X.shape[0] * X.shape[1], 1) * 100:.1f}% dense)."
+    )
+
+
+def load_sparse_split(path: str) -> dict:
+    """
+    Loads a split written by `save_sparse_split`.
+
+    Returns:
+        dict: with keys "X" (CSR matrix), "ids", "labels", "timestamps"
+        (int64 epoch nanoseconds, UTC) and "features" (list of column names).
+    """
+    with np.load(path, allow_pickle=False) as archive:
+        X = sp.csr_matrix(
+            (archive["data"], archive["indices"], archive["indptr"]),
+            shape=tuple(archive["shape"]),
+        )
+        return {
+            "X": X,
+            "ids": archive["ids"],
+            "labels": archive["labels"],
+            "timestamps": archive["timestamps"],
+            "features": archive["features"].tolist(),
+        }
+
+
+# --- Split Cache ---
+# Next to each split archive the split stage writes a cache directory of raw
+# .npy arrays (the CSR components and row metadata). They are memory-mapped on
+# load, so training, evaluation and simulation get the matrix zero-copy, and
+# processes on the same host share its pages. Optionally the cache also holds
+# an XGBoost DMatrix binary buffer with the labels.
+
+_CACHE_ARRAYS = ("data", "indices", "indptr", "ids", "labels", "timestamps")
+_CACHE_META_FILENAME = "meta.json"
+_DMATRIX_FILENAME = "dmatrix.buffer"
+
+
+def split_cache_dir(path: str) -> str:
+    return path + config.SPLIT_CACHE_SUFFIX
+
+
+def _source_fingerprint(path: str) -> dict:
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def save_split_cache(
+    path: str,
+    X: sp.csr_matrix,
+    ids: np.ndarray,
+    labels: np.ndarray,
+    timestamps: np.ndarray,
+    feature_names: list,
+    dmatrix_buffer: bool = None,
+):
+    """
+    Writes the cache of the split archive at `path` (which must already be
+    saved; the cache records its size and mtime to detect a stale cache).
+    The DMatrix buffer is written if `dmatrix_buffer` (default
+    SPLIT_DMATRIX_BUFFER) is set.
+    """
+    X = X.tocsr()
+    arrays = {
+        "data": X.data.astype(np.float32, copy=False),
+        "indices": X.indices,
+        "indptr": X.indptr,
+        "ids": np.asarray(ids, dtype=np.int64),
+        "labels": np.asarray(labels, dtype=np.int8),
+        "timestamps": np.asarray(timestamps, dtype=np.int64),
+    }
+    cache_dir = split_cache_dir(path)
+    tmp_dir = f"{cache_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(array))
+    if config.SPLIT_DMATRIX_BUFFER if dmatrix_buffer is None else dmatrix_buffer:
+        import xgboost as xgb
+
+        xgb.DMatrix(X, label=arrays["labels"]).save_binary(
+            os.path.join(tmp_dir, _DMATRIX_FILENAME), silent=True
+        )
+    with open(os.path.join(tmp_dir, _CACHE_META_FILENAME), "w") as f:
+        json.dump(
+            {
+                "shape": list(X.shape),
+                "features": list(feature_names),
+                "source": _source_fingerprint(path),
+            },
+            f,
+        )
+    # Swap the finished directory into place.
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp_dir, cache_dir)
+
+
+def _load_cache_meta(path: str):
+    meta_path = os.path.join(split_cache_dir(path), _CACHE_META_FILENAME)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, "r") as f:
+        meta = json.load(f)
+    return meta if meta["source"] == _source_fingerprint(path) else None
+
+
+def load_split(path: str) -> dict:
+    """
+    Loads a split like `load_sparse_split`, but from its memory-mapped cache.
+    A missing or stale cache is rebuilt from the archive first.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"Split not found at {path}. Please split the data first."
+        )
+    meta = _load_cache_meta(path)
+    if meta is None:
+        split = load_sparse_split(path)
+        save_split_cache(
+            path,
+            split["X"],
+            split["ids"],
+            split["labels"],
+            split["timestamps"],
+            split["features"],
+        )
+        meta = _load_cache_meta(path)
+
+    storage_service.record_access(path)
+    cache_dir = split_cache_dir(path)
+    arrays = {
+        name: np.load(os.path.join(cache_dir, f"{name}.npy"), mmap_mode="r")
+        for name in _CACHE_ARRAYS
+    }
+    X = sp.csr_matrix(
+        (arrays["data"], arrays["indices"], arrays["indptr"]),
+        shape=tuple(meta["shape"]),
+        copy=False,
+    )
+    return {
+        "X": X,
+        "ids": arrays["ids"],
+        "labels": arrays["labels"],
+        "timestamps": arrays["timestamps"],
+        "features": meta["features"],
+    }
+
+
+def load_dmatrix(path: str):
+    """
+    Returns the split at `path` as an XGBoost DMatrix with its labels, from the
+    cached binary buffer when there is one.
+    """
+    import xgboost as xgb
+
+    split = load_split(path)
+    buffer_path = os.path.join(split_cache_dir(path), _DMATRIX_FILENAME)
+    if os.path.exists(buffer_path):
+        return xgb.DMatrix(buffer_path, silent=True)
+    return xgb.DMatrix(split["X"], label=split["labels"])
@@ -0,0 +1,438 @@
+import os
+import json
+import time
+import uuid
+import fcntl
+import shutil
+import logging
+import contextlib
+from typing import Optional
+import config
+from services import model_registry_service, partition_service
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Everything the service keeps lives under STORAGE_BASE_DIR, on a volume shared
+# by the API and the workers. This module catalogues it as artifacts (a split
+# with its cache, a model version, a scoring job, ...), each with its size and
+# last access, and keeps the volume under its quota by evicting the least
+# recently used artifacts that can be rebuilt or are no longer needed.
+#
+# Last access is recorded explicitly (volumes are often mounted noatime) in a
+# small JSON index; an artifact never recorded falls back to its newest mtime.
+# Running tasks pin the artifacts they use with a file under STORAGE_PINS_DIR;
+# open upload sessions and finished scoring outputs are pinned the same way,
+# with their own time-to-live.
+#
+# Only the standard library is used, so the API can report usage and evict.
+
+# Kinds of artifacts that are never evicted: the dataset itself, the samples
+# feature selection needs, and the service's own state (features, schema,
+# manifests, the current model's copy).
+RETAINED_KINDS = ("dataset", "sample", "state", "other")
+
+TEMP_PREFIX = ".tmp-"
+
+_ACCESS_LOCK_PATH = config.STORAGE_ACCESS_PATH + ".lock"
+_EVICTION_LOCK_PATH = os.path.join(config.ARTIFACTS_DIR, "storage_eviction.lock")
+
+
+# --- Atomic Writes ---
+
+
+def temp_path(path: str) -> str:
+    """
+    Returns a unique temporary path next to `path` (same volume, so it can be
+    renamed into place). The name ends like `path`, so its extension is kept.
+    """
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f"{TEMP_PREFIX}{uuid.uuid4().hex[:8]}-{name}")
+
+
+@contextlib.contextmanager
+def atomic_path(path: str):
+    """
+    Yields a temporary path to write `path` through; it replaces `path` once
+    the block finishes, so readers see the old file or the complete new one.
+    """
+    tmp_path = temp_path(path)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@contextlib.contextmanager
+def atomic_write(path: str, mode: str = "w"):
+    """
+    Like `open(path, mode)`, but written through a temporary file that replaces
+    `path` only once the block finishes without an error.
+    """
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, mode) as f:
+            yield f
+
+
+def write_json(path: str, data, indent: Optional[int] = 4):
+    with atomic_write(path) as f:
+        json.dump(data, f, indent=indent)
+
+
+# --- Access Tracking ---
+
+
+@contextlib.contextmanager
+def _locked(lock_path: str, blocking: bool = True):
+    with open(lock_path, "w") as lock_file:
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(lock_file, flags)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _key(path: str) -> str:
+    return os.path.relpath(
+        os.path.realpath(path), os.path.realpath(config.STORAGE_BASE_DIR)
+    )
+
+
+def _load_access() -> dict:
+    if not os.path.exists(config.STORAGE_ACCESS_PATH):
+        return {}
+    with open(config.STORAGE_ACCESS_PATH, "r") as f:
+        return json.load(f)
+
+
+def record_access(path: str):
+    """
+    Records that the artifact at `path` (its root: a split archive, a model
+    version or job directory) was just used.
+    """
+    with _locked(_ACCESS_LOCK_PATH):
+        access = _load_access()
+        access[_key(path)] = time.time()
+        write_json(config.STORAGE_ACCESS_PATH, access, indent=None)
+
+
+def _forget_access(keys: list):
+    with _locked(_ACCESS_LOCK_PATH):
+        access = _load_access()
+        for key in keys:
+            access.pop(key, None)
+        write_json(config.STORAGE_ACCESS_PATH, access, indent=None)
+
+
+# --- Pins ---
+
+
+def _pin_path(task_id: str) -> str:
+    return os.path.join(config.STORAGE_PINS_DIR, f"{os.path.basename(task_id)}.json")
+
+
+def pin(task_id: str, paths: list, ttl: int = None):
+    """
+    Pins the artifacts at `paths` for a task (adding to what it already pinned)
+    so they are not evicted while it runs. Pinning again renews the pin. Pins
+    expire `ttl` seconds after they were last renewed (STORAGE_PIN_TTL_SECONDS
+    by default), so those of tasks that died without unpinning do not stay
+    forever. Tasks run without an id (called directly) pin nothing.
+    """
+    if not task_id:
+        return
+    pin_path = _pin_path(task_id)
+    pinned = []
+    if os.path.exists(pin_path):
+        with open(pin_path, "r") as f:
+            pinned = json.load(f)["paths"]
+    for key in map(_key, paths):
+        if key not in pinned:
+            pinned.append(key)
+    write_json(
+        pin_path,
+        {
+            "paths": pinned,
+            "pinned_at": time.time(),
+            "ttl": ttl or config.STORAGE_PIN_TTL_SECONDS,
+        },
+    )
+
+
+def unpin(task_id: str):
+    if not task_id:
+        return
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(_pin_path(task_id))
+
+
+def _pinned_keys() -> set:
+    keys = set()
+    now = time.time()
+    for name in os.listdir(config.STORAGE_PINS_DIR):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(config.STORAGE_PINS_DIR, name), "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            continue  # Removed or being replaced meanwhile.
+        if now - entry["pinned_at"] < entry.get("ttl", config.STORAGE_PIN_TTL_SECONDS):
+            keys.update(entry["paths"])
+    return keys
+
+
+# --- Catalogue ---
+
+
+def _tree_stats(path: str) -> tuple:
+    """
+    Returns (bytes, newest mtime) of a file or of every file under a directory.
+    """
+    if not os.path.isdir(path):
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime
+    size, mtime = 0, os.stat(path).st_mtime
+    for root, _, names in os.walk(path):
+        for name in names:
+            with contextlib.suppress(FileNotFoundError):
+                stat = os.stat(os.path.join(root, name))
+                size += stat.st_size
+                mtime = max(mtime, stat.st_mtime)
+    return size, mtime
+
+
+def _is_temp(name: str) -> bool:
+    # Leftovers of interrupted writes, including the older ".tmp" suffixes.
+    return name.startswith(TEMP_PREFIX) or ".tmp" in name
+
+
+def _entries(directory: str) -> list:
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.scandir(directory), key=lambda entry: entry.name)
+
+
+def _catalogue() -> list:
+    """
+    Lists (kind, path) for every artifact under STORAGE_BASE_DIR. A split
+    archive stands for itself and its cache directory.
+    """
+    artifacts = []
+    special_dirs = {
+        config.DATA_DIR,
+        config.ARTIFACTS_DIR,
+        config.UPLOADS_DIR,
+        config.SCORING_DIR,
+    }
+    for entry in _entries(config.STORAGE_BASE_DIR):
+        if entry.path not in special_dirs:
+            artifacts.append(("temp" if _is_temp(entry.name) else "other", entry.path))
+    for entry in _entries(config.UPLOADS_DIR):
+        artifacts.append(("upload", entry.path))
+    for entry in _entries(config.SCORING_DIR):
+        artifacts.append(("scoring", entry.path))
+
+    for entry in _entries(config.DATA_DIR):
+        if entry.path == config.PARTITIONS_DIR:
+            artifacts += [("dataset", e.path) for e in _entries(entry.path)]
+        elif entry.path == config.SAMPLES_DIR:
+            artifacts += [("sample", e.path) for e in _entries(entry.path)]
+        elif _is_temp(entry.name):
+            artifacts.append(("temp", entry.path))
+        elif entry.name.endswith(config.SPLIT_CACHE_SUFFIX):
+            # Caches without their archive are orphans, and are rebuilt anyway.
+            archive = entry.path[: -len(config.SPLIT_CACHE_SUFFIX)]
+            if not os.path.exists(archive):
+                artifacts.append(("cache", entry.path))
+        elif entry.path == config.BACKTEST_SET_PATH:
+            artifacts.append(("cache", entry.path))
+        elif entry.name.endswith(".npz"):
+            artifacts.append(("split", entry.path))
+        else:
+            artifacts.append(("dataset", entry.path))
+
+    per_job_dirs = {
+        config.MODELS_DIR: "model",
+        config.DRIFT_SKETCHES_DIR: "drift",
+        config.DISTRIBUTED_JOBS_DIR: "distributed",
+        config.BACKTESTS_DIR: "backtest",
+    }
+    for entry in _entries(config.ARTIFACTS_DIR):
+        if entry.path in per_job_dirs:
+            for job in _entries(entry.path):
+                if job.is_file() and entry.path == config.MODELS_DIR:
+                    artifacts.append(("state", job.path))  # current.json
+                else:
+                    artifacts.append((per_job_dirs[entry.path], job.path))
+        elif entry.path == config.STORAGE_PINS_DIR:
+            continue
+        else:
+            artifacts.append(("temp" if _is_temp(entry.name) else "state", entry.path))
+    return artifacts
+
+
+def list_artifacts() -> list:
+    """
+    Returns every artifact with its kind, size, last access (epoch seconds) and
+    whether it is pinned or may be evicted, least recently used first.
+    """
+    access = _load_access()
+    pinned_keys = _pinned_keys()
+    current = model_registry_service.current_model()
+    if current is not None:
+        pinned_keys.add(_key(os.path.join(config.MODELS_DIR, current["id"])))
+
+    artifacts = []
+    for kind, path in _catalogue():
+        paths = [path]
+        if kind in ("split", "cache") and not path.endswith(config.SPLIT_CACHE_SUFFIX):
+            paths.append(path + config.SPLIT_CACHE_SUFFIX)
+        size, mtime = 0, 0.0
+        for part in paths:
+            with contextlib.suppress(FileNotFoundError):
+                part_size, part_mtime = _tree_stats(part)
+                size, mtime = size + part_size, max(mtime, part_mtime)
+        key = _key(path)
+        artifacts.append(
+            {
+                "key": key,
+                "kind": kind,
+                "paths": paths,
+                "bytes": size,
+                "last_access": max(access.get(key, 0.0), mtime),
+                "pinned": key in pinned_keys,
+                "evictable": kind not in RETAINED_KINDS,
+            }
+        )
+    return sorted(artifacts, key=lambda a: a["last_access"])
+
+
+def usage() -> dict:
+    """
+    Summarizes storage use against the quota and the volume's free space.
+    """
+    artifacts = list_artifacts()
+    disk = shutil.disk_usage(config.STORAGE_BASE_DIR)
+    used = sum(a["bytes"] for a in artifacts)
+    by_kind = {}
+    for artifact in artifacts:
+        by_kind[artifact["kind"]] = by_kind.get(artifact["kind"], 0) + artifact["bytes"]
+    return {
+        "quota_bytes": config.STORAGE_QUOTA_BYTES,
+        "used_bytes": used,
+        "evictable_bytes": sum(
+            a["bytes"] for a in artifacts if a["evictable"] and not a["pinned"]
+        ),
+        "pinned_bytes": sum(a["bytes"] for a in artifacts if a["pinned"]),
+        "disk_total_bytes": disk.total,
+        "disk_free_bytes": disk.free,
+        "over_quota": bool(config.STORAGE_QUOTA_BYTES)
+        and used > config.STORAGE_QUOTA_BYTES,
+        "by_kind": by_kind,
+        "artifacts": artifacts,
+    }
+
+
+# --- Eviction ---
+
+
+def _remove(artifact: dict):
+    if artifact["kind"] == "split":
+        # Same as a split invalidated by an append: it has to be cut again.
+        with partition_service.manifest_lock():
+            splits = partition_service.load_split_manifest()
+            remaining = {
+                name: split
+                for name, split in splits.items()
+                if _key(split["path"]) != artifact["key"]
+            }
+            if remaining != splits:
+                partition_service.record_splits(remaining)
+    for path in artifact["paths"]:
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+
+
+def over_limits() -> bool:
+    """
+    Cheap check of whether eviction is needed: the volume's free space and,
+    when a quota is set, one walk summing the size of the storage tree.
+    """
+    if shutil.disk_usage(config.STORAGE_BASE_DIR).free < config.STORAGE_MIN_FREE_BYTES:
+        return True
+    if not config.STORAGE_QUOTA_BYTES:
+        return False
+    return _tree_stats(config.STORAGE_BASE_DIR)[0] > config.STORAGE_QUOTA_BYTES
+
+
+def enforce_quota() -> dict:
+    """
+    Evicts idle, unpinned artifacts, least recently used first, while storage
+    is over STORAGE_QUOTA_BYTES (down to STORAGE_EVICTION_TARGET of it) or the
+    volume has less than STORAGE_MIN_FREE_BYTES free. Artifacts used within
+    STORAGE_EVICTION_GRACE_SECONDS are kept. Only one process evicts at a time;
+    the others return without evicting.
+
+    Returns:
+        dict: the evicted artifacts, the bytes freed and the bytes used after.
+    """
+    evicted = []
+    used = None
+    with _locked(_EVICTION_LOCK_PATH, blocking=False) as acquired:
+        if acquired:
+            artifacts = list_artifacts()
+            used = sum(a["bytes"] for a in artifacts)
+            free = shutil.disk_usage(config.STORAGE_BASE_DIR).free
+            excess = max(config.STORAGE_MIN_FREE_BYTES - free, 0)
+            if config.STORAGE_QUOTA_BYTES and used > config.STORAGE_QUOTA_BYTES:
+                target = int(
+                    config.STORAGE_QUOTA_BYTES * config.STORAGE_EVICTION_TARGET
+                )
+                excess = max(excess, used - target)
+
+            idle_before = time.time() - config.STORAGE_EVICTION_GRACE_SECONDS
+            for artifact in artifacts:
+                if excess <= 0:
+                    break
+                if (
+                    not artifact["evictable"]
+                    or artifact["pinned"]
+                    or artifact["last_access"] > idle_before
+                ):
+                    continue
+                _remove(artifact)
+                evicted.append(artifact)
+                excess -= artifact["bytes"]
+                used -= artifact["bytes"]
+
+            if evicted:
+                _forget_access([a["key"] for a in evicted])
+                logger.info(
+                    f"Evicted {len(evicted)} artifacts "
+                    f"({sum(a['bytes'] for a in evicted) / 2**20:.1f}MB): "
+                    f"{[a['key'] for a in evicted]}"
+                )
+            if excess > 0:
+                logger.warning(
+                    f"Storage is still {excess / 2**20:.1f}MB over its limits; "
+                    f"the rest is retained, pinned or in use."
+                )
+    if used is None:  # Another process is evicting.
+        used = _tree_stats(config.STORAGE_BASE_DIR)[0]
+    return {
+        "evicted": evicted,
+        "freed_bytes": sum(a["bytes"] for a in evicted),
+        "used_bytes": used,
+    }
@@ -0,0 +1,170 @@
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Callable, Optional
+import redis.asyncio as aioredis
+from fastapi import Request, Response, status
+from celery_client import celery_app
+import config
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Task states after which the stored meta never changes again.
+READY_STATES = {"SUCCESS", "FAILURE", "REVOKED", "STOPPED"}
+
+_redis_client: Optional[aioredis.Redis] = None
+
+# task_id -> (expires_at, version, meta). Shared by every poller in this process,
+# so N dashboards watching the same task cost one Redis GET per TTL window.
+_meta_cache: dict = {}
+# task_id -> in-flight lookup, so concurrent cache misses share one round-trip.
+_inflight_lookups: dict = {}
+# (task_id, version, builder) -> encoded JSON body. A status payload is built and
+# validated once per state version instead of once per poll.
+_body_cache: dict = {}
+
+
+def get_redis_client() -> aioredis.Redis:
+    """
+    Returns the process-wide async Redis client for the Celery result backend.
+    """
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = aioredis.Redis.from_url(config.CELERY_RESULT_BACKEND)
+    return _redis_client
+
+
+async def _load_task_meta(task_id: str) -> tuple:
+    """
+    Reads a task's meta straight from the result backend key.
+    Returns (version, meta), where version is a short hash of the stored bytes.
+    """
+    key = celery_app.backend.get_key_for_task(task_id)
+    raw = await get_redis_client().get(key)
+    if raw is None:
+        # Celery reports unknown task ids as PENDING as well.
+        return "pending", {"status": "PENDING", "result": None}
+    meta = celery_app.backend.decode_result(raw)
+    return hashlib.blake2b(raw, digest_size=8).hexdigest(), meta
+
+
+def _prune_caches(now: float):
+    if len(_meta_cache) > config.STATUS_CACHE_MAX_ENTRIES:
+        for task_id in [k for k, v in _meta_cache.items() if v[0] <= now]:
+            del _meta_cache[task_id]
+    if len(_body_cache) > config.STATUS_CACHE_MAX_ENTRIES:
+        live = {(k, v[1]) for k, v in _meta_cache.items()}
+        for key in [k for k in _body_cache if (k[0], k[1]) not in live]:
+            del _body_cache[key]
+
+
+async def get_task_meta(task_id: str) -> tuple:
+    """
+    Returns (version, meta) for a task, served from a short TTL cache that is
+    shared across concurrent pollers of the same task.
+    """
+    loop = asyncio.get_running_loop()
+    cached = _meta_cache.get(task_id)
+    if cached and cached[0] > loop.time():
+        return cached[1], cached[2]
+
+    lookup = _inflight_lookups.get(task_id)
+    if lookup is None:
+        lookup = asyncio.ensure_future(_load_task_meta(task_id))
+        _inflight_lookups[task_id] = lookup
+        try:
+            version, meta = await lookup
+        finally:
+            _inflight_lookups.pop(task_id, None)
+        now = loop.time()
+        _meta_cache[task_id] = (now + config.STATUS_CACHE_TTL_SECONDS, version, meta)
+        _prune_caches(now)
+        return version, meta
+
+    return await asyncio.shield(lookup)
+
+
+async def wait_for_change(task_id: str, known_version: str, timeout: float) -> tuple:
+    """
+    Long-poll helper: returns as soon as the task's state version differs from
+    `known_version`, or with the unchanged state once `timeout` seconds pass.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        version, meta = await get_task_meta(task_id)
+        remaining = deadline - loop.time()
+        if version != known_version or meta["status"] in READY_STATES or remaining <= 0:
+            return version, meta
+        await asyncio.sleep(min(config.STATUS_LONG_POLL_INTERVAL_SECONDS, remaining))
+
+
+async def wait_until_ready(task_id: str, timeout: float) -> dict:
+    """
+    Waits, without blocking the event loop, until a task reaches a ready state
+    or `timeout` seconds pass, and returns its meta either way.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    version = None
+    while True:
+        version, meta = await wait_for_change(task_id, version, deadline - loop.time())
+        if meta["status"] in READY_STATES or loop.time() >= deadline:
+            return meta
+
+
+def _json_default(obj):
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    return str(obj)
+
+
+def _etag_version(request: Request) -> Optional[str]:
+    etag = request.headers.get("if-none-match")
+    if not etag:
+        return None
+    return etag.strip().removeprefix("W/").strip('"')
+
+
+async def status_response(
+    request: Request,
+    task_id: str,
+    build_status: Callable[[str, dict], dict],
+    wait: float = 0.0,
+) -> Response:
+    """
+    Serves a task status endpoint with ETag support and optional long-polling.
+
+    `build_status(task_id, meta)` turns the backend meta into the response
+    payload; its JSON encoding is cached per state version. When the client sends
+    `If-None-Match` with the current version, a 304 is returned. With `wait > 0`
+    the request is held until the version changes (or `wait` seconds elapse).
+    """
+    known_version = _etag_version(request)
+    if wait > 0 and known_version:
+        version, meta = await wait_for_change(
+            task_id, known_version, min(wait, config.STATUS_LONG_POLL_MAX_SECONDS)
+        )
+    else:
+        version, meta = await get_task_meta(task_id)
+
+    headers = {"ETag": f'"{version}"', "Cache-Control": "no-cache"}
+    if known_version == version:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    body_key = (task_id, version, build_status)
+    body = _body_cache.get(body_key)
+    if body is None:
+        payload = build_status(task_id, meta)
+        body = json.dumps(
+            payload, default=_json_default, separators=(",", ":")
+        ).encode()
+        _body_cache[body_key] = body
+
+    return Response(content=body, media_type="application/json", headers=headers)
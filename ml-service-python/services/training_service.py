@@ -1,37 +1,177 @@
-from celery_worker import celery_app, train_model_task
-from celery.result import AsyncResult
-from models.response_models import TrainingResult
+from datetime import datetime, timezone
+import config
+from celery_client import celery_app, TRAIN_MODEL_TASK, BACKTEST_TASK, SPLIT_DATA_TASK
+from models.response_models import (
+    BacktestRequest,
+    BacktestResult,
+    DateSplitRequest,
+    ModelInfo,
+    TrainingRequest,
+    TrainingResult,
+)
+from services import cancellation_service, model_registry_service
 
 
-def start_training_session() -> str:
+def start_split(request: DateSplitRequest) -> str:
+    """
+    Queues the dataset split on the cpu queue and returns the task ID.
+    """
+    task = celery_app.send_task(
+        SPLIT_DATA_TASK, kwargs={"request": request.model_dump(mode="json")}
+    )
+    return task.id
+
+
+def start_training_session(request: TrainingRequest = None) -> str:
     """
     Triggers the Celery training task and returns the task ID.
     """
-    task = train_model_task.delay()
+    request = request or TrainingRequest()
+    if request.mode == "update":
+        if model_registry_service.current_model() is None:
+            raise ValueError(
+                "No registered model to update; run a full training first."
+            )
+        if (request.extra_rounds or 0) > config.UPDATE_MAX_EXTRA_ROUNDS:
+            raise ValueError(
+                f"extra_rounds must be at most {config.UPDATE_MAX_EXTRA_ROUNDS}."
+            )
+        if request.workers > 1:
+            raise ValueError("Updates train in a single process; use workers=1.")
+    if request.workers > config.DISTRIBUTED_MAX_WORKERS:
+        raise ValueError(f"workers must be at most {config.DISTRIBUTED_MAX_WORKERS}.")
+    task = celery_app.send_task(TRAIN_MODEL_TASK, kwargs=request.model_dump())
     return task.id
 
 
-def get_training_status(task_id: str) -> dict:
+def stop_training(task_id: str):
     """
-    Checks the status of a Celery task.
+    Asks a training task to stop after its current boosting round. A stopped
+    training saves no model.
     """
-    task_result = AsyncResult(task_id, app=celery_app)
+    cancellation_service.request_stop(task_id)
+
+
+def start_backtest(request: BacktestRequest) -> str:
+    """
+    Triggers a rolling-origin backtest and returns its task ID.
+    """
+    if (request.max_folds or 0) > config.BACKTEST_MAX_FOLDS:
+        raise ValueError(f"max_folds must be at most {config.BACKTEST_MAX_FOLDS}.")
+    kwargs = request.model_dump(mode="json")
+    kwargs["step_days"] = request.step_days or request.test_days
+    task = celery_app.send_task(BACKTEST_TASK, kwargs=kwargs)
+    return task.id
+
+
+def stop_backtest(task_id: str):
+    """
+    Asks a backtest to stop: running folds stop after their current boosting
+    round and queued folds are skipped. The folds evaluated so far are kept.
+    """
+    cancellation_service.request_stop(task_id)
+
+
+def list_models() -> list:
+    """
+    Returns the registered model versions, newest first, marking the current one.
+    """
+    current = model_registry_service.current_model()
+    return [
+        ModelInfo(
+            **{
+                k: v
+                for k, v in m.items()
+                if k in ModelInfo.model_fields and k not in ("created_at", "current")
+            },
+            created_at=datetime.fromtimestamp(m["created_at"], timezone.utc),
+            current=current is not None and m["id"] == current["id"],
+        )
+        for m in model_registry_service.list_models()
+    ]
+
+
+def _chart_points(series) -> list:
+    """
+    Expands a columnar chart series ({"x": [...], "y": [...]}, possibly with
+    more columns) stored by the worker into the list of points exposed by the API.
+    """
+    if not isinstance(series, dict):
+        return series
+    # Columns decode to numpy arrays in processes that have numpy loaded.
+    columns = {
+        name: col.tolist() if hasattr(col, "tolist") else col
+        for name, col in series.items()
+    }
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+def build_training_status(task_id: str, meta: dict) -> dict:
+    """
+    Builds the status payload of a training task from its result backend meta
+    (as returned by `task_status_service.get_task_meta`).
+    """
+    state = meta["status"]
+    info = meta["result"]
 
     result_payload = None
     progress_payload = None
 
-    if task_result.state == "SUCCESS":
+    if state == "SUCCESS":
         # If successful, parse the result using our Pydantic model
-        result_payload = TrainingResult.model_validate(task_result.result).model_dump()
-    elif task_result.state == "PROGRESS":
-        progress_payload = task_result.info  # This contains our custom 'meta' dict
-    elif task_result.state == "FAILURE":
+        result = dict(info)
+        result["training_chart"] = {
+            name: _chart_points(series)
+            for name, series in info["training_chart"].items()
+        }
+        if info.get("evaluation"):
+            result["evaluation"] = {
+                **info["evaluation"],
+                "roc_curve": _chart_points(info["evaluation"]["roc_curve"]),
+                "pr_curve": _chart_points(info["evaluation"]["pr_curve"]),
+            }
+        result_payload = TrainingResult.model_validate(result).model_dump(mode="json")
+    elif state == "PROGRESS":
+        progress_payload = info  # This contains our custom 'meta' dict
+    elif state == cancellation_service.STOPPED_STATE:
+        progress_payload = info  # {"status": ..., "rounds_completed": ...}
+    elif state == "FAILURE":
         # Provide the error message on failure
-        progress_payload = {"status": str(task_result.info)}
+        progress_payload = {"status": str(info)}
+
+    return {
+        "task_id": task_id,
+        "status": state,
+        "progress": progress_payload,
+        "result": result_payload,
+    }
+
+
+def build_backtest_status(task_id: str, meta: dict) -> dict:
+    """
+    Builds the status payload of a backtest from its result backend meta. The
+    backtest task replaces itself with its folds, and the final result is
+    stored under its id by the summary task.
+    """
+    state = meta["status"]
+    info = meta["result"]
+
+    result_payload = None
+    progress_payload = None
+
+    if state == "SUCCESS":
+        result_payload = BacktestResult.model_validate(info).model_dump(mode="json")
+    elif state == cancellation_service.STOPPED_STATE:
+        progress_payload = {"status": info["status"]}
+        result_payload = BacktestResult.model_validate(info).model_dump(mode="json")
+    elif state == "PROGRESS":
+        progress_payload = info
+    elif state == "FAILURE":
+        progress_payload = {"status": str(info)}
 
     return {
         "task_id": task_id,
-        "status": task_result.state,
+        "status": state,
         "progress": progress_payload,
         "result": result_payload,
     }
@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import asyncio
+import hashlib
+import logging
+import config
+from services import storage_service
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Resumable uploads: a session owns a pre-allocated data file that parts are
+# written into at their final offsets (no concatenation copy), plus one marker
+# file per verified part. Markers live on disk so any API replica sharing the
+# storage volume can report and finalize the session. An open session is pinned
+# against eviction; every part renews the pin, and one idle for
+# UPLOAD_SESSION_TTL_SECONDS is left to eviction as abandoned.
+
+SESSION_FILENAME = "session.json"
+DATA_FILENAME = "data.part"
+PARTS_DIRNAME = "parts"
+
+
+class UploadSessionNotFound(KeyError):
+    pass
+
+
+class UploadIncomplete(Exception):
+    pass
+
+
+def _session_dir(upload_id: str) -> str:
+    # Upload ids are generated by us; reject anything that could escape the dir.
+    if not upload_id or not upload_id.isalnum():
+        raise UploadSessionNotFound(upload_id)
+    return os.path.join(config.UPLOADS_DIR, upload_id)
+
+
+def _load_session(upload_id: str) -> dict:
+    path = os.path.join(_session_dir(upload_id), SESSION_FILENAME)
+    if not os.path.exists(path):
+        raise UploadSessionNotFound(upload_id)
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _pin_session(upload_id: str):
+    storage_service.pin(
+        f"upload-{upload_id}",
+        [_session_dir(upload_id)],
+        ttl=config.UPLOAD_SESSION_TTL_SECONDS,
+    )
+
+
+def _part_length(session: dict, part_number: int) -> int:
+    start = part_number * session["part_size"]
+    return min(session["part_size"], session["total_size"] - start)
+
+
+def _received_parts(upload_id: str) -> list:
+    parts_dir = os.path.join(_session_dir(upload_id), PARTS_DIRNAME)
+    return sorted(int(name) for name in os.listdir(parts_dir) if name.isdigit())
+
+
+def create_session(filename: str, total_size: int, part_size: int = None) -> dict:
+    """
+    Creates an upload session and pre-allocates its data file.
+    """
+    part_size = part_size or config.UPLOAD_DEFAULT_PART_SIZE
+    if total_size <= 0:
+        raise ValueError("total_size must be positive.")
+    if not 0 < part_size <= config.UPLOAD_MAX_PART_SIZE:
+        raise ValueError(
+            f"part_size must be between 1 and {config.UPLOAD_MAX_PART_SIZE} bytes."
+        )
+
+    upload_id = uuid.uuid4().hex
+    session_dir = _session_dir(upload_id)
+    os.makedirs(os.path.join(session_dir, PARTS_DIRNAME))
+    _pin_session(upload_id)
+
+    # A sparse file of the final size; parts are written at their offsets.
+    with open(os.path.join(session_dir, DATA_FILENAME), "wb") as f:
+        f.truncate(total_size)
+
+    session = {
+        "upload_id": upload_id,
+        "filename": filename,
+        "total_size": total_size,
+        "part_size": part_size,
+        "part_count": -(-total_size // part_size),
+        "created_at": time.time(),
+    }
+    with open(os.path.join(session_dir, SESSION_FILENAME), "w") as f:
+        json.dump(session, f)
+
+    logger.info(
+        f"Created upload session {upload_id} for {filename} "
+        f"({total_size / (1024*1024):.1f}MB in {session['part_count']} parts)."
+    )
+    return session
+
+
+async def write_part(upload_id: str, part_number: int, stream, checksum: str) -> dict:
+    """
+    Streams one part into the session's data file at its offset, verifying its
+    length and SHA-256 checksum. Parts may arrive in any order and in parallel;
+    re-sending a part simply overwrites it.
+    """
+    session = _load_session(upload_id)
+    if not 0 <= part_number < session["part_count"]:
+        raise ValueError(
+            f"part_number must be between 0 and {session['part_count'] - 1}."
+        )
+
+    _pin_session(upload_id)
+    session_dir = _session_dir(upload_id)
+    marker_path = os.path.join(session_dir, PARTS_DIRNAME, str(part_number))
+    expected_length = _part_length(session, part_number)
+    offset = part_number * session["part_size"]
+    digest = hashlib.sha256()
+    received = 0
+
+    # A part being re-sent is not complete until it verifies again.
+    if os.path.exists(marker_path):
+        os.remove(marker_path)
+
+    fd = os.open(os.path.join(session_dir, DATA_FILENAME), os.O_WRONLY)
+    try:
+        async for chunk in stream:
+            if not chunk:
+                continue
+            if received + len(chunk) > expected_length:
+                raise ValueError(
+                    f"Part {part_number} is larger than the expected {expected_length} bytes."
+                )
+            digest.update(chunk)
+            await asyncio.to_thread(os.pwrite, fd, chunk, offset + received)
+            received += len(chunk)
+        await asyncio.to_thread(os.fsync, fd)
+    finally:
+        os.close(fd)
+
+    if received != expected_length:
+        raise ValueError(
+            f"Part {part_number} has {received} bytes, expected {expected_length}."
+        )
+    if digest.hexdigest() != checksum.lower():
+        raise ValueError(f"Checksum mismatch for part {part_number}.")
+
+    with open(marker_path, "w") as f:
+        f.write(digest.hexdigest())
+    return {"upload_id": upload_id, "part_number": part_number, "size": received}
+
+
+def get_session_status(upload_id: str) -> dict:
+    """
+    Returns the session and which of its parts have been received and verified.
+    """
+    session = _load_session(upload_id)
+    received = _received_parts(upload_id)
+    received_set = set(received)
+    return {
+        **session,
+        "received_parts": received,
+        "missing_parts": [
+            n for n in range(session["part_count"]) if n not in received_set
+        ],
+    }
+
+
+def finalize_session(upload_id: str) -> dict:
+    """
+    Checks that every part arrived and returns the session status, including
+    `data_path`: the assembled file, ready to be moved into place.
+    """
+    status = get_session_status(upload_id)
+    if status["missing_parts"]:
+        raise UploadIncomplete(
+            f"{len(status['missing_parts'])} of {status['part_count']} parts are missing."
+        )
+    status["data_path"] = os.path.join(_session_dir(upload_id), DATA_FILENAME)
+    logger.info(f"All {status['part_count']} parts of upload {upload_id} received.")
+    return status
+
+
+def discard_session(upload_id: str):
+    """
+    Removes a session and whatever is left of its data file.
+    """
+    shutil.rmtree(_session_dir(upload_id), ignore_errors=True)
+    storage_service.unpin(f"upload-{upload_id}")
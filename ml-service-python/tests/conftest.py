@@ -0,0 +1,42 @@
+import os
+import pytest
+import config
+
+
+@pytest.fixture
+def storage_dir(tmp_path, monkeypatch):
+    """
+    Points every storage path of the config (and the paths derived from them
+    at import time) at a fresh directory tree under tmp_path.
+    """
+    base = config.STORAGE_BASE_DIR
+    root = str(tmp_path / "storage")
+    for name, value in list(vars(config).items()):
+        if name.isupper() and isinstance(value, str) and value.startswith(base):
+            monkeypatch.setattr(config, name, root + value[len(base) :])
+    for name in (
+        "DATA_DIR",
+        "ARTIFACTS_DIR",
+        "UPLOADS_DIR",
+        "PARTITIONS_DIR",
+        "SAMPLES_DIR",
+        "MODELS_DIR",
+        "DRIFT_SKETCHES_DIR",
+        "DISTRIBUTED_JOBS_DIR",
+        "SCORING_DIR",
+        "BACKTESTS_DIR",
+        "STORAGE_PINS_DIR",
+    ):
+        os.makedirs(getattr(config, name), exist_ok=True)
+
+    from services import storage_service
+
+    monkeypatch.setattr(
+        storage_service, "_ACCESS_LOCK_PATH", config.STORAGE_ACCESS_PATH + ".lock"
+    )
+    monkeypatch.setattr(
+        storage_service,
+        "_EVICTION_LOCK_PATH",
+        os.path.join(config.ARTIFACTS_DIR, "storage_eviction.lock"),
+    )
+    return root
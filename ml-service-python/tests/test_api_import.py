@@ -0,0 +1,42 @@
+import json
+import os
+import subprocess
+import sys
+import config
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported in a fresh interpreter, so nothing this test process (or another
+# test) has already loaded is counted.
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+seconds = time.perf_counter() - started
+print(json.dumps({"seconds": seconds, "modules": sorted(sys.modules)}))
+"""
+
+
+def _import_main() -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=SERVICE_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def test_api_import_loads_no_heavy_modules():
+    probe = _import_main()
+    loaded = [m for m in config.API_FORBIDDEN_MODULES if m in probe["modules"]]
+    assert not loaded, f"The API process imported heavy modules: {loaded}"
+
+
+def test_api_import_within_budget():
+    probe = _import_main()
+    assert probe["seconds"] < config.API_IMPORT_BUDGET_SECONDS, (
+        f"Importing the API took {probe['seconds']:.2f}s, over the "
+        f"{config.API_IMPORT_BUDGET_SECONDS:.2f}s budget."
+    )
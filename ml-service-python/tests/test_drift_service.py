@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from services import drift_service
+
+FEATURES = [f"L0_S0_F{j}" for j in range(6)]
+
+
+def _sparse_rows(seed: int, n: int, shift: float = 0.0, missing: float = 0.5):
+    """
+    Rows of normal readings with `missing` of them left out (implicit), the
+    way splits store missing sensors.
+    """
+    rng = np.random.default_rng(seed)
+    X = rng.normal(shift, 1.0, size=(n, len(FEATURES)))
+    X[rng.random(X.shape) < missing] = 0.0
+    return sp.csr_matrix(X)
+
+
+@pytest.fixture
+def reference():
+    return drift_service.build_reference(_sparse_rows(0, 5000), FEATURES, bins=10)
+
+
+def _sketch_of(reference, X):
+    sketch = reference.empty_copy()
+    sketch.update(X)
+    return sketch
+
+
+def test_merge_equals_sketch_of_the_union(reference):
+    A, B, C = (_sparse_rows(seed, 700 + seed) for seed in (1, 2, 3))
+    union = _sketch_of(reference, sp.vstack([A, B, C]).tocsr())
+
+    left = _sketch_of(reference, A).merge(_sketch_of(reference, B))
+    left.merge(_sketch_of(reference, C))
+    right = _sketch_of(reference, B).merge(_sketch_of(reference, C))
+    right = _sketch_of(reference, A).merge(right)
+
+    for merged in (left, right):
+        assert merged.rows == union.rows
+        assert np.array_equal(merged.counts, union.counts)
+
+
+def test_row_by_row_updates_equal_one_batch(reference):
+    X = _sparse_rows(4, 300)
+    by_row = reference.empty_copy()
+    for i in range(X.shape[0]):
+        by_row.update(X[i])
+    assert np.array_equal(by_row.counts, _sketch_of(reference, X).counts)
+    assert by_row.rows == X.shape[0]
+
+
+def test_merge_rejects_other_edges(reference):
+    other = drift_service.build_reference(_sparse_rows(5, 1000), FEATURES, bins=10)
+    with pytest.raises(ValueError):
+        reference.empty_copy().merge(other)
+
+
+def test_identical_data_scores_no_drift(reference):
+    scores = drift_service.drift_scores(
+        _sketch_of(reference, _sparse_rows(0, 5000)), reference
+    )
+    assert np.allclose(scores["psi"], 0.0)
+    assert np.allclose(scores["ks"], 0.0)
+    assert np.allclose(scores["null_rate"], scores["reference_null_rate"])
+
+
+def test_shifted_data_scores_more_drift_than_fresh_samples(reference):
+    same = drift_service.drift_scores(
+        _sketch_of(reference, _sparse_rows(6, 2000)), reference
+    )
+    shifted = drift_service.drift_scores(
+        _sketch_of(reference, _sparse_rows(6, 2000, shift=1.0)), reference
+    )
+    assert same["psi"].max() < 0.05
+    assert shifted["psi"].min() > 0.25
+    assert (shifted["ks"] > same["ks"]).all()
+    summary = drift_service.summarize(
+        _sketch_of(reference, _sparse_rows(6, 2000, shift=1.0)), reference
+    )
+    assert summary["drifting_features"] == len(FEATURES)
+
+
+def test_null_rate_change_is_reported(reference):
+    scores = drift_service.drift_scores(
+        _sketch_of(reference, _sparse_rows(7, 2000, missing=0.9)), reference
+    )
+    assert np.allclose(scores["null_rate"], 0.9, atol=0.03)
+    assert np.allclose(scores["reference_null_rate"], 0.5, atol=0.03)
+
+
+def test_save_load_round_trip(tmp_path, reference):
+    sketch = _sketch_of(reference, _sparse_rows(8, 500))
+    path = str(tmp_path / "sketch.npz")
+    drift_service.save_sketch(path, sketch)
+    loaded = drift_service.load_sketch(path)
+    assert loaded.features == sketch.features
+    assert np.array_equal(loaded.edges, sketch.edges)
+    assert np.array_equal(loaded.counts, sketch.counts)
+    assert loaded.rows == sketch.rows
+    # A loaded sketch still merges with sketches built from its reference.
+    loaded.merge(_sketch_of(reference, _sparse_rows(9, 100)))
+    assert loaded.rows == 600
+
+
+def test_load_missing_sketch(tmp_path):
+    assert drift_service.load_sketch(str(tmp_path / "missing.npz")) is None
@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+from sklearn import metrics as skm
+import config
+from services import evaluation_service
+
+
+def _scores_with_ties(seed: int, n: int = 2000, levels: int = 25):
+    """
+    Labels with ~10% positives and scores rounded to a few levels, so many
+    rows share a score, loosely correlated with the labels.
+    """
+    rng = np.random.default_rng(seed)
+    y = (rng.random(n) < 0.1).astype(np.int8)
+    raw = np.clip(rng.normal(0.3 + 0.3 * y, 0.2), 0, 1)
+    return y, np.round(raw * levels) / levels
+
+
+def _brute_force(y, scores, threshold):
+    predicted = (scores >= threshold).astype(np.int8)
+    tn, fp, fn, tp = skm.confusion_matrix(y, predicted, labels=[0, 1]).ravel()
+    return predicted, {
+        "true_positives": int(tp),
+        "false_positives": int(fp),
+        "true_negatives": int(tn),
+        "false_negatives": int(fn),
+    }
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sweep_counts_match_every_threshold(seed):
+    y, scores = _scores_with_ties(seed)
+    sweep = evaluation_service.threshold_sweep(y, scores)
+    assert np.array_equal(sweep["thresholds"], np.unique(scores)[::-1])
+    for i, threshold in enumerate(sweep["thresholds"]):
+        _, matrix = _brute_force(y, scores, threshold)
+        assert sweep["tp"][i] == matrix["true_positives"]
+        assert sweep["fp"][i] == matrix["false_positives"]
+        assert sweep["fn"][i] == matrix["false_negatives"]
+        assert sweep["tn"][i] == matrix["true_negatives"]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_ranking_metrics_match_sklearn(seed):
+    y, scores = _scores_with_ties(seed)
+    values = evaluation_service.sweep_metrics(
+        evaluation_service.threshold_sweep(y, scores)
+    )
+    roc_auc, average_precision = evaluation_service._ranking_metrics(values)
+    assert roc_auc == pytest.approx(skm.roc_auc_score(y, scores), abs=1e-12)
+    assert average_precision == pytest.approx(
+        skm.average_precision_score(y, scores), abs=1e-12
+    )
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sweep_mcc_matches_sklearn(seed):
+    y, scores = _scores_with_ties(seed)
+    sweep = evaluation_service.threshold_sweep(y, scores)
+    mcc = evaluation_service.sweep_metrics(sweep)["mcc"]
+    for i, threshold in enumerate(sweep["thresholds"]):
+        predicted, _ = _brute_force(y, scores, threshold)
+        assert mcc[i] == pytest.approx(skm.matthews_corrcoef(y, predicted), abs=1e-12)
+
+
+def test_metrics_at_threshold_boundaries():
+    y, scores = _scores_with_ties(0)
+    sweep = evaluation_service.threshold_sweep(y, scores)
+    distinct = np.unique(scores)
+    candidates = [
+        distinct[5],  # Exactly a score: rows at it are predicted positive.
+        np.nextafter(distinct[5], np.inf),  # Just above it: they are not.
+        np.nextafter(distinct[5], -np.inf),
+        distinct[0],  # The lowest score: everything is positive.
+        distinct[-1],  # The highest score: only its rows are positive.
+        distinct[-1] + 0.1,  # Above every score: nothing is positive.
+        distinct[0] - 0.1,
+        0.5,
+    ]
+    for threshold in candidates:
+        predicted, expected = _brute_force(y, scores, threshold)
+        metrics, matrix = evaluation_service.metrics_at(sweep, threshold)
+        assert matrix == expected, threshold
+        assert metrics["precision"] == pytest.approx(
+            skm.precision_score(y, predicted, zero_division=0)
+        )
+        assert metrics["recall"] == pytest.approx(skm.recall_score(y, predicted))
+        assert metrics["f1_score"] == pytest.approx(skm.f1_score(y, predicted))
+        assert metrics["mcc"] == pytest.approx(skm.matthews_corrcoef(y, predicted))
+        assert metrics["accuracy"] == pytest.approx(skm.accuracy_score(y, predicted))
+
+
+@pytest.mark.parametrize(
+    "strategy, score", [("best_mcc", skm.matthews_corrcoef), ("best_f1", skm.f1_score)]
+)
+def test_select_threshold_picks_the_best_threshold(strategy, score):
+    y, scores = _scores_with_ties(1)
+    threshold = evaluation_service.select_threshold(y, scores, strategy)
+    assert threshold in scores
+    best = max(score(y, scores >= t) for t in np.unique(scores))
+    assert score(y, scores >= threshold) == pytest.approx(best)
+
+
+def test_select_threshold_default_strategy():
+    y, scores = _scores_with_ties(2)
+    assert (
+        evaluation_service.select_threshold(y, scores, "default")
+        == config.DEFAULT_DECISION_THRESHOLD
+    )
+
+
+def test_holdout_threshold_without_failures_falls_back_to_default():
+    y, scores = _scores_with_ties(3)
+    assert evaluation_service.holdout_threshold(np.zeros_like(y), scores) == (
+        config.DEFAULT_DECISION_THRESHOLD,
+        "default",
+    )
+    threshold, source = evaluation_service.holdout_threshold(y, scores, "best_mcc")
+    assert source == "holdout"
+    assert threshold == evaluation_service.select_threshold(y, scores, "best_mcc")
+
+
+def test_evaluation_report_uses_the_given_threshold():
+    y, scores = _scores_with_ties(4)
+    report = evaluation_service.evaluation_report(y, scores, threshold=0.6)
+    expected = evaluation_service.evaluate_at(y, scores, 0.6)
+    assert report["threshold"] == 0.6
+    assert report["metrics"] == expected["metrics"]
+    assert report["confusion_matrix"] == expected["confusion_matrix"]
+    # The best-case thresholds on these scores are still reported.
+    assert report["best_mcc"]["threshold"] == evaluation_service.select_threshold(
+        y, scores, "best_mcc"
+    )
@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import pytest
+import config
+from services import partition_service, storage_service
+
+SIZE = 10_000
+
+
+def _make(path: str, age: float, size: int = SIZE) -> str:
+    """
+    Creates an artifact directory holding `size` bytes, last modified `age`
+    seconds ago.
+    """
+    os.makedirs(path)
+    data_path = os.path.join(path, "data.bin")
+    with open(data_path, "wb") as f:
+        f.write(b"\0" * size)
+    then = time.time() - age
+    for p in (data_path, path):
+        os.utime(p, (then, then))
+    return path
+
+
+def _age_pin(task_id: str, seconds: float):
+    path = storage_service._pin_path(task_id)
+    with open(path, "r") as f:
+        entry = json.load(f)
+    entry["pinned_at"] -= seconds
+    with open(path, "w") as f:
+        json.dump(entry, f)
+
+
+def _exists(*paths) -> list:
+    return [os.path.exists(p) for p in paths]
+
+
+@pytest.fixture
+def storage(storage_dir, monkeypatch):
+    # Quota-driven eviction only: ignore the free space of the test volume.
+    monkeypatch.setattr(config, "STORAGE_MIN_FREE_BYTES", 0)
+    monkeypatch.setattr(config, "STORAGE_EVICTION_GRACE_SECONDS", 900)
+    return storage_dir
+
+
+@pytest.fixture
+def three_jobs(storage):
+    return [
+        _make(os.path.join(config.SCORING_DIR, name), age)
+        for name, age in (("b", 2000), ("a", 3000), ("c", 1000))
+    ]
+
+
+def test_evicts_least_recently_used_first(three_jobs, monkeypatch):
+    b, a, c = three_jobs
+    monkeypatch.setattr(config, "STORAGE_QUOTA_BYTES", int(2.5 * SIZE))
+    result = storage_service.enforce_quota()
+    assert [e["key"] for e in result["evicted"]] == [storage_service._key(a)]
+    assert _exists(a, b, c) == [False, True, True]
+    assert result["freed_bytes"] == SIZE
+
+    monkeypatch.setattr(config, "STORAGE_QUOTA_BYTES", int(1.5 * SIZE))
+    storage_service.enforce_quota()
+    assert _exists(b, c) == [False, True]
+
+
+def test_recorded_access_overrides_mtime(three_jobs, monkeypatch):
+    b, a, c = three_jobs
+    monkeypatch.setattr(config, "STORAGE_EVICTION_GRACE_SECONDS", 0)
+    monkeypatch.setattr(config, "STORAGE_QUOTA_BYTES", int(2.5 * SIZE))
+    storage_service.record_access(a)
+    storage_service.enforce_quota()
+    assert _exists(a, b, c) == [True, False, True]
+    # The evicted artifact's access record goes with it.
+    assert storage_service._load_access() == {
+        storage_service._key(a): pytest.approx(time.time(), abs=60)
+    }
+
+
+def test_grace_period_keeps_recent_artifacts(three_jobs, monkeypatch):
+    b, a, c = three_jobs
+    monkeypatch.setattr(config, "STORAGE_EVICTION_GRACE_SECONDS", 1500)
+    monkeypatch.setattr(config, "STORAGE_QUOTA_BYTES", 1)
+    recent = _make(os.path.join(config.SCORING_DIR, "recent"), 0)
+    storage_service.record_access(b)
+    storage_service.enforce_quota()
+    assert _exists(a, b, c, recent) == [False, True, True, True]
+
+
+def test_retained_kinds_are_never_evicted(three_jobs, monkeypatch):
+    monkeypatch.setattr(config, "STORAGE_QUOTA_BYTES", 1)
+    dataset = _make(os.path.join(config.PARTITIONS_DIR, "2024-01"), 5000)
+    sample = _make(os.path.join(config.SAMPLES_DIR, "sample"), 5000)
+    result = storage_service.enforce_quota()
+    assert {e["kind"] for e in result["evicted"]} == {"scoring"}
+    assert not any(_exists(*three_jobs))
+    assert _exists(dataset, sample) == [True, True]
+
+
+def test_pins_expire_after_their_ttl(three_jobs, monkeypatch):
+    b, a, c = three_jobs
+    monkeypatch.setattr(config, "STORAGE_QUOTA_BYTES", 1)
+    storage_service.pin("task-default", [a])
+    storage_service.pin("task-long", [b], ttl=10 * config.STORAGE_PIN_TTL_SECONDS)
+    storage_service.pin("task-fresh", [c])
+    pinned = {storage_service._key(p) for p in (a, b, c)}
+    assert storage_service._pinned_keys() == pinned
+
+    # Past the default TTL: only the pin with a longer TTL still holds.
+    for task_id in ("task-default", "task-long"):
+        _age_pin(task_id, config.STORAGE_PIN_TTL_SECONDS + 1)
+    assert storage_service._pinned_keys() == {
+        storage_service._key(b),
+        storage_service._key(c),
+    }
+    storage_service.enforce_quota()
+    assert _exists(a, b, c) == [False, True, True]
+
+    # Pinning again renews the pin; unpinning releases it.
+    _age_pin("task-fresh", config.STORAGE_PIN_TTL_SECONDS + 1)
+    storage_service.pin("task-fresh", [c])
+    storage_service.unpin("task-long")
+    storage_service.enforce_quota()
+    assert _exists(b, c) == [False, True]
+
+
+def test_evicting_a_split_removes_it_from_the_manifest(storage, monkeypatch):
+    splits = {}
+    for name, age in (("train", 3000), ("test", 0)):
+        path = os.path.join(config.DATA_DIR, f"{name}.npz")
+        with open(path, "wb") as f:
+            f.write(b"\0" * SIZE)
+        _make(path + config.SPLIT_CACHE_SUFFIX, age)
+        os.utime(path, (time.time() - age,) * 2)
+        splits[name] = {"path": path, "start_ns": 0, "end_ns": 1, "partitions": []}
+    partition_service.record_splits(splits)
+
+    monkeypatch.setattr(config, "STORAGE_QUOTA_BYTES", 1)
+    result = storage_service.enforce_quota()
+    train = splits["train"]["path"]
+    assert [e["kind"] for e in result["evicted"]] == ["split"]
+    assert result["freed_bytes"] == 2 * SIZE
+    assert _exists(train, train + config.SPLIT_CACHE_SUFFIX) == [False, False]
+    assert partition_service.load_split_manifest() == {"test": splits["test"]}
+
+
+def test_removing_an_unrecorded_split_keeps_the_manifest(storage):
+    splits = {"test": {"path": "elsewhere.npz", "start_ns": 0, "end_ns": 1}}
+    partition_service.record_splits(splits)
+    mtime = os.stat(config.SPLIT_MANIFEST_PATH).st_mtime_ns
+    path = os.path.join(config.DATA_DIR, "train.npz")
+    open(path, "wb").close()
+    (artifact,) = [a for a in storage_service.list_artifacts() if a["kind"] == "split"]
+    storage_service._remove(artifact)
+    assert not os.path.exists(path)
+    assert partition_service.load_split_manifest() == splits
+    assert os.stat(config.SPLIT_MANIFEST_PATH).st_mtime_ns == mtime
@@ -0,0 +1,126 @@
+import os
+import asyncio
+import hashlib
+import pytest
+import config
+from services import storage_service, upload_session_service
+
+PAYLOAD = bytes(range(256)) * 40 + b"tail"  # 10244 bytes
+PART_SIZE = 4096  # 3 parts, the last one short
+
+
+async def _chunks(data: bytes, size: int = 1000):
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+def _part(number: int, data: bytes = PAYLOAD) -> bytes:
+    return data[number * PART_SIZE : (number + 1) * PART_SIZE]
+
+
+def _send(upload_id: str, number: int, body: bytes = None, checksum: str = None):
+    body = _part(number) if body is None else body
+    checksum = checksum or hashlib.sha256(body).hexdigest()
+    return asyncio.run(
+        upload_session_service.write_part(upload_id, number, _chunks(body), checksum)
+    )
+
+
+@pytest.fixture
+def session(storage_dir):
+    return upload_session_service.create_session("data.csv", len(PAYLOAD), PART_SIZE)
+
+
+def test_create_session_preallocates_and_pins(session):
+    assert session["part_count"] == 3
+    session_dir = os.path.join(config.UPLOADS_DIR, session["upload_id"])
+    data_path = os.path.join(session_dir, upload_session_service.DATA_FILENAME)
+    assert os.path.getsize(data_path) == len(PAYLOAD)
+    assert storage_service._key(session_dir) in storage_service._pinned_keys()
+    status = upload_session_service.get_session_status(session["upload_id"])
+    assert status["missing_parts"] == [0, 1, 2]
+
+
+def test_create_session_rejects_bad_sizes(storage_dir):
+    with pytest.raises(ValueError):
+        upload_session_service.create_session("data.csv", 0)
+    with pytest.raises(ValueError):
+        upload_session_service.create_session(
+            "data.csv", 10, config.UPLOAD_MAX_PART_SIZE + 1
+        )
+
+
+def test_out_of_order_parts_assemble_in_place(session):
+    upload_id = session["upload_id"]
+    for number in (2, 0, 1):
+        result = _send(upload_id, number)
+        assert result["size"] == len(_part(number))
+    status = upload_session_service.finalize_session(upload_id)
+    assert status["received_parts"] == [0, 1, 2]
+    with open(status["data_path"], "rb") as f:
+        assert f.read() == PAYLOAD
+
+
+def test_duplicate_part_overwrites(session):
+    upload_id = session["upload_id"]
+    for number in (0, 1, 2, 1, 1):
+        _send(upload_id, number)
+    status = upload_session_service.finalize_session(upload_id)
+    assert status["received_parts"] == [0, 1, 2]
+    with open(status["data_path"], "rb") as f:
+        assert f.read() == PAYLOAD
+
+
+def test_checksum_mismatch_leaves_part_missing(session):
+    upload_id = session["upload_id"]
+    with pytest.raises(ValueError, match="Checksum"):
+        _send(upload_id, 0, checksum="0" * 64)
+    assert upload_session_service.get_session_status(upload_id)["missing_parts"] == [
+        0,
+        1,
+        2,
+    ]
+
+
+def test_failed_resend_unmarks_a_verified_part(session):
+    upload_id = session["upload_id"]
+    _send(upload_id, 1)
+    corrupted = b"x" * len(_part(1))
+    with pytest.raises(ValueError):
+        _send(upload_id, 1, corrupted, checksum=hashlib.sha256(_part(1)).hexdigest())
+    assert 1 in upload_session_service.get_session_status(upload_id)["missing_parts"]
+
+
+@pytest.mark.parametrize("body", [b"short", _part(0) + b"extra"])
+def test_wrong_part_length_is_rejected(session, body):
+    with pytest.raises(ValueError):
+        _send(session["upload_id"], 0, body)
+
+
+def test_part_number_out_of_range(session):
+    with pytest.raises(ValueError):
+        _send(session["upload_id"], 3, b"")
+
+
+def test_finalize_incomplete_upload(session):
+    upload_id = session["upload_id"]
+    _send(upload_id, 0)
+    _send(upload_id, 2)
+    with pytest.raises(upload_session_service.UploadIncomplete, match="1 of 3"):
+        upload_session_service.finalize_session(upload_id)
+
+
+def test_unknown_or_invalid_session(storage_dir):
+    for upload_id in ("0" * 32, "../artifacts", ""):
+        with pytest.raises(upload_session_service.UploadSessionNotFound):
+            upload_session_service.get_session_status(upload_id)
+
+
+def test_discard_removes_files_and_pin(session):
+    upload_id = session["upload_id"]
+    _send(upload_id, 0)
+    upload_session_service.discard_session(upload_id)
+    assert not os.path.exists(os.path.join(config.UPLOADS_DIR, upload_id))
+    assert not os.listdir(config.STORAGE_PINS_DIR)
+    with pytest.raises(upload_session_service.UploadSessionNotFound):
+        upload_session_service.get_session_status(upload_id)